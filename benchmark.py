@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Скрипт для замеров производительности слоя базы данных
+Запуск: python benchmark.py [количество_задач]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import partial
+
+from controllers.project_controller import ProjectController
+from controllers.task_controller import TaskController
+from controllers.user_controller import UserController
+from controllers.deadline_scheduler import DeadlineScheduler
+from controllers.events import EventBus
+from database.database_manager import DatabaseManager, TASK_FIELDS
+from models.task import Task
+
+WORDS = [
+    'parser', 'report', 'backup', 'deploy', 'invoice', 'migration', 'search',
+    'login', 'export', 'import', 'cache', 'layout', 'schema', 'billing', 'queue',
+]
+
+
+def measure(func, repeat=5):
+    """Лучшее время выполнения функции в миллисекундах"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def random_text(rng, words):
+    return ' '.join(f'{rng.choice(WORDS)}{rng.randint(0, 500)}' for _ in range(words))
+
+
+def seed_database(db, task_count):
+    """Заполнить базу пользователями, проектами и задачами"""
+    rng = random.Random(42)
+    now = datetime.now()
+
+    db.add_users((f'user{i}', f'user{i}@example.com', 'developer', now) for i in range(100))
+    db.add_projects(
+        (f'Project {i}', random_text(rng, 5), now, now + timedelta(days=90), 'active', now)
+        for i in range(50)
+    )
+
+    statuses = ['pending', 'in_progress', 'completed']
+    db.add_tasks(
+        (random_text(rng, 3), random_text(rng, 12), rng.randint(1, 3), rng.choice(statuses),
+         now + timedelta(hours=rng.randint(-2000, 2000)), rng.randint(1, 50),
+         rng.randint(1, 100), now)
+        for _ in range(task_count)
+    )
+
+
+def benchmark_search(db):
+    """Поиск задач: FTS5 против LIKE"""
+    print("\nПоиск задач (search_tasks)")
+    print("-" * 60)
+    for query in ['migration42', 'billing4', 'deploy backup1']:
+        fts_ms = measure(lambda q=query: db.search_tasks(q, limit=50))
+        db.fts_enabled = False
+        like_ms = measure(lambda q=query: db.search_tasks(q)[:50])
+        db.fts_enabled = True
+        print(f"  '{query}': FTS5 {fts_ms:8.2f} мс | LIKE {like_ms:8.2f} мс")
+
+
+def count_queries(db, func):
+    """Выполнить функцию и вернуть число запросов SELECT к базе"""
+    statements = []
+    db.connection.set_trace_callback(statements.append)
+    try:
+        func()
+    finally:
+        db.connection.set_trace_callback(None)
+    return sum(1 for sql in statements if sql.lstrip().upper().startswith('SELECT'))
+
+
+def legacy_task_rows(task_controller, project_controller, user_controller):
+    """Строки списка задач так, как их раньше собирал TaskView (2N+1 запросов)"""
+    rows = []
+    for task in task_controller.get_all_tasks():
+        project = project_controller.get_project(task.project_id) if task.project_id else None
+        user = user_controller.get_user(task.assignee_id) if task.assignee_id else None
+        rows.append((task.id, task.title, project.name if project else None,
+                     user.username if user else None, task.is_overdue()))
+    return rows
+
+
+def benchmark_task_listing(db):
+    """Обновление вкладки задач: N+1 запросов против одного JOIN"""
+    print("\nСписок задач (обновление вкладки)")
+    print("-" * 60)
+    tasks = TaskController(db)
+    projects = ProjectController(db)
+    users = UserController(db)
+
+    def legacy():
+        return legacy_task_rows(tasks, projects, users)
+
+    listing = tasks.get_task_listing
+    print(f"  N+1 (get_all_tasks + get_project/get_user): {count_queries(db, legacy)} запросов, "
+          f"{measure(legacy, repeat=1):.0f} мс")
+    print(f"  get_task_listing: {count_queries(db, listing)} запрос, "
+          f"{measure(listing, repeat=3):.0f} мс")
+
+
+def benchmark_project_progress(db):
+    """Вкладка проектов: прогресс по проекту в цикле против одной группировки"""
+    print("\nВкладка проектов (прогресс всех проектов)")
+    print("-" * 60)
+    projects = ProjectController(db)
+
+    def legacy():
+        return [(project, projects.get_project_progress(project.id))
+                for project in projects.get_all_projects()]
+
+    grouped = projects.get_projects_with_progress
+    print(f"  get_project_progress для каждого проекта: {count_queries(db, legacy)} запросов, "
+          f"{measure(legacy, repeat=3):.1f} мс")
+    print(f"  get_projects_with_progress: {count_queries(db, grouped)} запрос, "
+          f"{measure(grouped, repeat=3):.1f} мс")
+
+
+def benchmark_task_stats(db):
+    """Прогресс проектов: COUNT/SUM по задачам против счетчиков task_stats"""
+    print("\nСчетчики задач (task_stats)")
+    print("-" * 60)
+    project_ids = [row['id'] for row in db.get_all_projects()]
+    query = "SELECT COUNT(*), SUM(status = 'completed') FROM tasks WHERE project_id = ?"
+
+    def legacy():
+        return [db.connection.execute(query, (project_id,)).fetchone()
+                for project_id in project_ids]
+
+    def stats():
+        return [db.get_project_progress(project_id) for project_id in project_ids]
+
+    print(f"  COUNT/SUM по задачам: {measure(legacy, repeat=3):.1f} мс")
+    print(f"  get_project_progress (task_stats): {measure(stats, repeat=3):.1f} мс")
+    print(f"  verify_task_stats: {measure(db.verify_task_stats, repeat=1):.0f} мс")
+    print(f"  rebuild_task_stats: {measure(db.rebuild_task_stats, repeat=1):.0f} мс")
+
+
+def benchmark_user_task_counts(db):
+    """Вкладка пользователей: задачи каждого пользователя против группировки"""
+    print("\nВкладка пользователей (число задач)")
+    print("-" * 60)
+    tasks = TaskController(db)
+    users = UserController(db)
+
+    def legacy():
+        return [(user, len(tasks.get_tasks_by_user(user.id))) for user in users.get_all_users()]
+
+    grouped = users.get_users_with_task_counts
+    print(f"  get_tasks_by_user + len: {count_queries(db, legacy)} запросов, "
+          f"{measure(legacy, repeat=3):.0f} мс")
+    print(f"  get_users_with_task_counts: {count_queries(db, grouped)} запроса, "
+          f"{measure(grouped, repeat=3):.1f} мс")
+
+
+def benchmark_user_tasks(db):
+    """Задачи пользователя: проект каждой задачи по id против одного JOIN"""
+    print("\nЗадачи пользователя с названиями проектов")
+    print("-" * 60)
+    tasks = TaskController(db)
+    users = UserController(db)
+    counts = db.get_task_counts_by_user()
+    user_id = max(counts, key=counts.get)
+
+    def legacy():
+        db.cache.clear()  # Проекты читаются из базы, как до кэша записей
+        result = []
+        for task in tasks.get_tasks_by_user(user_id):
+            task_dict = task.to_dict()
+            project_data = db.get_project_by_id(task.project_id)
+            if project_data:
+                task_dict['project_name'] = project_data['name']
+            result.append(task_dict)
+        return result
+
+    joined = partial(users.get_user_tasks, user_id)
+    print(f"  Задач у пользователя: {counts[user_id]}")
+    print(f"  get_project_by_id для каждой задачи: {count_queries(db, legacy)} запросов, "
+          f"{measure(legacy, repeat=3):.1f} мс")
+    print(f"  get_user_tasks (JOIN): {count_queries(db, joined)} запрос, "
+          f"{measure(joined, repeat=3):.1f} мс")
+
+
+def benchmark_id_cache(db):
+    """Чтение проектов и пользователей задач по ID: с кэшем и без"""
+    print("\nget_project/get_user для каждой задачи (кэш по ID)")
+    print("-" * 60)
+    uncached = DatabaseManager(db.db_path, cache_size=0)
+    try:
+        for name, manager in [('без кэша', uncached), ('LRU-кэш', db)]:
+            rows = partial(legacy_task_rows, TaskController(manager), ProjectController(manager),
+                           UserController(manager))
+            print(f"  {name}: {count_queries(manager, rows)} запросов, "
+                  f"{measure(rows, repeat=1):.0f} мс")
+    finally:
+        uncached.close()
+    stats = db.get_cache_stats()
+    print(f"  Кэш: {stats['size']}/{stats['capacity']} записей, попаданий {stats['hit_rate']:.1%}, "
+          f"вытеснений {stats['evictions']}")
+
+
+def benchmark_query_cache(db):
+    """Повторное обновление вкладок без изменений в базе: с кэшем запросов и без"""
+    print("\nОбновление вкладок (списки и прогресс проектов)")
+    print("-" * 60)
+    cached = DatabaseManager(db.db_path)
+    try:
+        for name, manager in [('без кэша', db), ('кэш запросов', cached)]:
+            def refresh(manager=manager):
+                manager.get_task_listing()
+                manager.get_all_projects()
+                manager.get_all_users()
+                manager.get_overdue_tasks()
+                for project_id in range(1, 51):
+                    manager.get_project_progress(project_id)
+            refresh()
+            print(f"  {name}: {measure(refresh, repeat=3):.1f} мс")
+        stats = cached.get_query_cache_stats()
+        print(f"  Кэш: {stats['size']} результатов, попаданий {stats['hit_rate']:.1%}")
+    finally:
+        cached.close()
+
+
+def peak_memory(func):
+    """Пиковый объем памяти (МБ), выделенной при выполнении функции"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_streaming(db):
+    """Обход всех задач: список целиком против потокового генератора"""
+    print("\nОбход всех задач (экспорт)")
+    print("-" * 60)
+
+    def materialized():
+        return sum(task['priority'] for task in db.get_all_tasks())
+
+    def streamed():
+        return sum(task['priority'] for task in db.iter_tasks(batch_size=1000))
+
+    for name, func in [('get_all_tasks', materialized), ('iter_tasks', streamed)]:
+        print(f"  {name}: {measure(func, repeat=1):.0f} мс, пик памяти {peak_memory(func):.1f} МБ")
+
+
+def benchmark_row_mapping(db):
+    """Создание моделей из строк: sqlite3.Row -> dict -> from_dict против кортежей"""
+    print("\nЗагрузка задач в модели (get_all_tasks)")
+    print("-" * 60)
+    tasks = TaskController(db)
+    rows = len(db.get_all_tasks(as_tuples=True))
+    for name, fast in [('sqlite3.Row -> dict -> from_dict', False), ('кортеж -> row_mapper', True)]:
+        elapsed = measure(lambda fast=fast: tasks.get_all_tasks(fast=fast), repeat=3)
+        print(f"  {name}: {elapsed:.0f} мс, {elapsed * 1000 / rows:.2f} мкс на строку")
+
+
+def benchmark_model_memory(db, total=1_000_000):
+    """Память под объекты Task: __dict__ у каждого экземпляра против __slots__"""
+    print(f"\nПамять под объекты Task (оценка для {total:,} задач)")
+    print("-" * 60)
+
+    class DictTask(Task):
+        """Task с __dict__, как до перехода на __slots__"""
+
+    rows = db.get_all_tasks(as_tuples=True)
+    for name, cls in [('__dict__', DictTask), ('__slots__', Task)]:
+        map_row = cls.row_mapper(TASK_FIELDS)
+        tracemalloc.start()
+        try:
+            tasks = list(map(map_row, rows))
+            allocated = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        per_task = allocated / len(tasks)
+        print(f"  {name}: {per_task:.0f} байт на задачу, {per_task * total / 2**20:.0f} МБ")
+        del tasks
+
+
+def benchmark_task_batch(db):
+    """Классификация задач: Task.is_overdue в цикле против масок TaskBatch"""
+    print("\nПросроченные задачи по статусам")
+    print("-" * 60)
+    tasks = TaskController(db)
+
+    def objects():
+        return Counter(task.status for task in tasks.get_all_tasks(fast=True) if task.is_overdue())
+
+    def columns():
+        batch = tasks.get_task_batch()
+        return batch.counts_by('status', mask=batch.overdue_mask())
+
+    assert objects() == columns()
+    batch = tasks.get_task_batch()
+    print(f"  Task.is_overdue (загрузка + цикл): {measure(objects, repeat=3):.0f} мс")
+    print(f"  TaskBatch (загрузка + маска): {measure(columns, repeat=3):.0f} мс")
+    print(f"  TaskBatch (только маска и подсчет): "
+          f"{measure(lambda: batch.counts_by('status', mask=batch.overdue_mask())):.1f} мс")
+
+
+def benchmark_bulk_status(db, count=500):
+    """Закрытие спринта: смена статуса по одной задаче против одного UPDATE"""
+    print("\nМассовая смена статуса")
+    print("-" * 60)
+    tasks = TaskController(db)
+    ids = [row['id'] for row in db.find_tasks(status='pending', limit=count)]
+
+    started = time.perf_counter()
+    for task_id in ids:
+        tasks.update_task_status(task_id, 'in_progress')
+    single = (time.perf_counter() - started) * 1000
+
+    # Возвращаем задачи в прежний статус одним запросом
+    started = time.perf_counter()
+    tasks.update_task_status_many('pending', ids=ids)
+    bulk = (time.perf_counter() - started) * 1000
+    print(f"  update_task_status x {len(ids)}: {single:.0f} мс")
+    print(f"  update_task_status_many: {bulk:.1f} мс")
+
+
+def benchmark_deadlines(db):
+    """Просроченные задачи: get_overdue_tasks против кучи DeadlineScheduler"""
+    print("\nПросроченные задачи (планировщик сроков)")
+    print("-" * 60)
+    scheduler = DeadlineScheduler(db)
+    started = time.perf_counter()
+    scheduler.load()
+    print(f"  Загрузка {len(scheduler)} сроков: {(time.perf_counter() - started) * 1000:.0f} мс")
+    print(f"  get_overdue_tasks: {measure(db.get_overdue_tasks, repeat=3):.1f} мс")
+    # Первая проверка извлекает все уже просроченные задачи, следующие - только новые
+    print(f"  poll (первая проверка): {measure(scheduler.poll, repeat=1):.1f} мс")
+    print(f"  poll: {measure(scheduler.poll, repeat=3) * 1000:.1f} мкс")
+
+
+def benchmark_change_events(db):
+    """Сохранение задачи: перезагрузка списка против обновления одной строки по событию"""
+    print("\nОбновление списка после сохранения задачи")
+    print("-" * 60)
+    events = EventBus()
+    tasks = TaskController(db, events=events)
+    task_id = db.find_tasks(limit=1)[0]['id']
+    patched = []
+    events.subscribe(lambda changes: patched.extend(
+        db.get_task_listing(ids=[event.entity_id for event in changes])), 'task')
+    
+    def reload():
+        tasks.update_task(task_id, priority=2)
+        return db.get_task_listing()
+    
+    def patch():
+        tasks.update_task(task_id, priority=2)
+        return patched
+    
+    print(f"  update_task + get_task_listing: {measure(reload, repeat=3):.0f} мс")
+    print(f"  update_task + строка по событию: {measure(patch, repeat=3):.2f} мс")
+
+
+def database_size(db):
+    """Размер файла базы после VACUUM в МБ"""
+    db.connection.execute('VACUUM')
+    page_count = db.connection.execute('PRAGMA page_count').fetchone()[0]
+    page_size = db.connection.execute('PRAGMA page_size').fetchone()[0]
+    return page_count * page_size / 2**20
+
+
+def benchmark_epoch_dates(db):
+    """Хранение дат: текст против секунд от эпохи (база переводится на месте)"""
+    print("\nХранение дат: текст против секунд от эпохи")
+    print("-" * 60)
+    tasks = TaskController(db)
+    week_ago = datetime.now() - timedelta(days=7)
+
+    def run():
+        return {
+            'get_overdue_tasks': measure(db.get_overdue_tasks, repeat=3),
+            'find_tasks(due_after)': measure(lambda: db.find_tasks(due_after=week_ago), repeat=3),
+            'get_all_tasks(fast=True)': measure(lambda: tasks.get_all_tasks(fast=True), repeat=3),
+        }
+
+    text_times, text_size = run(), database_size(db)
+    started = time.perf_counter()
+    migrated = db.migrate_to_epoch_dates()
+    print(f"  Миграция: {migrated} записей за {time.perf_counter() - started:.2f} с")
+    epoch_times, epoch_size = run(), database_size(db)
+    for name in text_times:
+        print(f"  {name}: текст {text_times[name]:.0f} мс | эпоха {epoch_times[name]:.0f} мс")
+    print(f"  Размер базы: текст {text_size:.1f} МБ | эпоха {epoch_size:.1f} МБ")
+
+
+def main():
+    task_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+    temp_db.close()
+    # Кэш запросов отключен, чтобы повторные замеры выполняли запросы
+    db = DatabaseManager(temp_db.name, query_cache_size=0)
+
+    print("=" * 60)
+    print(f"ЗАМЕРЫ ПРОИЗВОДИТЕЛЬНОСТИ: {task_count} задач")
+    print("=" * 60)
+
+    try:
+        started = time.perf_counter()
+        db.set_profile('fast-bulk')
+        seed_database(db, task_count)
+        db.set_profile('balanced')
+        print(f"Заполнение базы: {time.perf_counter() - started:.2f} с")
+
+        benchmark_search(db)
+        benchmark_task_listing(db)
+        benchmark_project_progress(db)
+        benchmark_task_stats(db)
+        benchmark_user_task_counts(db)
+        benchmark_user_tasks(db)
+        benchmark_id_cache(db)
+        benchmark_query_cache(db)
+        benchmark_streaming(db)
+        benchmark_row_mapping(db)
+        benchmark_model_memory(db)
+        benchmark_task_batch(db)
+        benchmark_bulk_status(db)
+        benchmark_deadlines(db)
+        benchmark_change_events(db)
+        benchmark_epoch_dates(db)
+    finally:
+        db.close()
+        os.unlink(temp_db.name)
+
+
+if __name__ == "__main__":
+    main()
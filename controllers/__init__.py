@@ -2,5 +2,8 @@
 from .task_controller import TaskController
 from .project_controller import ProjectController
 from .user_controller import UserController
+from .deadline_scheduler import DeadlineScheduler
+from .events import EventBus, ChangeEvent
 
-__all__ = ['TaskController', 'ProjectController', 'UserController']
+__all__ = ['TaskController', 'ProjectController', 'UserController', 'DeadlineScheduler',
+           'EventBus', 'ChangeEvent']
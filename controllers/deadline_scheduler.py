@@ -0,0 +1,121 @@
+import heapq
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from models.dates import EPOCH, parse_datetime, to_epoch
+from database.database_manager import DatabaseManager
+
+# Статусы задач, у которых срок еще может пройти
+OPEN_STATUSES = ['pending', 'in_progress']
+
+
+class DeadlineScheduler:
+    """Планировщик сроков задач: куча (срок, ID) вместо периодических запросов
+    
+    Незавершенные задачи загружаются из базы один раз (load), дальше куча
+    обновляется при изменении задач через TaskController. poll снимает с
+    вершины кучи задачи, срок которых прошел, и передает их ID подписчикам.
+    Устаревшие элементы кучи (срок изменен, задача завершена или удалена) не
+    удаляются сразу, а пропускаются при извлечении.
+    """
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        self._heap = []
+        self._due: Dict[int, int] = {}  # Актуальный срок каждой задачи (секунды от эпохи)
+        self._fired: Dict[int, int] = {}  # Сроки, о которых уже сообщено
+        self._callbacks: List[Callable[[List[int]], None]] = []
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._due)
+    
+    def load(self) -> int:
+        """Загрузить сроки незавершенных задач из базы; возвращает их число"""
+        due = {task_id: due_epoch for task_id, _, _, _, due_epoch
+               in self.db_manager.iter_task_columns(status=OPEN_STATUSES)}
+        with self._lock:
+            self._due = due
+            self._heap = [(due_epoch, task_id) for task_id, due_epoch in due.items()]
+            heapq.heapify(self._heap)
+        return len(due)
+    
+    def subscribe(self, callback: Callable[[List[int]], None]):
+        """Вызывать callback(ID задач) каждый раз, когда у задач проходит срок"""
+        self._callbacks.append(callback)
+    
+    def unsubscribe(self, callback: Callable[[List[int]], None]):
+        """Отменить подписку"""
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+    
+    def track(self, task_id: int, due_date, status: str = 'pending'):
+        """Учесть новый срок или статус задачи"""
+        if status not in OPEN_STATUSES:
+            self.discard(task_id)
+            return
+        due_epoch = due_date if isinstance(due_date, int) else to_epoch(
+            parse_datetime(due_date) if isinstance(due_date, str) else due_date)
+        with self._lock:
+            if due_epoch in (self._due.get(task_id), self._fired.get(task_id)):
+                return
+            self._due[task_id] = due_epoch
+            heapq.heappush(self._heap, (due_epoch, task_id))
+            self._compact()
+    
+    def refresh(self, task_id: int):
+        """Перечитать срок и статус задачи из базы (после изменения задачи)"""
+        data = self.db_manager.get_task_by_id(task_id)
+        if data is None:
+            self.discard(task_id)
+        else:
+            self.track(task_id, data['due_date'], data['status'])
+    
+    def discard(self, task_id: int):
+        """Перестать следить за задачей (завершена или удалена)"""
+        with self._lock:
+            self._due.pop(task_id, None)
+            self._fired.pop(task_id, None)
+    
+    def next_due(self) -> Optional[datetime]:
+        """Ближайший срок среди отслеживаемых задач (None, если задач нет)"""
+        with self._lock:
+            self._drop_stale()
+            return EPOCH + timedelta(seconds=self._heap[0][0]) if self._heap else None
+    
+    def poll(self, now: Optional[datetime] = None) -> List[int]:
+        """Извлечь задачи, срок которых прошел к моменту now, и оповестить подписчиков
+        
+        О каждой задаче сообщается один раз; задача снова попадает в
+        планировщик, если ей назначат новый срок или вернут в работу после
+        завершения.
+        """
+        now_epoch = to_epoch(now or datetime.now())
+        overdue = []
+        with self._lock:
+            while True:
+                self._drop_stale()
+                if not self._heap or self._heap[0][0] >= now_epoch:
+                    break
+                due_epoch, task_id = heapq.heappop(self._heap)
+                del self._due[task_id]
+                self._fired[task_id] = due_epoch
+                overdue.append(task_id)
+        
+        if overdue:
+            for callback in list(self._callbacks):
+                callback(overdue)
+        return overdue
+    
+    def _drop_stale(self):
+        """Снять с вершины кучи элементы, не совпадающие с актуальными сроками"""
+        heap = self._heap
+        while heap and self._due.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+    
+    def _compact(self):
+        """Перестроить кучу, если устаревших элементов стало больше актуальных"""
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(due_epoch, task_id) for task_id, due_epoch in self._due.items()]
+            heapq.heapify(self._heap)
@@ -0,0 +1,60 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+# Сущности и действия в событиях изменений
+TASK = 'task'
+PROJECT = 'project'
+USER = 'user'
+
+ADDED = 'added'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+
+class ChangeEvent(NamedTuple):
+    """Изменение одной записи, опубликованное контроллером после записи в базу
+    
+    changes - записанные значения полей (для добавления - вся запись, для
+    удаления - пусто), previous - запись до изменения (None, если ее не было).
+    """
+    entity: str
+    action: str
+    entity_id: int
+    changes: Dict[str, Any]
+    previous: Optional[Dict[str, Any]] = None
+
+
+class EventBus:
+    """Шина событий изменений внутри процесса
+    
+    Подписчик получает список событий: изменение одной записи приходит
+    списком из одного события, массовая операция - одним списком на все
+    записи, чтобы представление обновлялось за один проход.
+    """
+    
+    def __init__(self):
+        self._subscribers: List[tuple] = []
+    
+    def subscribe(self, callback: Callable[[List[ChangeEvent]], None], *entities: str):
+        """Подписаться на события сущностей entities (без них - на все события)"""
+        self._subscribers.append((callback, frozenset(entities)))
+    
+    def unsubscribe(self, callback: Callable[[List[ChangeEvent]], None]):
+        """Отменить все подписки callback"""
+        self._subscribers = [(subscriber, entities)
+                             for subscriber, entities in self._subscribers
+                             if subscriber != callback]
+    
+    def publish(self, *events: ChangeEvent):
+        """Передать события подписчикам
+        
+        Ошибка одного подписчика не мешает остальным: изменение уже
+        записано в базу, и отменять его из-за представления нельзя.
+        """
+        for callback, entities in list(self._subscribers):
+            matching = [event for event in events if not entities or event.entity in entities]
+            if not matching:
+                continue
+            try:
+                callback(matching)
+            except Exception as e:
+                print(f"Error handling change events: {e}")
@@ -1,10 +1,22 @@
-from typing import List, Dict, Any, Optional
+from functools import partial
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 from models.project import Project
-from database.database_manager import DatabaseManager
+from database.database_manager import DatabaseManager, PROJECT_FIELDS, PROJECT_STATUSES
+from database.pagination import iter_pages, id_key
+from controllers.events import EventBus, ChangeEvent, PROJECT, ADDED, UPDATED, DELETED
+
+# Создание Project из кортежа строки (быстрый путь, fast=True)
+project_from_row = Project.row_mapper(PROJECT_FIELDS)
 
 class ProjectController:
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, events: Optional[EventBus] = None):
         self.db_manager = db_manager
+        # Шина, в которую публикуются изменения проектов (ChangeEvent)
+        self.events = events
+    
+    def transaction(self):
+        """Общая транзакция для нескольких операций (см. DatabaseManager.transaction)"""
+        return self.db_manager.transaction()
     
     def add_project(self, name: str, description: str, start_date, end_date) -> Optional[Project]:
         """Добавить проект"""
@@ -24,6 +36,7 @@ class ProjectController:
             # Добавляем в базу данных
             project_id = self.db_manager.add_project(project)
             project.id = project_id
+            self._publish(ADDED, project.id, project.to_dict())
             
             return project
             
@@ -42,65 +55,98 @@ class ProjectController:
             print(f"Error getting project: {e}")
             return None
     
-    def get_all_projects(self) -> List[Project]:
-        """Получить все проекты"""
+    def get_all_projects(self, after: Optional[int] = None, limit: Optional[int] = None,
+                         fast: bool = False) -> List[Project]:
+        """Получить все проекты (или страницу после ID after)"""
         try:
-            projects_data = self.db_manager.get_all_projects()
+            projects_data = self.db_manager.get_all_projects(after=after, limit=limit,
+                                                             as_tuples=fast)
+            if fast:
+                return list(map(project_from_row, projects_data))
             return [Project.from_dict(data) for data in projects_data]
         except Exception as e:
             print(f"Error getting all projects: {e}")
             return []
     
+    def iter_project_pages(self, page_size: int = 500) -> Iterator[List[Project]]:
+        """Перебрать проекты страницами"""
+        try:
+            for page in iter_pages(self.db_manager.get_all_projects, id_key, page_size):
+                yield [Project.from_dict(data) for data in page]
+        except Exception as e:
+            print(f"Error iterating project pages: {e}")
+    
     def update_project(self, project_id: int, **kwargs) -> bool:
-        """Обновить проект"""
+        """Обновить проект (False, если проекта нет)"""
         try:
-            # Проверяем существование проекта
-            project = self.get_project(project_id)
-            if not project:
-                return False
-            
             # Валидация данных
-            if 'status' in kwargs and kwargs['status'] not in ['active', 'completed', 'on_hold']:
-                raise ValueError("Invalid status")
-            
-            # Валидация дат
-            if 'start_date' in kwargs and 'end_date' in kwargs:
-                if kwargs['start_date'] >= kwargs['end_date']:
-                    raise ValueError("Start date must be before end date")
+            self._validate_fields(kwargs)
             
             # Обновляем в базе данных
-            return self.db_manager.update_project(project_id, **kwargs)
+            previous = self._previous(project_id)
+            updated = self.db_manager.update_project(project_id, **kwargs)
+            if updated:
+                self._publish(UPDATED, project_id, kwargs, previous)
+            return updated
             
         except Exception as e:
             print(f"Error updating project: {e}")
             return False
     
+    @staticmethod
+    def _validate_fields(fields: Dict[str, Any]):
+        """Проверить статус и порядок дат среди изменяемых полей проекта"""
+        if 'status' in fields and fields['status'] not in PROJECT_STATUSES:
+            raise ValueError("Invalid status")
+        
+        # Валидация дат
+        if 'start_date' in fields and 'end_date' in fields:
+            if fields['start_date'] >= fields['end_date']:
+                raise ValueError("Start date must be before end date")
+    
     def delete_project(self, project_id: int) -> bool:
         """Удалить проект"""
         try:
-            return self.db_manager.delete_project(project_id)
+            previous = self._previous(project_id)
+            deleted = self.db_manager.delete_project(project_id)
+            if deleted:
+                self._publish(DELETED, project_id, {}, previous)
+            return deleted
         except Exception as e:
             print(f"Error deleting project: {e}")
             return False
     
-    def update_project_status(self, project_id: int, new_status: str) -> bool:
-        """Обновить статус проекта"""
+    def update_project_status(self, project_id: int, new_status: str,
+                              expected_status: Optional[str] = None) -> bool:
+        """Обновить статус проекта (с expected_status - только из этого статуса)"""
         try:
-            # Получаем проект
-            project = self.get_project(project_id)
-            if not project:
+            if new_status not in PROJECT_STATUSES:
                 return False
             
-            # Обновляем статус в объекте
-            if project.update_status(new_status):
-                # Обновляем в базе данных
-                return self.db_manager.update_project(project_id, status=new_status)
-            return False
+            previous = self._previous(project_id)
+            updated = self.db_manager.update_project(project_id, expected_status=expected_status,
+                                                     status=new_status)
+            if updated:
+                self._publish(UPDATED, project_id, {'status': new_status}, previous)
+            return updated
             
         except Exception as e:
             print(f"Error updating project status: {e}")
             return False
     
+    def _previous(self, project_id: int) -> Optional[Dict[str, Any]]:
+        """Проект до изменения для события (читается, только если подключена шина)"""
+        if self.events is None:
+            return None
+        return self.db_manager.get_project_by_id(project_id)
+    
+    def _publish(self, action: str, project_id: int, changes: Dict[str, Any],
+                 previous: Optional[Dict[str, Any]] = None):
+        """Опубликовать изменение проекта в шине событий после фиксации изменений"""
+        if self.events is not None:
+            event = ChangeEvent(PROJECT, action, project_id, changes, previous)
+            self.db_manager.after_commit(partial(self.events.publish, event))
+    
     def get_project_progress(self, project_id: int) -> Dict[str, Any]:
         """Получить прогресс проекта"""
         try:
@@ -116,3 +162,15 @@ class ProjectController:
         except Exception as e:
             print(f"Error getting project progress: {e}")
             return {'total_tasks': 0, 'completed_tasks': 0, 'progress': 0}
+    
+    def get_projects_with_progress(self) -> List[Tuple[Project, Dict[str, Any]]]:
+        """Получить все проекты вместе с прогрессом (один запрос к базе)"""
+        try:
+            rows = self.db_manager.get_all_project_progress()
+            return [(Project.from_dict(row), {'total_tasks': row['total_tasks'],
+                                              'completed_tasks': row['completed_tasks'],
+                                              'progress': row['progress']})
+                    for row in rows]
+        except Exception as e:
+            print(f"Error getting projects with progress: {e}")
+            return []
@@ -1,11 +1,29 @@
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from functools import partial
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable
 from models.task import Task
-from database.database_manager import DatabaseManager
+from models.task_batch import TaskBatch
+from database.database_manager import DatabaseManager, TASK_FIELDS, TASK_STATUSES
+from database.pagination import iter_pages, task_key
+from controllers.deadline_scheduler import DeadlineScheduler
+from controllers.events import EventBus, ChangeEvent, TASK, ADDED, UPDATED, DELETED
+
+# Создание Task из кортежа строки (быстрый путь, fast=True)
+task_from_row = Task.row_mapper(TASK_FIELDS)
 
 class TaskController:
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager,
+                 scheduler: Optional[DeadlineScheduler] = None,
+                 events: Optional[EventBus] = None):
         self.db_manager = db_manager
+        # Планировщик сроков, который обновляется при изменении задач
+        self.scheduler = scheduler
+        # Шина, в которую публикуются изменения задач (ChangeEvent)
+        self.events = events
+    
+    def transaction(self):
+        """Общая транзакция для нескольких операций (см. DatabaseManager.transaction)"""
+        return self.db_manager.transaction()
     
     def add_task(self, title: str, description: str, priority: int, due_date, 
                  project_id: int, assignee_id: int) -> Optional[Task]:
@@ -28,6 +46,8 @@ class TaskController:
             # Добавляем в базу данных
             task_id = self.db_manager.add_task(task)
             task.id = task_id
+            self._track_deadlines([task])
+            self._publish_added([task])
             
             return task
             
@@ -35,6 +55,27 @@ class TaskController:
             print(f"Error adding task: {e}")
             return None
     
+    def add_tasks(self, tasks_data: List[Dict[str, Any]], chunk_size: int = 1000) -> List[Task]:
+        """Добавить задачи пачкой (словари с аргументами add_task)"""
+        try:
+            # Валидация приоритетов всей пачки до записи в базу
+            invalid = [data['title'] for data in tasks_data if data['priority'] not in [1, 2, 3]]
+            if invalid:
+                raise ValueError(f"Priority must be 1, 2, or 3 (tasks: {', '.join(invalid)})")
+            
+            tasks = [Task(**data) for data in tasks_data]
+            task_ids = self.db_manager.add_tasks(tasks, chunk_size=chunk_size)
+            for task, task_id in zip(tasks, task_ids):
+                task.id = task_id
+            self._track_deadlines(tasks)
+            self._publish_added(tasks)
+            
+            return tasks
+            
+        except Exception as e:
+            print(f"Error adding tasks: {e}")
+            return []
+    
     def get_task(self, task_id: int) -> Optional[Task]:
         """Получить задачу"""
         try:
@@ -46,41 +87,72 @@ class TaskController:
             print(f"Error getting task: {e}")
             return None
     
-    def get_all_tasks(self) -> List[Task]:
-        """Получить все задачи"""
+    @staticmethod
+    def _to_tasks(tasks_data, fast: bool) -> List[Task]:
+        """Создать задачи из строк базы: кортежей (fast) или словарей"""
+        if fast:
+            return list(map(task_from_row, tasks_data))
+        return [Task.from_dict(data) for data in tasks_data]
+    
+    def get_all_tasks(self, after: Optional[tuple] = None, limit: Optional[int] = None,
+                      fast: bool = False) -> List[Task]:
+        """Получить все задачи (или страницу после ключа after)
+        
+        fast=True читает строки кортежами без промежуточных словарей.
+        """
         try:
-            tasks_data = self.db_manager.get_all_tasks()
-            return [Task.from_dict(data) for data in tasks_data]
+            tasks_data = self.db_manager.get_all_tasks(after=after, limit=limit, as_tuples=fast)
+            return self._to_tasks(tasks_data, fast)
         except Exception as e:
             print(f"Error getting all tasks: {e}")
             return []
     
+    def iter_task_pages(self, page_size: int = 500, **filters) -> Iterator[List[Task]]:
+        """Перебрать задачи страницами (фильтры как в find_tasks)"""
+        try:
+            fetch_page = partial(self.db_manager.find_tasks, **filters)
+            for page in iter_pages(fetch_page, task_key, page_size):
+                yield [Task.from_dict(data) for data in page]
+        except Exception as e:
+            print(f"Error iterating task pages: {e}")
+    
     def update_task(self, task_id: int, **kwargs) -> bool:
-        """Обновить задачу"""
+        """Обновить задачу (False, если задачи нет)"""
         try:
-            # Проверяем существование задачи
-            task = self.get_task(task_id)
-            if not task:
-                return False
-            
             # Валидация данных
-            if 'priority' in kwargs and kwargs['priority'] not in [1, 2, 3]:
-                raise ValueError("Priority must be 1, 2, or 3")
-            
-            if 'status' in kwargs and kwargs['status'] not in ['pending', 'in_progress', 'completed']:
-                raise ValueError("Invalid status")
+            self._validate_fields(kwargs)
             
             # Обновляем в базе данных
-            return self.db_manager.update_task(task_id, **kwargs)
+            previous = self._previous([task_id])
+            updated = self.db_manager.update_task(task_id, **kwargs)
+            if updated:
+                if 'due_date' in kwargs or 'status' in kwargs:
+                    self._sync_deadlines([task_id])
+                self._publish(UPDATED, [task_id], kwargs, previous)
+            return updated
             
         except Exception as e:
             print(f"Error updating task: {e}")
             return False
     
+    @staticmethod
+    def _validate_fields(fields: Dict[str, Any]):
+        """Проверить приоритет и статус среди изменяемых полей задачи"""
+        if 'priority' in fields and fields['priority'] not in [1, 2, 3]:
+            raise ValueError("Priority must be 1, 2, or 3")
+        
+        if 'status' in fields and fields['status'] not in TASK_STATUSES:
+            raise ValueError("Invalid status")
+    
     def delete_task(self, task_id: int) -> bool:
         """Удалить задачу"""
         try:
-            return self.db_manager.delete_task(task_id)
+            previous = self._previous([task_id])
+            deleted = self.db_manager.delete_task(task_id)
+            self._forget_deadlines([task_id])
+            if deleted:
+                self._publish(DELETED, [task_id], {}, previous)
+            return deleted
         except Exception as e:
             print(f"Error deleting task: {e}")
             return False
@@ -94,47 +166,206 @@ class TaskController:
             print(f"Error searching tasks: {e}")
             return []
     
-    def update_task_status(self, task_id: int, new_status: str) -> bool:
-        """Обновить статус задачи"""
+    def find_tasks(self, fast: bool = False, **filters) -> List[Task]:
+        """Найти задачи по фильтрам (см. DatabaseManager.find_tasks)"""
+        try:
+            tasks_data = self.db_manager.find_tasks(as_tuples=fast, **filters)
+            return self._to_tasks(tasks_data, fast)
+        except Exception as e:
+            print(f"Error finding tasks: {e}")
+            return []
+    
+    def get_task_batch(self, **filters) -> TaskBatch:
+        """Получить задачи в столбцовом наборе TaskBatch (фильтры как в find_tasks)"""
         try:
-            # Получаем задачу
-            task = self.get_task(task_id)
-            if not task:
+            return TaskBatch.from_rows(self.db_manager.iter_task_columns(**filters))
+        except Exception as e:
+            print(f"Error getting task batch: {e}")
+            return TaskBatch()
+    
+    def get_task_listing(self, **filters) -> List[Dict[str, Any]]:
+        """Получить строки для списка задач (с проектом и исполнителем)
+        
+        Фильтры и fresh=True (в обход кэша) - как в DatabaseManager.get_task_listing.
+        """
+        try:
+            return self.db_manager.get_task_listing(**filters)
+        except Exception as e:
+            print(f"Error getting task listing: {e}")
+            return []
+    
+    def update_task_status(self, task_id: int, new_status: str,
+                           expected_status: Optional[str] = None) -> bool:
+        """Обновить статус задачи
+        
+        С expected_status статус меняется, только если текущий равен expected_status:
+        так два пользователя не перезапишут изменения друг друга.
+        """
+        try:
+            if new_status not in TASK_STATUSES:
                 return False
             
-            # Обновляем статус в объекте
-            if task.update_status(new_status):
-                # Обновляем в базе данных
-                return self.db_manager.update_task(task_id, status=new_status)
-            return False
+            # Одним запросом: отсутствие задачи или другой статус дают False
+            previous = self._previous([task_id])
+            updated = self.db_manager.update_task(task_id, expected_status=expected_status,
+                                                  status=new_status)
+            if updated:
+                self._sync_deadlines([task_id])
+                self._publish(UPDATED, [task_id], {'status': new_status}, previous)
+            return updated
             
         except Exception as e:
             print(f"Error updating task status: {e}")
             return False
     
-    def get_overdue_tasks(self) -> List[Task]:
+    def update_task_status_many(self, new_status: str, ids: Optional[Iterable[int]] = None,
+                                **filters) -> List[int]:
+        """Перевести задачи в статус new_status одним запросом
+        
+        Задачи задаются списком ids и/или фильтрами find_tasks, например
+        update_task_status_many('completed', status='in_progress', project_id=1).
+        Возвращает ID измененных задач.
+        """
+        try:
+            if new_status not in TASK_STATUSES:
+                raise ValueError("Invalid status")
+            # ids читаются дважды (прежние значения и запись), генератор - только один раз
+            ids = list(ids) if ids is not None else None
+            with self.transaction():
+                previous = self._previous(ids, **filters)
+                task_ids = self.db_manager.update_task_status_many(new_status, ids, **filters)
+            if new_status == 'completed':
+                self._forget_deadlines(task_ids)
+            else:
+                self._sync_deadlines(task_ids)
+            self._publish(UPDATED, task_ids, {'status': new_status}, previous)
+            return task_ids
+        except Exception as e:
+            print(f"Error updating task statuses: {e}")
+            return []
+    
+    def reassign_tasks(self, from_user_id: int, to_user_id: Optional[int],
+                       ids: Optional[Iterable[int]] = None, **filters) -> List[int]:
+        """Передать задачи одного исполнителя другому (ID переданных задач)
+        
+        from_user_id=None передает задачи без исполнителя.
+        """
+        try:
+            ids = list(ids) if ids is not None else None
+            if from_user_id is None:
+                owner = {'unassigned': True}
+            else:
+                owner = {'assignee_id': from_user_id}
+            with self.transaction():
+                previous = self._previous(ids, **owner, **filters)
+                task_ids = self.db_manager.reassign_tasks(from_user_id, to_user_id, ids, **filters)
+            self._publish(UPDATED, task_ids, {'assignee_id': to_user_id}, previous)
+            return task_ids
+        except Exception as e:
+            print(f"Error reassigning tasks: {e}")
+            return []
+    
+    def delete_tasks(self, ids: Optional[Iterable[int]] = None, **filters) -> List[int]:
+        """Удалить задачи по списку ids и/или фильтрам (ID удаленных задач)"""
+        try:
+            ids = list(ids) if ids is not None else None
+            with self.transaction():
+                previous = self._previous(ids, **filters)
+                task_ids = self.db_manager.delete_tasks(ids, **filters)
+            self._forget_deadlines(task_ids)
+            self._publish(DELETED, task_ids, {}, previous)
+            return task_ids
+        except Exception as e:
+            print(f"Error deleting tasks: {e}")
+            return []
+    
+    def _previous(self, ids: Optional[List[int]], **filters) -> Dict[int, Dict[str, Any]]:
+        """Задачи до изменения для событий (читаются, только если подключена шина)"""
+        if self.events is None or (ids is None and not filters):
+            return {}
+        if ids is not None and len(ids) == 1 and not filters:
+            # Одна задача - из кэша записей
+            row = self.db_manager.get_task_by_id(ids[0])
+            return {ids[0]: row} if row else {}
+        return {row['id']: row for row in self.db_manager.find_tasks(ids=ids, **filters)}
+    
+    def _publish(self, action: str, task_ids: Iterable[int], changes: Dict[str, Any],
+                 previous: Optional[Dict[int, Dict[str, Any]]] = None):
+        """Опубликовать изменения задач в шине событий (если она подключена)"""
+        if self.events is not None:
+            previous = previous or {}
+            self._publish_events([ChangeEvent(TASK, action, task_id, changes,
+                                              previous.get(task_id))
+                                  for task_id in task_ids])
+    
+    def _publish_added(self, tasks: List[Task]):
+        """Опубликовать добавление задач (changes - все поля задачи)"""
+        if self.events is not None:
+            self._publish_events([ChangeEvent(TASK, ADDED, task.id, task.to_dict())
+                                  for task in tasks])
+    
+    def _publish_events(self, events: List[ChangeEvent]):
+        """Передать события в шину после фиксации изменений
+        
+        Внутри транзакции события копятся до COMMIT и отбрасываются при откате.
+        """
+        if events:
+            self.db_manager.after_commit(partial(self.events.publish, *events))
+    
+    def _track_deadlines(self, tasks: List[Task]):
+        """Передать планировщику сроки новых задач (если он подключен)"""
+        if self.scheduler is not None:
+            self._schedule(self.scheduler.track,
+                           [(task.id, task.due_date, task.status) for task in tasks])
+    
+    def _sync_deadlines(self, task_ids: Iterable[int]):
+        """Передать планировщику новые сроки и статусы задач (если он подключен)"""
+        if self.scheduler is not None:
+            self._schedule(self.scheduler.refresh, [(task_id,) for task_id in task_ids])
+    
+    def _forget_deadlines(self, task_ids: Iterable[int]):
+        """Убрать удаленные или завершенные задачи из планировщика"""
+        if self.scheduler is not None:
+            self._schedule(self.scheduler.discard, [(task_id,) for task_id in task_ids])
+    
+    def _schedule(self, method: Callable, calls: List[tuple]):
+        """Вызвать метод планировщика для каждой задачи после фиксации изменений
+        
+        Как и события, внутри транзакции вызовы копятся до COMMIT и
+        отбрасываются при откате, поэтому планировщик не видит несохраненных задач.
+        """
+        if calls:
+            self.db_manager.after_commit(partial(self._call_each, method, calls))
+    
+    @staticmethod
+    def _call_each(method: Callable, calls: List[tuple]):
+        """Вызвать method(*args) для каждого набора аргументов"""
+        for args in calls:
+            method(*args)
+    
+    def get_overdue_tasks(self, fast: bool = False) -> List[Task]:
         """Получить просроченные задачи"""
         try:
-            tasks_data = self.db_manager.get_overdue_tasks()
-            return [Task.from_dict(data) for data in tasks_data]
+            tasks_data = self.db_manager.get_overdue_tasks(as_tuples=fast)
+            return self._to_tasks(tasks_data, fast)
         except Exception as e:
             print(f"Error getting overdue tasks: {e}")
             return []
     
-    def get_tasks_by_project(self, project_id: int) -> List[Task]:
+    def get_tasks_by_project(self, project_id: int, fast: bool = False) -> List[Task]:
         """Получить задачи проекта"""
         try:
-            tasks_data = self.db_manager.get_tasks_by_project(project_id)
-            return [Task.from_dict(data) for data in tasks_data]
+            tasks_data = self.db_manager.get_tasks_by_project(project_id, as_tuples=fast)
+            return self._to_tasks(tasks_data, fast)
         except Exception as e:
             print(f"Error getting tasks by project: {e}")
             return []
     
-    def get_tasks_by_user(self, user_id: int) -> List[Task]:
+    def get_tasks_by_user(self, user_id: int, fast: bool = False) -> List[Task]:
         """Получить задачи пользователя"""
         try:
-            tasks_data = self.db_manager.get_tasks_by_user(user_id)
-            return [Task.from_dict(data) for data in tasks_data]
+            tasks_data = self.db_manager.get_tasks_by_user(user_id, as_tuples=fast)
+            return self._to_tasks(tasks_data, fast)
         except Exception as e:
             print(f"Error getting tasks by user: {e}")
             return []
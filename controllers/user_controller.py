@@ -1,10 +1,23 @@
-from typing import List, Dict, Any, Optional
+from functools import partial
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+from models.dates import parse_datetime
 from models.user import User
-from database.database_manager import DatabaseManager
+from database.database_manager import DatabaseManager, USER_FIELDS, TASK_STATUSES
+from database.pagination import iter_pages, id_key
+from controllers.events import EventBus, ChangeEvent, USER, ADDED, UPDATED, DELETED
+
+# Создание User из кортежа строки (быстрый путь, fast=True)
+user_from_row = User.row_mapper(USER_FIELDS)
 
 class UserController:
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, events: Optional[EventBus] = None):
         self.db_manager = db_manager
+        # Шина, в которую публикуются изменения пользователей (ChangeEvent)
+        self.events = events
+    
+    def transaction(self):
+        """Общая транзакция для нескольких операций (см. DatabaseManager.transaction)"""
+        return self.db_manager.transaction()
     
     def add_user(self, username: str, email: str, role: str) -> Optional[User]:
         """Добавить пользователя"""
@@ -23,6 +36,7 @@ class UserController:
             # Добавляем в базу данных
             user_id = self.db_manager.add_user(user)
             user.id = user_id
+            self._publish(ADDED, user.id, user.to_dict())
             
             return user
             
@@ -41,36 +55,61 @@ class UserController:
             print(f"Error getting user: {e}")
             return None
     
-    def get_all_users(self) -> List[User]:
-        """Получить всех пользователей"""
+    def get_all_users(self, after: Optional[int] = None, limit: Optional[int] = None,
+                      fast: bool = False) -> List[User]:
+        """Получить всех пользователей (или страницу после ID after)"""
         try:
-            users_data = self.db_manager.get_all_users()
+            users_data = self.db_manager.get_all_users(after=after, limit=limit, as_tuples=fast)
+            if fast:
+                return list(map(user_from_row, users_data))
             return [User.from_dict(data) for data in users_data]
         except Exception as e:
             print(f"Error getting all users: {e}")
             return []
     
+    def iter_user_pages(self, page_size: int = 500) -> Iterator[List[User]]:
+        """Перебрать пользователей страницами"""
+        try:
+            for page in iter_pages(self.db_manager.get_all_users, id_key, page_size):
+                yield [User.from_dict(data) for data in page]
+        except Exception as e:
+            print(f"Error iterating user pages: {e}")
+    
+    def get_users_with_task_counts(self, by_status: bool = False) -> List[Tuple[User, Any]]:
+        """Получить всех пользователей с числом их задач
+        
+        Число задач - целое, а с by_status - словарь {статус: количество}.
+        Задачи считаются одной группировкой, их строки не загружаются.
+        """
+        try:
+            counts = self.db_manager.get_task_counts_by_user(by_status=by_status)
+            empty = dict.fromkeys(TASK_STATUSES, 0) if by_status else 0
+            return [(user, counts.get(user.id, empty)) for user in self.get_all_users(fast=True)]
+        except Exception as e:
+            print(f"Error getting users with task counts: {e}")
+            return []
+    
+    def get_task_counts(self, user_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+        """Получить число задач исполнителей {user_id: количество} (всех или user_ids)"""
+        try:
+            return self.db_manager.get_task_counts_by_user(user_ids=user_ids)
+        except Exception as e:
+            print(f"Error getting task counts: {e}")
+            return {}
+    
     def update_user(self, user_id: int, **kwargs) -> bool:
-        """Обновить пользователя"""
+        """Обновить пользователя (False, если пользователя нет)"""
         try:
-            # Проверяем существование пользователя
-            user = self.get_user(user_id)
-            if not user:
-                return False
-            
             # Валидация данных
             if 'role' in kwargs and kwargs['role'] not in ['admin', 'manager', 'developer']:
                 raise ValueError("Invalid role")
             
-            # Обновляем в объекте
-            user.update_info(
-                username=kwargs.get('username'),
-                email=kwargs.get('email'),
-                role=kwargs.get('role')
-            )
-            
             # Обновляем в базе данных
-            return self.db_manager.update_user(user_id, **kwargs)
+            previous = self._previous(user_id)
+            updated = self.db_manager.update_user(user_id, **kwargs)
+            if updated:
+                self._publish(UPDATED, user_id, kwargs, previous)
+            return updated
             
         except Exception as e:
             print(f"Error updating user: {e}")
@@ -79,38 +118,50 @@ class UserController:
     def delete_user(self, user_id: int) -> bool:
         """Удалить пользователя"""
         try:
-            return self.db_manager.delete_user(user_id)
+            previous = self._previous(user_id)
+            deleted = self.db_manager.delete_user(user_id)
+            if deleted:
+                self._publish(DELETED, user_id, {}, previous)
+            return deleted
         except Exception as e:
             print(f"Error deleting user: {e}")
             return False
     
-    def get_user_tasks(self, user_id: int) -> List[Dict[str, Any]]:
-        """Получить задачи пользователя"""
+    def _previous(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Пользователь до изменения для события (читается, только если подключена шина)"""
+        if self.events is None:
+            return None
+        return self.db_manager.get_user_by_id(user_id)
+    
+    def _publish(self, action: str, user_id: int, changes: Dict[str, Any],
+                 previous: Optional[Dict[str, Any]] = None):
+        """Опубликовать изменение пользователя в шине событий после фиксации изменений"""
+        if self.events is not None:
+            event = ChangeEvent(USER, action, user_id, changes, previous)
+            self.db_manager.after_commit(partial(self.events.publish, event))
+    
+    def get_user_tasks(self, user_id: int,
+                       fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Получить задачи пользователя с названием проекта (project_name)
+        
+        fields - нужные поля задачи (по умолчанию все поля Task.to_dict).
+        """
         try:
-            # Получаем пользователя
-            user = self.get_user(user_id)
-            if not user:
-                return []
-            
-            # Получаем задачи пользователя
-            from controllers.task_controller import TaskController
-            task_controller = TaskController(self.db_manager)
-            tasks = task_controller.get_tasks_by_user(user_id)
-            
-            # Формируем результат
-            result = []
-            for task in tasks:
-                task_dict = task.to_dict()
-                
-                # Получаем информацию о проекте
-                project_data = self.db_manager.get_project_by_id(task.project_id)
-                if project_data:
-                    task_dict['project_name'] = project_data['name']
-                
-                result.append(task_dict)
-            
-            return result
-            
+            rows = self.db_manager.get_user_task_rows(user_id, fields)
+            return [self._format_task_row(row) for row in rows]
         except Exception as e:
             print(f"Error getting user tasks: {e}")
             return []
+    
+    @staticmethod
+    def _format_task_row(row: Dict[str, Any]) -> Dict[str, Any]:
+        """Строка задачи пользователя в виде словаря Task.to_dict с project_name"""
+        task_dict = dict(row)
+        # Даты в формате Task.to_dict (в базе могут быть секунды от эпохи)
+        for field in ('due_date', 'created_at'):
+            if field in task_dict:
+                task_dict[field] = parse_datetime(task_dict[field]).strftime('%Y-%m-%d %H:%M:%S')
+        # Как и раньше, project_name только у задач с проектом
+        if task_dict.get('project_name', '') is None:
+            del task_dict['project_name']
+        return task_dict
@@ -1,4 +1,7 @@
 # Пакет для работы с базой данных
 from .database_manager import DatabaseManager
+from .pagination import iter_pages, task_key, id_key
+from .cache import LRUCache, QueryCache
 
-__all__ = ['DatabaseManager']
+__all__ = ['DatabaseManager', 'iter_pages', 'task_key', 'id_key', 'LRUCache',
+           'QueryCache']
@@ -0,0 +1,147 @@
+# Кэши слоя базы данных: записи по ключу (LRU) и результаты запросов
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """Кэш на capacity записей со счетчиками попаданий, промахов и вытеснений
+    
+    При capacity = 0 кэш отключен: значения не сохраняются, считаются только
+    промахи. Операции защищены блокировкой, поэтому кэш можно использовать
+    из нескольких потоков (режим пула DatabaseManager).
+    
+    version увеличивается при каждом удалении значений. Значение, прочитанное
+    из базы до удаления, не попадет в кэш, если передать put прежнюю версию.
+    """
+    
+    def __init__(self, capacity: int = 1024):
+        if capacity < 0:
+            raise ValueError("Cache capacity must be non-negative")
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.version = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Значение по ключу (None, если его нет в кэше)"""
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: Hashable, value: Any, version: Optional[int] = None):
+        """Сохранить значение, вытеснив самое давнее при переполнении
+        
+        Если задана version и с тех пор значения удалялись, значение не сохраняется.
+        """
+        if not self.capacity:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._items[key] = value
+            self._items.move_to_end(key)
+            if len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+                self.evictions += 1
+    
+    def discard(self, key: Hashable):
+        """Удалить значение из кэша (если оно есть)"""
+        with self._lock:
+            self._items.pop(key, None)
+            self.version += 1
+    
+    def clear(self):
+        """Удалить все значения (счетчики сохраняются)"""
+        with self._lock:
+            self._items.clear()
+            self.version += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики кэша и доля попаданий"""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'capacity': self.capacity,
+                'size': len(self._items),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / requests if requests else 0.0,
+            }
+
+
+class QueryCache:
+    """Кэш результатов запросов с проверкой версий таблиц
+    
+    Запись хранит версии таблиц, из которых прочитан результат. Любая запись
+    в таблицу увеличивает ее версию (bump), и зависящие от нее результаты
+    перестают выдаваться. Для запросов, зависящих от текущего времени,
+    задается ttl - срок жизни результата в секундах.
+    """
+    
+    def __init__(self, capacity: int = 256):
+        self.entries = LRUCache(capacity)
+        self.stale = 0
+        self._versions = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def capacity(self) -> int:
+        return self.entries.capacity
+    
+    def version(self, tables) -> tuple:
+        """Текущие версии таблиц"""
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+    
+    def bump(self, *tables: str):
+        """Отметить изменение таблиц"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Результат по ключу, если таблицы не менялись и срок жизни не истек"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        tables, versions, expires_at, result = entry
+        if versions != self.version(tables) or (expires_at and expires_at < time.monotonic()):
+            self.stale += 1
+            self.entries.discard(key)
+            return None
+        return result
+    
+    def put(self, key: Hashable, result: Any, tables, versions: tuple,
+            ttl: Optional[float] = None):
+        """Сохранить результат, прочитанный при версиях таблиц versions"""
+        expires_at = time.monotonic() + ttl if ttl else None
+        self.entries.put(key, (tuple(tables), versions, expires_at, result))
+    
+    def clear(self):
+        """Удалить все результаты"""
+        self.entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики кэша (stale - результаты, отброшенные из-за изменений или ttl)"""
+        stats = self.entries.stats()
+        # Устаревший результат найден в LRUCache, но для вызывающего это промах
+        stats['hits'] -= self.stale
+        stats['misses'] += self.stale
+        requests = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / requests if requests else 0.0
+        stats['stale'] = self.stale
+        return stats
@@ -1,25 +1,544 @@
+import re
 import sqlite3
+import threading
+import weakref
+from calendar import timegm
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from itertools import islice
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable
+
+from .cache import LRUCache, QueryCache
+
+# Столбцы, заполняемые при вставке записей (в порядке параметров INSERT)
+USER_COLUMNS = ('username', 'email', 'role', 'registration_date')
+PROJECT_COLUMNS = ('name', 'description', 'start_date', 'end_date', 'status', 'created_at')
+TASK_COLUMNS = ('title', 'description', 'priority', 'status', 'due_date',
+                'project_id', 'assignee_id', 'created_at')
+
+# Столбцы, возвращаемые списками записей (порядок значений в кортежах при as_tuples)
+USER_FIELDS = ('id',) + USER_COLUMNS
+PROJECT_FIELDS = ('id',) + PROJECT_COLUMNS
+TASK_FIELDS = ('id',) + TASK_COLUMNS
+
+# Столбцы iter_task_columns (заполнение TaskBatch): срок в секундах от эпохи
+TASK_BATCH_FIELDS = ('id', 'title', 'priority', 'status', 'due_epoch')
+
+# Форматы хранения дат по имени столбца
+DATE_FORMATS = {
+    'start_date': '%Y-%m-%d',
+    'end_date': '%Y-%m-%d',
+    'due_date': '%Y-%m-%d %H:%M:%S',
+    'created_at': '%Y-%m-%d %H:%M:%S',
+    'registration_date': '%Y-%m-%d %H:%M:%S',
+}
+
+# Версии схемы (PRAGMA user_version). Начиная с SCHEMA_EPOCH_DATES даты со
+# временем хранятся целыми секундами от эпохи (дата без часового пояса
+# считается UTC), а не строками DATE_FORMATS
+SCHEMA_TEXT_DATES = 0
+SCHEMA_EPOCH_DATES = 1
+EPOCH_DATE_COLUMNS = {
+    'users': ('registration_date',),
+    'projects': ('created_at',),
+    'tasks': ('due_date', 'created_at'),
+}
+EPOCH_DATE_FIELDS = {column for columns in EPOCH_DATE_COLUMNS.values() for column in columns}
+
+# Профили настроек соединения (PRAGMA). Все профили используют WAL, чтобы
+# читатели не блокировались пишущей транзакцией; различаются надежность
+# фиксации и объем памяти под кэш.
+CONNECTION_PROFILES = {
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -8000,
+        'temp_store': 'DEFAULT',
+        'mmap_size': 0,
+        'busy_timeout': 5000,
+    },
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -32000,
+        'temp_store': 'MEMORY',
+        'mmap_size': 64 * 1024 * 1024,
+        'busy_timeout': 5000,
+    },
+    'fast-bulk': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -128000,
+        'temp_store': 'MEMORY',
+        'mmap_size': 256 * 1024 * 1024,
+        'busy_timeout': 10000,
+    },
+}
+
+# Статусы задач и проектов (как в CHECK таблиц tasks и projects)
+TASK_STATUSES = ('pending', 'in_progress', 'completed')
+PROJECT_STATUSES = ('active', 'completed', 'on_hold')
+
+# Ключ сортировки задач; по нему же строится постраничная выборка
+TASK_ORDER = ('t.due_date', 't.priority', 't.id')
+
+# Таблица, которую изменяет запрос (по ней сбрасываются результаты в кэше запросов)
+WRITE_TABLE = re.compile(
+    r'\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)'
+    r'\s+(\w+)',
+    re.IGNORECASE,
+)
+
+# Управляемые индексы таблицы задач: имя -> определение.
+# При старте индексы создаются, а изменившиеся определения пересоздаются.
+TASK_INDEXES = {
+    'idx_tasks_due': '(due_date, priority)',
+    'idx_tasks_project_due': '(project_id, due_date, priority)',
+    'idx_tasks_assignee_due': '(assignee_id, due_date, priority)',
+    'idx_tasks_open_due': "(due_date, priority) WHERE status != 'completed'",
+}
+
+# Полнотекстовый индекс задач и триггеры, синхронизирующие его с таблицей tasks
+TASK_SEARCH_TRIGGERS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    ''',
+)
+
+# Счетчики задач по проектам и исполнителям: область task_stats -> столбец tasks
+TASK_STATS_SCOPES = {'project': 'project_id', 'user': 'assignee_id'}
+
+
+def _task_stats_statements(row: str) -> str:
+    """Тело триггера task_stats: учесть задачу new или вычесть задачу old"""
+    statements = []
+    for scope, column in TASK_STATS_SCOPES.items():
+        if row == 'new':
+            flags = ', '.join(f"{row}.status IS '{status}'" for status in TASK_STATUSES)
+            updates = ', '.join(f'{status} = {status} + excluded.{status}'
+                                for status in TASK_STATUSES)
+            statements.append(f'''
+        INSERT INTO task_stats (scope, owner_id, total, {', '.join(TASK_STATUSES)})
+        SELECT '{scope}', {row}.{column}, 1, {flags}
+        WHERE {row}.{column} IS NOT NULL
+        ON CONFLICT (scope, owner_id) DO UPDATE SET total = total + 1, {updates};''')
+        else:
+            updates = ', '.join(f"{status} = {status} - ({row}.status IS '{status}')"
+                                for status in TASK_STATUSES)
+            statements.append(f'''
+        UPDATE task_stats SET total = total - 1, {updates}
+        WHERE scope = '{scope}' AND owner_id = {row}.{column};''')
+    return ''.join(statements)
+
+
+TASK_STATS_TRIGGERS = (
+    f'''
+    CREATE TRIGGER IF NOT EXISTS task_stats_ai AFTER INSERT ON tasks BEGIN
+        {_task_stats_statements('new')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS task_stats_ad AFTER DELETE ON tasks BEGIN
+        {_task_stats_statements('old')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS task_stats_au
+    AFTER UPDATE OF status, project_id, assignee_id ON tasks BEGIN
+        {_task_stats_statements('old')}
+        {_task_stats_statements('new')}
+    END
+    ''',
+)
+
+
+class _ThreadConnection:
+    """Соединение рабочего потока в режиме пула
+    
+    Хранится в threading.local потока: когда поток завершается и его данные
+    удаляются, финализатор закрывает соединение и убирает его из пула.
+    """
+    
+    def __init__(self, connection: sqlite3.Connection, connections: list,
+                 lock: threading.Lock):
+        self.connection = connection
+        self.release = weakref.finalize(self, _close_pooled, connection, connections, lock)
+
+
+def _close_pooled(connection: sqlite3.Connection, connections: list, lock: threading.Lock):
+    """Закрыть соединение потока и убрать его из списка соединений менеджера"""
+    with lock:
+        if connection in connections:
+            connections.remove(connection)
+    connection.close()
+
 
 class DatabaseManager:
-    def __init__(self, db_path: str = 'tasks.db'):
+    def __init__(self, db_path: str = 'tasks.db', profile: str = 'balanced',
+                 pooled: bool = False, epoch_dates: bool = False, cache_size: int = 1024,
+                 query_cache_size: int = 256, time_cache_ttl: Optional[float] = 30.0):
+        """
+        pooled=True включает режим пула: у каждого потока свое соединение
+        и свои транзакции, поэтому менеджер можно вызывать из рабочих потоков.
+        Соединение потока закрывается, когда поток завершается (или раньше,
+        через release_connection).
+        epoch_dates=True переводит базу на хранение дат секундами от эпохи
+        (существующие записи переносятся, см. migrate_to_epoch_dates).
+        cache_size - число записей в кэше get_*_by_id (0 отключает кэш).
+        query_cache_size - число результатов списков и сводок в кэше запросов,
+        time_cache_ttl - сколько секунд хранить результаты, зависящие от
+        текущего времени (просроченные задачи); None - не кэшировать их.
+        """
+        if profile not in CONNECTION_PROFILES:
+            raise ValueError(f"Unknown connection profile: {profile}")
+        if pooled and db_path == ':memory:':
+            raise ValueError("In-memory database cannot be shared between connections")
         self.db_path = db_path
+        self.profile = profile
+        self.pooled = pooled
         self.connection = None
         self.cursor = None
+        self.fts_enabled = False
+        self.epoch_dates = False
+        self.cache = LRUCache(cache_size)
+        self.query_cache = QueryCache(query_cache_size)
+        self.time_cache_ttl = time_cache_ttl
+        self._local = threading.local()
+        self._connections = []
+        self._pool_lock = threading.Lock()
         self.connect()
         self.create_tables()
+        self._upgrade_schema(epoch_dates)
     
     def connect(self):
         """Установить соединение с базой данных"""
-        self.connection = sqlite3.connect(self.db_path)
-        self.connection.row_factory = sqlite3.Row  # Для доступа к столбцам по имени
+        self.connection = self._open_connection()
         self.cursor = self.connection.cursor()
+        if self.pooled:
+            self._local.connection = self.connection
+    
+    def _open_connection(self) -> sqlite3.Connection:
+        """Открыть новое соединение с настройками активного профиля"""
+        # В режиме пула соединение принадлежит одному потоку, но закрывает
+        # все соединения close(), поэтому проверка потока отключается
+        connection = sqlite3.connect(self.db_path, check_same_thread=not self.pooled)
+        connection.row_factory = sqlite3.Row  # Для доступа к столбцам по имени
+        self._apply_profile(connection)
+        with self._pool_lock:
+            self._connections.append(connection)
+        return connection
+    
+    def _get_connection(self) -> sqlite3.Connection:
+        """Соединение текущего потока (в режиме пула создается при первом обращении)"""
+        if not self.pooled:
+            return self.connection
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            owner = _ThreadConnection(self._open_connection(), self._connections,
+                                      self._pool_lock)
+            self._local.owner = owner
+            self._local.connection = connection = owner.connection
+        return connection
+    
+    def release_connection(self):
+        """Закрыть соединение текущего потока (в режиме пула)
+        
+        Соединение рабочего потока закрывается само, когда поток завершается;
+        метод нужен потокам, которые живут дольше работы с базой.
+        Следующее обращение из потока откроет новое соединение.
+        """
+        owner = getattr(self._local, 'owner', None)
+        if owner is None:
+            return
+        if self._transaction_depth:
+            raise RuntimeError("Cannot release a connection inside a transaction")
+        del self._local.owner, self._local.connection
+        self._local.__dict__.pop('data_version', None)
+        owner.release()
+    
+    def _execute(self, query: str, params=(), as_tuples: bool = False) -> sqlite3.Cursor:
+        """Выполнить запрос в отдельном курсоре соединения текущего потока"""
+        connection = self._get_connection()
+        if not as_tuples:
+            cursor = connection.execute(query, params)
+        else:
+            cursor = connection.cursor()
+            cursor.row_factory = None  # Обычные кортежи без обертки sqlite3.Row
+            cursor.execute(query, params)
+        write = WRITE_TABLE.match(query)
+        if write:
+            self._table_changed(write.group(1))
+        return cursor
+    
+    @staticmethod
+    def _rows(cursor: sqlite3.Cursor, as_tuples: bool = False) -> list:
+        """Строки результата: словари или кортежи (если запрос выполнен с as_tuples)"""
+        rows = cursor.fetchall()
+        return rows if as_tuples else [dict(row) for row in rows]
+    
+    def _apply_profile(self, connection):
+        """Применить PRAGMA активного профиля к соединению"""
+        for pragma, value in CONNECTION_PROFILES[self.profile].items():
+            connection.execute(f'PRAGMA {pragma} = {value}')
+    
+    def set_profile(self, profile: str):
+        """Переключить профиль соединений (например, на время импорта)"""
+        if profile not in CONNECTION_PROFILES:
+            raise ValueError(f"Unknown connection profile: {profile}")
+        self.profile = profile
+        with self._pool_lock:
+            connections = list(self._connections)
+        for connection in connections:
+            self._apply_profile(connection)
+    
+    def get_connection_settings(self) -> Dict[str, Any]:
+        """Получить активный профиль и фактические значения его PRAGMA"""
+        settings = {'profile': self.profile, 'pooled': self.pooled}
+        for pragma in CONNECTION_PROFILES[self.profile]:
+            row = self._execute(f'PRAGMA {pragma}').fetchone()
+            settings[pragma] = row[0] if row else None
+        return settings
     
     def close(self):
-        """Закрыть соединение с базой данных"""
-        if self.connection:
-            self.connection.close()
+        """Закрыть все соединения с базой данных"""
+        with self._pool_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for connection in connections:
+            connection.close()
+    
+    @property
+    def _transaction_depth(self) -> int:
+        """Глубина вложенности транзакций в текущем потоке"""
+        return getattr(self._local, 'transaction_depth', 0)
+    
+    @_transaction_depth.setter
+    def _transaction_depth(self, depth: int):
+        self._local.transaction_depth = depth
+    
+    @property
+    def _dirty_keys(self) -> set:
+        """Ключи кэша, измененные в незафиксированной транзакции текущего потока"""
+        keys = getattr(self._local, 'dirty_keys', None)
+        if keys is None:
+            keys = self._local.dirty_keys = set()
+        return keys
+    
+    @property
+    def _dirty_tables(self) -> set:
+        """Таблицы, измененные в незафиксированной транзакции текущего потока"""
+        tables = getattr(self._local, 'dirty_tables', None)
+        if tables is None:
+            tables = self._local.dirty_tables = set()
+        return tables
+    
+    @property
+    def _pending_callbacks(self) -> list:
+        """Вызовы after_commit, ожидающие фиксации транзакции текущего потока"""
+        callbacks = getattr(self._local, 'pending_callbacks', None)
+        if callbacks is None:
+            callbacks = self._local.pending_callbacks = []
+        return callbacks
+    
+    def after_commit(self, callback: Callable[[], None]):
+        """Вызвать callback, когда изменения будут зафиксированы
+        
+        Вне явной транзакции изменения уже зафиксированы, и callback вызывается
+        сразу. Внутри transaction() вызов откладывается до COMMIT внешнего блока
+        и отменяется при откате (при откате вложенного блока - только вызовы,
+        добавленные в нем). Так подписчики не узнают об отмененных изменениях.
+        """
+        if self._transaction_depth:
+            self._pending_callbacks.append(callback)
+        else:
+            callback()
+    
+    @contextmanager
+    def transaction(self):
+        """Выполнить группу операций в одной транзакции
+        
+        Внутри блока методы не фиксируют изменения по отдельности: в конце
+        выполняется один COMMIT, а при исключении - ROLLBACK. Вложенные блоки
+        оформляются точками сохранения (SAVEPOINT) и откатываются независимо.
+        В режиме пула транзакция относится к соединению текущего потока.
+        """
+        connection = self._get_connection()
+        depth = self._transaction_depth
+        pending = len(self._pending_callbacks)
+        self._begin_transaction(connection, depth)
+        self._transaction_depth = depth + 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth = depth
+            self._rollback_transaction(connection, depth)
+            del self._pending_callbacks[pending:]
+            raise
+        
+        self._transaction_depth = depth
+        self._end_transaction(connection, depth)
+    
+    def _begin_transaction(self, connection: sqlite3.Connection, depth: int):
+        """Открыть транзакцию (depth = 0) или точку сохранения вложенного блока"""
+        if depth:
+            connection.execute(f'SAVEPOINT tx_{depth}')
+        elif not connection.in_transaction:
+            connection.execute('BEGIN IMMEDIATE')
+            # До конца транзакции другие соединения не запишут изменений,
+            # поэтому формат дат достаточно проверить один раз
+            self._sync_external_changes()
+    
+    def _rollback_transaction(self, connection: sqlite3.Connection, depth: int):
+        """Откатить транзакцию или изменения вложенного блока"""
+        if depth:
+            connection.execute(f'ROLLBACK TO tx_{depth}')
+            connection.execute(f'RELEASE tx_{depth}')
+            # Ключи остаются в _dirty_keys: изменения внешнего блока еще не зафиксированы
+            for key in self._dirty_keys:
+                self.cache.discard(key)
+        else:
+            connection.rollback()
+            self._flush_dirty()
+    
+    def _end_transaction(self, connection: sqlite3.Connection, depth: int):
+        """Зафиксировать транзакцию или освободить точку сохранения вложенного блока"""
+        if depth:
+            connection.execute(f'RELEASE tx_{depth}')
+            return
+        callbacks, self._local.pending_callbacks = self._pending_callbacks, []
+        connection.commit()
+        self._flush_dirty()
+        for callback in callbacks:
+            callback()
+    
+    def _commit(self):
+        """Зафиксировать изменения, если не открыта явная транзакция"""
+        if not self._transaction_depth:
+            self._get_connection().commit()
+            self._flush_dirty()
+    
+    # ========== Кэш записей по ID ==========
+    
+    def _get_by_id(self, table: str, record_id: int) -> Optional[Dict]:
+        """Получить запись по ID через кэш (возвращается копия записи из кэша)
+        
+        Внутри транзакции кэш не используется, как и в _cached_rows: там видны
+        незафиксированные изменения, которые нельзя раздавать другим потокам
+        и которые может отменить откат точки сохранения.
+        """
+        key = (table, record_id)
+        self._sync_external_changes()
+        in_transaction = self._get_connection().in_transaction
+        data = None if in_transaction else self.cache.get(key)
+        if data is None:
+            version = self.cache.version
+            row = self._execute(f'SELECT * FROM {table} WHERE id = ?', (record_id,)).fetchone()
+            if row is None:
+                return None
+            data = dict(row)
+            if not in_transaction:
+                self.cache.put(key, data, version)
+        return dict(data)
+    
+    def _invalidate(self, table: str, record_id: int):
+        """Убрать запись из кэша сейчас и еще раз после фиксации транзакции
+        
+        Повторное удаление отбрасывает значение, которое другой поток мог
+        прочитать до фиксации изменения. После отката транзакции записи
+        удаляются тоже: в кэш могли попасть незафиксированные значения.
+        """
+        key = (table, record_id)
+        self.cache.discard(key)
+        self._dirty_keys.add(key)
+    
+    def _flush_dirty(self):
+        """Сбросить кэши по записям и таблицам, измененным в завершенной транзакции"""
+        keys = self._dirty_keys
+        while keys:
+            self.cache.discard(keys.pop())
+        tables = self._dirty_tables
+        if tables:
+            self.query_cache.bump(*tables)
+            tables.clear()
+    
+    def _sync_external_changes(self):
+        """Сбросить кэши, если базу изменило другое соединение или процесс
+        
+        PRAGMA data_version меняется после фиксации изменений любым другим
+        соединением, в том числе другим DatabaseManager для того же файла.
+        """
+        version = self._get_connection().execute('PRAGMA data_version').fetchone()[0]
+        previous = getattr(self._local, 'data_version', None)
+        if version != previous:
+            if previous is not None:
+                self.cache.clear()
+                self.query_cache.clear()
+            self._local.data_version = version
+            self._sync_schema_version()
+    
+    def _sync_schema_version(self):
+        """Перейти на даты секундами от эпохи, если базу перевел другой менеджер"""
+        if not self.epoch_dates:
+            version = self._get_connection().execute('PRAGMA user_version').fetchone()[0]
+            self.epoch_dates = version >= SCHEMA_EPOCH_DATES
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Счетчики кэша get_*_by_id: попадания, промахи, вытеснения"""
+        return self.cache.stats()
+    
+    # ========== Кэш результатов запросов ==========
+    
+    def _table_changed(self, table: str):
+        """Сбросить результаты, зависящие от таблицы (и еще раз после фиксации)"""
+        self.query_cache.bump(table)
+        self._dirty_tables.add(table)
+    
+    def _cached_rows(self, query: str, params, tables, as_tuples: bool = False,
+                     timed: bool = False) -> list:
+        """Строки результата через кэш запросов
+        
+        Результат действителен, пока не менялись таблицы tables. timed - результат
+        зависит от текущего времени, переданного первым параметром: оно не входит
+        в ключ, а результат хранится time_cache_ttl секунд. Внутри транзакции кэш
+        не используется, чтобы не раздать другим потокам незафиксированные данные.
+        Возвращаются копии строк-словарей (кортежи as_tuples неизменяемы и общие),
+        поэтому изменения результата не попадают в кэш.
+        """
+        ttl = self.time_cache_ttl if timed else None
+        if (not self.query_cache.capacity or (timed and ttl is None)
+                or self._get_connection().in_transaction):
+            return self._rows(self._execute(query, params, as_tuples), as_tuples)
+        
+        params = tuple(params)
+        key = (query, params[1:] if timed else params, as_tuples)
+        self._sync_external_changes()
+        rows = self.query_cache.get(key)
+        if rows is None:
+            versions = self.query_cache.version(tables)
+            rows = self._rows(self._execute(query, params, as_tuples), as_tuples)
+            self.query_cache.put(key, rows, tables, versions, ttl)
+        return list(rows) if as_tuples else [dict(row) for row in rows]
+    
+    def get_query_cache_stats(self) -> Dict[str, Any]:
+        """Счетчики кэша запросов: попадания, промахи, устаревшие результаты"""
+        return self.query_cache.stats()
     
     def create_tables(self):
         """Создать все необходимые таблицы"""
@@ -27,6 +546,112 @@ class DatabaseManager:
         self.create_project_table()
         self.create_task_table()
     
+    def _upgrade_schema(self, epoch_dates: bool):
+        """Определить формат хранения дат по версии схемы и при необходимости обновить ее"""
+        version = self._execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_EPOCH_DATES:
+            self.epoch_dates = True
+        elif epoch_dates:
+            self.migrate_to_epoch_dates()
+    
+    def migrate_to_epoch_dates(self, chunk_size: int = 5000) -> int:
+        """Перевести даты со временем в секунды от эпохи (схема SCHEMA_EPOCH_DATES)
+        
+        Записи переносятся порциями по chunk_size в отдельных транзакциях, чтобы
+        не держать блокировку записи на всю таблицу. Новые записи сразу пишутся
+        секундами, строки, оставшиеся текстом, подхватываются следующей порцией.
+        Возвращает число перенесенных записей.
+        """
+        self.epoch_dates = True
+        migrated = 0
+        for table, columns in EPOCH_DATE_COLUMNS.items():
+            assignments = ', '.join(
+                f"{column} = CASE WHEN typeof({column}) = 'text' "
+                f"THEN CAST(strftime('%s', {column}) AS INTEGER) ELSE {column} END"
+                for column in columns
+            )
+            pending = ' OR '.join(f"typeof({column}) = 'text'" for column in columns)
+            query = f'''
+            UPDATE {table} SET {assignments}
+            WHERE id IN (SELECT id FROM {table} WHERE {pending} LIMIT ?)
+            '''
+            while True:
+                with self.transaction():
+                    count = self._execute(query, (chunk_size,)).rowcount
+                migrated += count
+                if count < chunk_size:
+                    break
+        with self.transaction():
+            self._execute(f'PRAGMA user_version = {SCHEMA_EPOCH_DATES}')
+        self.cache.clear()
+        return migrated
+    
+    # ========== Вспомогательные методы вставки ==========
+    
+    def _format_value(self, column: str, value):
+        """Привести дату к формату хранения столбца"""
+        date_format = DATE_FORMATS.get(column)
+        if not date_format:
+            return value
+        if self._stores_epoch(column):
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            if hasattr(value, 'timetuple'):
+                return timegm(value.timetuple())
+        elif hasattr(value, 'strftime'):
+            return value.strftime(date_format)
+        return value
+    
+    def _stores_epoch(self, column: str) -> bool:
+        """Хранится ли столбец секундами от эпохи (EPOCH_DATE_FIELDS после миграции)
+        
+        Вне транзакции версия схемы перечитывается, если базу изменило другое
+        соединение: миграция другим менеджером не должна оставить здесь запись
+        дат текстом. В транзакции версию уже проверил _begin_transaction.
+        """
+        if column not in EPOCH_DATE_FIELDS:
+            return False
+        if not self.epoch_dates and not self._transaction_depth:
+            self._sync_external_changes()
+        return self.epoch_dates
+    
+    def _due_epoch(self, column: str = 't.due_date') -> str:
+        """SQL-выражение срока задачи в секундах от эпохи"""
+        if self._stores_epoch('due_date'):
+            return column
+        return f"CAST(strftime('%s', {column}) AS INTEGER)"
+    
+    @staticmethod
+    def _insert_query(table: str, columns) -> str:
+        placeholders = ', '.join('?' * len(columns))
+        return f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})'
+    
+    def _insert_values(self, columns, item) -> tuple:
+        """Значения для INSERT из объекта модели или кортежа в порядке columns"""
+        if not isinstance(item, tuple):
+            item = tuple(getattr(item, column) for column in columns)
+        return tuple(self._format_value(column, value) for column, value in zip(columns, item))
+    
+    def _insert_many(self, table: str, columns, items: Iterable, chunk_size: int) -> range:
+        """Вставить записи через executemany порциями по chunk_size в одной транзакции"""
+        query = self._insert_query(table, columns)
+        rows = (self._insert_values(columns, item) for item in items)
+        count = 0
+        with self.transaction():
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                self._get_connection().executemany(query, chunk)
+                self._table_changed(table)
+                count += len(chunk)
+            
+            if not count:
+                return range(0)
+            # В рамках одной транзакции AUTOINCREMENT выдает ID подряд
+            last_id = self._execute('SELECT last_insert_rowid()').fetchone()[0]
+        return range(last_id - count + 1, last_id + 1)
+    
     # ========== Методы для работы с пользователями ==========
     
     def create_user_table(self):
@@ -40,36 +665,38 @@ class DatabaseManager:
             registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
         '''
-        self.cursor.execute(query)
-        self.connection.commit()
+        self._execute(query)
+        self._commit()
     
     def add_user(self, user) -> int:
         """Добавить пользователя"""
-        query = '''
-        INSERT INTO users (username, email, role, registration_date)
-        VALUES (?, ?, ?, ?)
-        '''
-        self.cursor.execute(query, (
-            user.username,
-            user.email,
-            user.role,
-            user.registration_date.strftime('%Y-%m-%d %H:%M:%S')
-        ))
-        self.connection.commit()
-        return self.cursor.lastrowid
+        query = self._insert_query('users', USER_COLUMNS)
+        cursor = self._execute(query, self._insert_values(USER_COLUMNS, user))
+        self._commit()
+        return cursor.lastrowid
+    
+    def add_users(self, users: Iterable, chunk_size: int = 1000) -> range:
+        """Добавить пользователей одной транзакцией, вернуть диапазон их ID"""
+        return self._insert_many('users', USER_COLUMNS, users, chunk_size)
     
     def get_user_by_id(self, user_id: int) -> Optional[Dict]:
         """Получить пользователя по ID"""
-        query = 'SELECT * FROM users WHERE id = ?'
-        self.cursor.execute(query, (user_id,))
-        row = self.cursor.fetchone()
-        return dict(row) if row else None
+        return self._get_by_id('users', user_id)
+    
+    def get_all_users(self, after: Optional[int] = None, limit: Optional[int] = None,
+                      as_tuples: bool = False) -> List[Dict]:
+        """Получить всех пользователей (страница после ID after, если задан limit)
+        
+        С as_tuples строки возвращаются кортежами в порядке USER_FIELDS.
+        """
+        query, params = self._paged_query(f'SELECT {", ".join(USER_FIELDS)} FROM users',
+                                          [], [], ('id',), after, limit)
+        return self._cached_rows(query, params, ('users',), as_tuples)
     
-    def get_all_users(self) -> List[Dict]:
-        """Получить всех пользователей"""
-        query = 'SELECT * FROM users ORDER BY id'
-        self.cursor.execute(query)
-        return [dict(row) for row in self.cursor.fetchall()]
+    def iter_users(self, batch_size: int = 1000, as_tuples: bool = False) -> Iterator[Dict]:
+        """Перебрать всех пользователей, не загружая их в память целиком"""
+        query = f'SELECT {", ".join(USER_FIELDS)} FROM users ORDER BY id'
+        return self._iter_rows(self._execute(query, as_tuples=as_tuples), batch_size)
     
     def update_user(self, user_id: int, **kwargs) -> bool:
         """Обновить пользователя"""
@@ -88,16 +715,18 @@ class DatabaseManager:
         
         values.append(user_id)
         query = f'UPDATE users SET {", ".join(fields)} WHERE id = ?'
-        self.cursor.execute(query, values)
-        self.connection.commit()
-        return self.cursor.rowcount > 0
+        cursor = self._execute(query, values)
+        self._invalidate('users', user_id)
+        self._commit()
+        return cursor.rowcount > 0
     
     def delete_user(self, user_id: int) -> bool:
         """Удалить пользователя"""
         query = 'DELETE FROM users WHERE id = ?'
-        self.cursor.execute(query, (user_id,))
-        self.connection.commit()
-        return self.cursor.rowcount > 0
+        cursor = self._execute(query, (user_id,))
+        self._invalidate('users', user_id)
+        self._commit()
+        return cursor.rowcount > 0
     
     # ========== Методы для работы с проектами ==========
     
@@ -114,41 +743,46 @@ class DatabaseManager:
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
         '''
-        self.cursor.execute(query)
-        self.connection.commit()
+        self._execute(query)
+        self._commit()
     
     def add_project(self, project) -> int:
         """Добавить проект"""
-        query = '''
-        INSERT INTO projects (name, description, start_date, end_date, status, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-        '''
-        self.cursor.execute(query, (
-            project.name,
-            project.description,
-            project.start_date.strftime('%Y-%m-%d'),
-            project.end_date.strftime('%Y-%m-%d'),
-            project.status,
-            project.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        ))
-        self.connection.commit()
-        return self.cursor.lastrowid
+        query = self._insert_query('projects', PROJECT_COLUMNS)
+        cursor = self._execute(query, self._insert_values(PROJECT_COLUMNS, project))
+        self._commit()
+        return cursor.lastrowid
+    
+    def add_projects(self, projects: Iterable, chunk_size: int = 1000) -> range:
+        """Добавить проекты одной транзакцией, вернуть диапазон их ID"""
+        return self._insert_many('projects', PROJECT_COLUMNS, projects, chunk_size)
     
     def get_project_by_id(self, project_id: int) -> Optional[Dict]:
         """Получить проект по ID"""
-        query = 'SELECT * FROM projects WHERE id = ?'
-        self.cursor.execute(query, (project_id,))
-        row = self.cursor.fetchone()
-        return dict(row) if row else None
-    
-    def get_all_projects(self) -> List[Dict]:
-        """Получить все проекты"""
-        query = 'SELECT * FROM projects ORDER BY id'
-        self.cursor.execute(query)
-        return [dict(row) for row in self.cursor.fetchall()]
-    
-    def update_project(self, project_id: int, **kwargs) -> bool:
-        """Обновить проект"""
+        return self._get_by_id('projects', project_id)
+    
+    def get_all_projects(self, after: Optional[int] = None, limit: Optional[int] = None,
+                         as_tuples: bool = False) -> List[Dict]:
+        """Получить все проекты (страница после ID after, если задан limit)
+        
+        С as_tuples строки возвращаются кортежами в порядке PROJECT_FIELDS.
+        """
+        query, params = self._paged_query(f'SELECT {", ".join(PROJECT_FIELDS)} FROM projects',
+                                          [], [], ('id',), after, limit)
+        return self._cached_rows(query, params, ('projects',), as_tuples)
+    
+    def iter_projects(self, batch_size: int = 1000, as_tuples: bool = False) -> Iterator[Dict]:
+        """Перебрать все проекты, не загружая их в память целиком"""
+        query = f'SELECT {", ".join(PROJECT_FIELDS)} FROM projects ORDER BY id'
+        return self._iter_rows(self._execute(query, as_tuples=as_tuples), batch_size)
+    
+    def update_project(self, project_id: int, expected_status: Optional[str] = None,
+                       **kwargs) -> bool:
+        """Обновить проект одним запросом UPDATE
+        
+        С expected_status строка обновляется, только если ее текущий статус равен
+        expected_status (сравнение с обменом). False - строки нет или статус другой.
+        """
         if not kwargs:
             return False
         
@@ -156,8 +790,7 @@ class DatabaseManager:
         values = []
         for key, value in kwargs.items():
             if key in ['name', 'description', 'start_date', 'end_date', 'status']:
-                if key in ['start_date', 'end_date'] and hasattr(value, 'strftime'):
-                    value = value.strftime('%Y-%m-%d')
+                value = self._format_value(key, value)
                 fields.append(f"{key} = ?")
                 values.append(value)
         
@@ -166,16 +799,21 @@ class DatabaseManager:
         
         values.append(project_id)
         query = f'UPDATE projects SET {", ".join(fields)} WHERE id = ?'
-        self.cursor.execute(query, values)
-        self.connection.commit()
-        return self.cursor.rowcount > 0
+        if expected_status is not None:
+            query += ' AND status = ?'
+            values.append(expected_status)
+        cursor = self._execute(query, values)
+        self._invalidate('projects', project_id)
+        self._commit()
+        return cursor.rowcount > 0
     
     def delete_project(self, project_id: int) -> bool:
         """Удалить проект"""
         query = 'DELETE FROM projects WHERE id = ?'
-        self.cursor.execute(query, (project_id,))
-        self.connection.commit()
-        return self.cursor.rowcount > 0
+        cursor = self._execute(query, (project_id,))
+        self._invalidate('projects', project_id)
+        self._commit()
+        return cursor.rowcount > 0
     
     # ========== Методы для работы с задачами ==========
     
@@ -196,43 +834,242 @@ class DatabaseManager:
             FOREIGN KEY (assignee_id) REFERENCES users(id) ON DELETE SET NULL
         )
         '''
-        self.cursor.execute(query)
-        self.connection.commit()
+        self._execute(query)
+        self._commit()
+        self.create_task_indexes()
+        self.create_task_search_index()
+        self.create_task_stats()
+    
+    def create_task_indexes(self):
+        """Создать или обновить индексы таблицы задач"""
+        cursor = self._execute(
+            "SELECT name, sql FROM sqlite_master "
+            "WHERE type = 'index' AND tbl_name = 'tasks' AND name LIKE 'idx_tasks_%'"
+        )
+        existing = {row['name']: row['sql'] for row in cursor.fetchall()}
+        
+        for name, definition in TASK_INDEXES.items():
+            sql = f'CREATE INDEX {name} ON tasks {definition}'
+            if existing.get(name) == sql:
+                continue
+            if name in existing:
+                self._execute(f'DROP INDEX {name}')
+            self._execute(sql)
+        
+        # Удаляем управляемые индексы, которых больше нет в списке
+        for name in existing.keys() - TASK_INDEXES.keys():
+            self._execute(f'DROP INDEX {name}')
+        self._commit()
+    
+    def create_task_search_index(self):
+        """Создать полнотекстовый индекс задач (FTS5), если SQLite его поддерживает"""
+        cursor = self._execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'")
+        exists = cursor.fetchone() is not None
+        
+        try:
+            self._execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+                title, description, content='tasks', content_rowid='id'
+            )
+            ''')
+        except sqlite3.OperationalError:
+            # FTS5 не собран в этой версии SQLite - поиск работает через LIKE
+            self.fts_enabled = False
+            return
+        
+        for trigger in TASK_SEARCH_TRIGGERS:
+            self._execute(trigger)
+        
+        # Индексируем задачи, созданные до появления полнотекстового индекса
+        if not exists:
+            self._execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+        self._commit()
+        self.fts_enabled = True
+    
+    def create_task_stats(self):
+        """Создать таблицу счетчиков задач task_stats и поддерживающие ее триггеры
+        
+        Строка на проект (scope = 'project') и на исполнителя (scope = 'user'):
+        всего задач и число задач в каждом статусе. Триггеры на tasks меняют
+        счетчики в той же транзакции, что и саму задачу.
+        """
+        cursor = self._execute("SELECT 1 FROM sqlite_master WHERE name = 'task_stats'")
+        exists = cursor.fetchone() is not None
+        
+        status_columns = ''.join(f'            {status} INTEGER NOT NULL DEFAULT 0,\n'
+                                 for status in TASK_STATUSES)
+        self._execute(f'''
+        CREATE TABLE IF NOT EXISTS task_stats (
+            scope TEXT NOT NULL CHECK(scope IN ('project', 'user')),
+            owner_id INTEGER NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+{status_columns}            PRIMARY KEY (scope, owner_id)
+        ) WITHOUT ROWID
+        ''')
+        for trigger in TASK_STATS_TRIGGERS:
+            self._execute(trigger)
+        self._commit()
+        
+        # Считаем задачи, созданные до появления таблицы счетчиков
+        if not exists:
+            self.rebuild_task_stats()
+    
+    def rebuild_task_stats(self) -> int:
+        """Пересчитать task_stats по таблице tasks; возвращает число строк счетчиков"""
+        with self.transaction():
+            self._execute('DELETE FROM task_stats')
+            cursor = self._execute(f'''
+            INSERT INTO task_stats (scope, owner_id, total, {', '.join(TASK_STATUSES)})
+            {self._task_stats_query()}
+            ''')
+        return cursor.rowcount
+    
+    def verify_task_stats(self) -> List[tuple]:
+        """Сверить task_stats с таблицей tasks
+        
+        Возвращает ключи (scope, owner_id) расходящихся счетчиков; пустой
+        список - счетчики верны. Нулевые строки (все задачи удалены или
+        переданы) считаются совпадающими с отсутствием задач.
+        """
+        columns = ('total',) + TASK_STATUSES
+        expected = {(row[0], row[1]): tuple(row[2:])
+                    for row in self._execute(self._task_stats_query()).fetchall()}
+        actual = {(row[0], row[1]): tuple(row[2:])
+                  for row in self._execute(
+                      f'SELECT scope, owner_id, {", ".join(columns)} FROM task_stats '
+                      f'WHERE {" OR ".join(column + " != 0" for column in columns)}'
+                  ).fetchall()}
+        return sorted(key for key in expected.keys() | actual.keys()
+                      if expected.get(key) != actual.get(key))
+    
+    @staticmethod
+    def _task_stats_query() -> str:
+        """SELECT счетчиков задач по всем областям, как в таблице task_stats"""
+        counts = ', '.join(f"SUM(status IS '{status}')" for status in TASK_STATUSES)
+        return ' UNION ALL '.join(
+            f"SELECT '{scope}', {column}, COUNT(*), {counts} FROM tasks "
+            f"WHERE {column} IS NOT NULL GROUP BY {column}"
+            for scope, column in TASK_STATS_SCOPES.items()
+        )
     
     def add_task(self, task) -> int:
         """Добавить задачу"""
-        query = '''
-        INSERT INTO tasks (title, description, priority, status, due_date, project_id, assignee_id, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        '''
-        self.cursor.execute(query, (
-            task.title,
-            task.description,
-            task.priority,
-            task.status,
-            task.due_date.strftime('%Y-%m-%d %H:%M:%S'),
-            task.project_id,
-            task.assignee_id,
-            task.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        ))
-        self.connection.commit()
-        return self.cursor.lastrowid
+        query = self._insert_query('tasks', TASK_COLUMNS)
+        cursor = self._execute(query, self._insert_values(TASK_COLUMNS, task))
+        self._commit()
+        return cursor.lastrowid
+    
+    def add_tasks(self, tasks: Iterable, chunk_size: int = 1000) -> range:
+        """Добавить задачи одной транзакцией, вернуть диапазон их ID"""
+        return self._insert_many('tasks', TASK_COLUMNS, tasks, chunk_size)
     
     def get_task_by_id(self, task_id: int) -> Optional[Dict]:
         """Получить задачу по ID"""
-        query = 'SELECT * FROM tasks WHERE id = ?'
-        self.cursor.execute(query, (task_id,))
-        row = self.cursor.fetchone()
-        return dict(row) if row else None
-    
-    def get_all_tasks(self) -> List[Dict]:
-        """Получить все задачи"""
-        query = 'SELECT * FROM tasks ORDER BY due_date, priority'
-        self.cursor.execute(query)
-        return [dict(row) for row in self.cursor.fetchall()]
-    
-    def update_task(self, task_id: int, **kwargs) -> bool:
-        """Обновить задачу"""
+        return self._get_by_id('tasks', task_id)
+    
+    def update_task_status_many(self, new_status: str, ids: Optional[Iterable[int]] = None,
+                                **filters) -> List[int]:
+        """Перевести задачи в статус new_status и вернуть ID измененных задач
+        
+        Задачи выбираются списком ids и/или фильтрами find_tasks (например,
+        status='in_progress', project_id=...). Все изменения - одним UPDATE
+        (для длинного списка ids - порциями) в одной транзакции.
+        """
+        return self._write_tasks('UPDATE tasks AS t SET status = ?', [new_status], ids, filters)
+    
+    def reassign_tasks(self, from_user_id: int, to_user_id: Optional[int],
+                       ids: Optional[Iterable[int]] = None, **filters) -> List[int]:
+        """Передать задачи исполнителя from_user_id исполнителю to_user_id
+        
+        Выборку можно сузить списком ids и фильтрами find_tasks. from_user_id=None
+        передает задачи без исполнителя. Возвращает ID переданных задач.
+        """
+        if from_user_id is None:
+            filters['unassigned'] = True
+        else:
+            filters['assignee_id'] = from_user_id
+        return self._write_tasks('UPDATE tasks AS t SET assignee_id = ?', [to_user_id],
+                                 ids, filters)
+    
+    def delete_tasks(self, ids: Optional[Iterable[int]] = None, **filters) -> List[int]:
+        """Удалить задачи по списку ids и/или фильтрам и вернуть ID удаленных"""
+        return self._write_tasks('DELETE FROM tasks AS t', [], ids, filters)
+    
+    def _write_tasks(self, statement: str, params: list, ids: Optional[Iterable[int]],
+                     filters: Dict[str, Any], chunk_size: int = 500) -> List[int]:
+        """Выполнить UPDATE или DELETE задач по ids и фильтрам в одной транзакции
+        
+        ID измененных строк возвращает сам запрос (RETURNING), без отдельного
+        SELECT. Без ids и фильтров запрос не выполняется: изменить все задачи
+        разом, скорее всего, ошибка вызывающего кода.
+        """
+        conditions, filter_params = self._task_conditions(**filters)
+        if ids is None and not conditions:
+            raise ValueError("Bulk task update requires ids or filters")
+        chunks = self._id_chunks(ids, chunk_size)
+        
+        affected = []
+        if not chunks:
+            return affected
+        with self.transaction():
+            for chunk in chunks:
+                query, values = self._returning_query(statement, conditions,
+                                                      params + filter_params, chunk)
+                affected.extend(row[0] for row in self._execute(query, values).fetchall())
+            for task_id in affected:
+                self._invalidate('tasks', task_id)
+        return sorted(affected)
+    
+    @staticmethod
+    def _id_chunks(ids: Optional[Iterable[int]], chunk_size: int) -> list:
+        """Порции ids по chunk_size для условия IN ([None] - ID не заданы)"""
+        if ids is None:
+            return [None]
+        ids = list(ids)
+        return [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+    
+    @staticmethod
+    def _returning_query(statement: str, conditions: List[str], params: list,
+                         chunk: Optional[List[int]]):
+        """Текст и параметры UPDATE/DELETE задач с условиями и RETURNING id"""
+        where = list(conditions)
+        if chunk is not None:
+            where.append(f't.id IN ({", ".join("?" * len(chunk))})')
+            params = params + chunk
+        return f'{statement} WHERE {" AND ".join(where)} RETURNING id', params
+    
+    def get_all_tasks(self, after: Optional[tuple] = None, limit: Optional[int] = None,
+                      as_tuples: bool = False) -> List[Dict]:
+        """Получить все задачи (страница после ключа after, если задан limit)"""
+        return self.find_tasks(after=after, limit=limit, as_tuples=as_tuples)
+    
+    def iter_tasks(self, batch_size: int = 1000, as_tuples: bool = False,
+                   **filters) -> Iterator[Dict]:
+        """Перебрать задачи по фильтрам find_tasks, не загружая их в память целиком"""
+        query, params = self._find_tasks_query(None, None, **filters)
+        return self._iter_rows(self._execute(query, params, as_tuples), batch_size)
+    
+    def iter_task_columns(self, batch_size: int = 10000, **filters) -> Iterator[tuple]:
+        """Перебрать задачи кортежами TASK_BATCH_FIELDS (фильтры как в find_tasks)
+        
+        Срок возвращается числом секунд от эпохи (дата без часового пояса
+        считается UTC), чтобы сравнивать сроки без разбора строк.
+        """
+        conditions, params = self._task_conditions(**filters)
+        select = f'''
+        SELECT t.id, t.title, t.priority, t.status, {self._due_epoch()} AS due_epoch
+        FROM tasks t
+        '''
+        query, params = self._paged_query(select, conditions, params, TASK_ORDER, None, None)
+        return self._iter_rows(self._execute(query, params, as_tuples=True), batch_size)
+    
+    def update_task(self, task_id: int, expected_status: Optional[str] = None,
+                    **kwargs) -> bool:
+        """Обновить задачу одним запросом UPDATE
+        
+        С expected_status строка обновляется, только если ее текущий статус равен
+        expected_status (сравнение с обменом). False - строки нет или статус другой.
+        """
         if not kwargs:
             return False
         
@@ -240,8 +1077,7 @@ class DatabaseManager:
         values = []
         for key, value in kwargs.items():
             if key in ['title', 'description', 'priority', 'status', 'due_date', 'project_id', 'assignee_id']:
-                if key == 'due_date' and hasattr(value, 'strftime'):
-                    value = value.strftime('%Y-%m-%d %H:%M:%S')
+                value = self._format_value(key, value)
                 fields.append(f"{key} = ?")
                 values.append(value)
         
@@ -250,62 +1086,273 @@ class DatabaseManager:
         
         values.append(task_id)
         query = f'UPDATE tasks SET {", ".join(fields)} WHERE id = ?'
-        self.cursor.execute(query, values)
-        self.connection.commit()
-        return self.cursor.rowcount > 0
+        if expected_status is not None:
+            query += ' AND status = ?'
+            values.append(expected_status)
+        cursor = self._execute(query, values)
+        self._invalidate('tasks', task_id)
+        self._commit()
+        return cursor.rowcount > 0
     
     def delete_task(self, task_id: int) -> bool:
         """Удалить задачу"""
         query = 'DELETE FROM tasks WHERE id = ?'
-        self.cursor.execute(query, (task_id,))
-        self.connection.commit()
-        return self.cursor.rowcount > 0
+        cursor = self._execute(query, (task_id,))
+        self._invalidate('tasks', task_id)
+        self._commit()
+        return cursor.rowcount > 0
     
-    def search_tasks(self, query_str: str) -> List[Dict]:
-        """Поиск задач по названию/описанию"""
-        query = '''
-        SELECT * FROM tasks 
-        WHERE title LIKE ? OR description LIKE ?
-        ORDER BY due_date, priority
-        '''
-        search_term = f'%{query_str}%'
-        self.cursor.execute(query, (search_term, search_term))
-        return [dict(row) for row in self.cursor.fetchall()]
+    def search_tasks(self, query_str: str, ranked: bool = False,
+                     highlight: bool = False, limit: Optional[int] = None) -> List[Dict]:
+        """Поиск задач по названию/описанию
+        
+        Через FTS5 каждое слово запроса ищется как префикс. ranked сортирует
+        результаты по релевантности (bm25), highlight добавляет поле snippet
+        с подсвеченным фрагментом. Без FTS5 используется поиск подстроки (LIKE).
+        """
+        match = self._build_match_query(query_str)
+        if self.fts_enabled and match:
+            snippet = ", snippet(tasks_fts, -1, '[', ']', '...', 12) AS snippet"
+            order = 'bm25(tasks_fts, 10.0, 1.0)' if ranked else 't.due_date, t.priority'
+            query = f'''
+            SELECT t.*{snippet if highlight else ''} FROM tasks_fts
+            JOIN tasks t ON t.id = tasks_fts.rowid
+            WHERE tasks_fts MATCH ?
+            ORDER BY {order}
+            '''
+            params = [match]
+        else:
+            query = f'''
+            SELECT *{', NULL AS snippet' if highlight else ''} FROM tasks 
+            WHERE title LIKE ? OR description LIKE ?
+            ORDER BY due_date, priority
+            '''
+            search_term = f'%{query_str}%'
+            params = [search_term, search_term]
+        
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        
+        return self._cached_rows(query, params, ('tasks',))
     
-    def get_tasks_by_project(self, project_id: int) -> List[Dict]:
+    @staticmethod
+    def _build_match_query(query_str: str) -> str:
+        """Преобразовать строку поиска в запрос FTS5: каждое слово - префикс"""
+        words = re.findall(r'\w+', query_str)
+        return ' '.join(f'"{word}"*' for word in words)
+    
+    def get_tasks_by_project(self, project_id: int, after: Optional[tuple] = None,
+                             limit: Optional[int] = None, as_tuples: bool = False) -> List[Dict]:
         """Получить задачи проекта"""
-        query = 'SELECT * FROM tasks WHERE project_id = ? ORDER BY due_date, priority'
-        self.cursor.execute(query, (project_id,))
-        return [dict(row) for row in self.cursor.fetchall()]
+        return self.find_tasks(project_id=project_id, after=after, limit=limit,
+                               as_tuples=as_tuples)
+    
+    def iter_tasks_by_project(self, project_id: int, batch_size: int = 1000) -> Iterator[Dict]:
+        """Перебрать задачи проекта"""
+        return self.iter_tasks(batch_size, project_id=project_id)
     
-    def get_tasks_by_user(self, user_id: int) -> List[Dict]:
+    def get_tasks_by_user(self, user_id: int, after: Optional[tuple] = None,
+                          limit: Optional[int] = None, as_tuples: bool = False) -> List[Dict]:
         """Получить задачи пользователя"""
-        query = 'SELECT * FROM tasks WHERE assignee_id = ? ORDER BY due_date, priority'
-        self.cursor.execute(query, (user_id,))
-        return [dict(row) for row in self.cursor.fetchall()]
+        return self.find_tasks(assignee_id=user_id, after=after, limit=limit,
+                               as_tuples=as_tuples)
+    
+    def iter_tasks_by_user(self, user_id: int, batch_size: int = 1000) -> Iterator[Dict]:
+        """Перебрать задачи пользователя"""
+        return self.iter_tasks(batch_size, assignee_id=user_id)
     
-    def get_overdue_tasks(self) -> List[Dict]:
+    def get_overdue_tasks(self, as_tuples: bool = False) -> List[Dict]:
         """Получить просроченные задачи"""
-        query = '''
-        SELECT * FROM tasks 
-        WHERE due_date < datetime('now') 
+        query = f'''
+        SELECT {', '.join(TASK_FIELDS)} FROM tasks 
+        WHERE due_date < ? 
         AND status != 'completed'
         ORDER BY due_date, priority
         '''
-        self.cursor.execute(query)
-        return [dict(row) for row in self.cursor.fetchall()]
+        # Срок хранится в местном времени, как и в Task.is_overdue
+        now = self._format_value('due_date', datetime.now())
+        return self._cached_rows(query, (now,), ('tasks',), as_tuples, timed=True)
+    
+    def find_tasks(self, after: Optional[tuple] = None, limit: Optional[int] = None,
+                   as_tuples: bool = False, **filters) -> List[Dict]:
+        """Найти задачи по набору фильтров одним параметризованным запросом
+        
+        Фильтры: ids, status, priority, project_id, assignee_id (значение или
+        список значений), unassigned=True (задачи без исполнителя), due_before,
+        due_after (срок раньше / не раньше даты), text.
+        Постранично: limit строк после ключа after = (due_date, priority, id).
+        С as_tuples строки возвращаются кортежами в порядке TASK_FIELDS.
+        """
+        query, params = self._find_tasks_query(after, limit, **filters)
+        return self._cached_rows(query, params, ('tasks',), as_tuples)
+    
+    def _find_tasks_query(self, after, limit, **filters):
+        """Текст и параметры запроса find_tasks"""
+        conditions, params = self._task_conditions(**filters)
+        select = f'SELECT {", ".join("t." + field for field in TASK_FIELDS)} FROM tasks t'
+        return self._paged_query(select, conditions, params, TASK_ORDER, after, limit)
+    
+    def get_task_listing(self, after: Optional[tuple] = None, limit: Optional[int] = None,
+                         fresh: bool = False, **filters) -> List[Dict]:
+        """Получить строки списка задач с названием проекта и именем исполнителя
+        
+        Один запрос с LEFT JOIN вместо отдельного чтения проекта и пользователя
+        для каждой задачи. Строки плоские и готовы к выводу в таблицу.
+        Принимает те же фильтры и параметры страницы, что и find_tasks.
+        Признак is_overdue считается на момент запроса, но результат хранится в
+        кэше time_cache_ttl секунд; fresh=True читает строки в обход кэша
+        (например, когда у задач только что прошел срок).
+        """
+        query, params = self._task_listing_query(after, limit, **filters)
+        if fresh:
+            return self._rows(self._execute(query, params))
+        return self._cached_rows(query, params, ('tasks', 'projects', 'users'), timed=True)
+    
+    def iter_task_listing(self, batch_size: int = 1000, **filters) -> Iterator[Dict]:
+        """Перебрать строки списка задач, не загружая их в память целиком"""
+        query, params = self._task_listing_query(None, None, **filters)
+        return self._iter_rows(self._execute(query, params), batch_size)
+    
+    def get_user_task_rows(self, user_id: int,
+                           fields: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Получить задачи пользователя с названием проекта одним запросом
+        
+        fields - нужные столбцы из TASK_FIELDS и project_name (по умолчанию все).
+        Задачи выбираются вместе с пользователем (JOIN), поэтому для
+        несуществующего пользователя результат пустой.
+        """
+        fields = tuple(fields) if fields is not None else TASK_FIELDS + ('project_name',)
+        unknown = set(fields) - set(TASK_FIELDS) - {'project_name'}
+        if unknown:
+            raise ValueError(f"Unknown task fields: {', '.join(sorted(unknown))}")
+        columns = ', '.join('p.name AS project_name' if field == 'project_name' else f't.{field}'
+                            for field in fields)
+        query = f'''
+        SELECT {columns}
+        FROM tasks t
+        JOIN users u ON u.id = t.assignee_id
+        LEFT JOIN projects p ON p.id = t.project_id
+        WHERE t.assignee_id = ?
+        ORDER BY {', '.join(TASK_ORDER)}
+        '''
+        return self._cached_rows(query, (user_id,), ('tasks', 'projects', 'users'))
+    
+    def _task_listing_query(self, after, limit, **filters):
+        """Текст и параметры запроса get_task_listing"""
+        conditions, params = self._task_conditions(**filters)
+        now = self._format_value('due_date', datetime.now())
+        select = '''
+        SELECT t.id, t.title, t.priority, t.status, t.due_date,
+               t.project_id, p.name AS project_name,
+               t.assignee_id, u.username AS assignee_name,
+               t.status != 'completed' AND t.due_date < ? AS is_overdue
+        FROM tasks t
+        LEFT JOIN projects p ON p.id = t.project_id
+        LEFT JOIN users u ON u.id = t.assignee_id
+        '''
+        return self._paged_query(select, conditions, [now] + params, TASK_ORDER, after, limit)
+    
+    def _task_conditions(self, status=None, priority=None, project_id=None, assignee_id=None,
+                         due_before=None, due_after=None, text=None, ids=None,
+                         unassigned=False):
+        """Собрать условия WHERE для задач (псевдоним t) и параметры запроса"""
+        # assignee_id=None означает «без фильтра», задачи без исполнителя - unassigned
+        conditions = ['t.assignee_id IS NULL'] if unassigned else []
+        params = []
+        for column, value in (('id', ids), ('status', status), ('priority', priority),
+                              ('project_id', project_id), ('assignee_id', assignee_id)):
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                values = list(value)
+                conditions.append(f't.{column} IN ({", ".join("?" * len(values))})')
+                params.extend(values)
+            else:
+                conditions.append(f't.{column} = ?')
+                params.append(value)
+        
+        self._add_due_text_conditions(conditions, params, due_before, due_after, text)
+        return conditions, params
+    
+    def _add_due_text_conditions(self, conditions: List[str], params: list,
+                                 due_before=None, due_after=None, text=None):
+        """Дополнить условия задач фильтрами по сроку и тексту"""
+        if due_before is not None:
+            conditions.append('t.due_date < ?')
+            params.append(self._format_value('due_date', due_before))
+        if due_after is not None:
+            conditions.append('t.due_date >= ?')
+            params.append(self._format_value('due_date', due_after))
+        if text:
+            clause, text_params = self._text_condition(text)
+            conditions.append(clause)
+            params.extend(text_params)
+    
+    @staticmethod
+    def _paged_query(select: str, conditions: List[str], params: list, order,
+                     after=None, limit: Optional[int] = None):
+        """Дополнить SELECT условиями, сортировкой и постраничной выборкой
+        
+        Страница начинается сразу после ключа сортировки after (keyset): запрос
+        переходит к нужному месту по индексу, а не пропускает строки как OFFSET,
+        и вставки в уже просмотренную часть не сдвигают следующие страницы.
+        """
+        conditions = list(conditions)
+        params = list(params)
+        if after is not None:
+            key = tuple(after) if isinstance(after, (tuple, list)) else (after,)
+            conditions.append(f'({", ".join(order)}) > ({", ".join("?" * len(order))})')
+            params.extend(key)
+        
+        query = select
+        if conditions:
+            query += f' WHERE {" AND ".join(conditions)}'
+        query += f' ORDER BY {", ".join(order)}'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return query, params
+    
+    @staticmethod
+    def _iter_rows(cursor: sqlite3.Cursor, batch_size: int) -> Iterator[Dict]:
+        """Выдавать строки курсора, читая их пачками по batch_size
+        
+        Строки sqlite3.Row выдаются словарями, кортежи (as_tuples) - как есть.
+        В памяти держится не больше одной пачки строк. Курсор закрывается,
+        когда перебор завершен или генератор закрыт раньше времени.
+        """
+        cursor.arraysize = batch_size
+        as_tuples = cursor.row_factory is None
+        try:
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    return
+                if as_tuples:
+                    yield from rows
+                else:
+                    for row in rows:
+                        yield dict(row)
+        finally:
+            cursor.close()
+    
+    def _text_condition(self, text: str):
+        """Условие поиска текста в задаче t: через FTS5 или подстрокой (LIKE)"""
+        match = self._build_match_query(text)
+        if self.fts_enabled and match:
+            return 't.id IN (SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ?)', [match]
+        search_term = f'%{text}%'
+        return '(t.title LIKE ? OR t.description LIKE ?)', [search_term, search_term]
     
     def get_project_progress(self, project_id: int) -> Dict[str, Any]:
-        """Получить прогресс проекта"""
+        """Получить прогресс проекта (чтение счетчиков task_stats по ключу)"""
         query = '''
-        SELECT 
-            COUNT(*) as total_tasks,
-            SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed_tasks
-        FROM tasks 
-        WHERE project_id = ?
+        SELECT total AS total_tasks, completed AS completed_tasks FROM task_stats
+        WHERE scope = 'project' AND owner_id = ?
         '''
-        self.cursor.execute(query, (project_id,))
-        row = self.cursor.fetchone()
+        rows = self._cached_rows(query, (project_id,), ('tasks', 'task_stats'))
+        row = rows[0] if rows else None
         
         if row and row['total_tasks'] > 0:
             progress = (row['completed_tasks'] / row['total_tasks']) * 100
@@ -317,3 +1364,44 @@ class DatabaseManager:
             'completed_tasks': row['completed_tasks'] if row else 0,
             'progress': progress
         }
+    
+    def get_task_counts_by_user(self, by_status: bool = False,
+                                user_ids: Optional[Iterable[int]] = None) -> Dict[int, Any]:
+        """Получить число задач исполнителей из счетчиков task_stats
+        
+        Возвращает {user_id: количество}, а с by_status -
+        {user_id: {статус: количество}} со всеми статусами. Пользователи без
+        задач в результат не попадают. user_ids ограничивает выборку этими
+        исполнителями (чтение строк task_stats по первичному ключу).
+        """
+        query = f'''
+        SELECT owner_id, total, {', '.join(TASK_STATUSES)} FROM task_stats
+        WHERE scope = 'user' AND total > 0
+        '''
+        params = ()
+        if user_ids is not None:
+            params = tuple(user_ids)
+            query += f' AND owner_id IN ({", ".join("?" * len(params))})'
+        rows = self._cached_rows(query, params, ('tasks', 'task_stats'))
+        if not by_status:
+            return {row['owner_id']: row['total'] for row in rows}
+        return {row['owner_id']: {status: row[status] for status in TASK_STATUSES}
+                for row in rows}
+    
+    def get_all_project_progress(self) -> List[Dict]:
+        """Получить все проекты с прогрессом одним запросом
+        
+        Каждая строка - столбцы проекта (PROJECT_FIELDS) и total_tasks,
+        completed_tasks, progress (процент завершенных задач). Число задач
+        берется из счетчиков task_stats, задачи не перебираются.
+        """
+        query = f'''
+        SELECT {", ".join("p." + field for field in PROJECT_FIELDS)},
+               COALESCE(s.total, 0) AS total_tasks,
+               COALESCE(s.completed, 0) AS completed_tasks,
+               COALESCE(100.0 * s.completed / NULLIF(s.total, 0), 0) AS progress
+        FROM projects p
+        LEFT JOIN task_stats s ON s.scope = 'project' AND s.owner_id = p.id
+        ORDER BY p.id
+        '''
+        return self._cached_rows(query, (), ('projects', 'tasks', 'task_stats'))
@@ -0,0 +1,31 @@
+# Постраничный обход списков по ключу сортировки (keyset pagination)
+from typing import Any, Callable, Dict, Iterator, List
+
+
+def task_key(row: Dict[str, Any]) -> tuple:
+    """Ключ сортировки строки задачи: (due_date, priority, id)"""
+    return (row['due_date'], row['priority'], row['id'])
+
+
+def id_key(row: Dict[str, Any]) -> int:
+    """Ключ сортировки строки пользователя или проекта"""
+    return row['id']
+
+
+def iter_pages(fetch_page: Callable[..., List[Dict[str, Any]]],
+               key: Callable[[Dict[str, Any]], Any],
+               page_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+    """Перебрать список страницами
+    
+    fetch_page(after=..., limit=...) - метод DatabaseManager с постраничной
+    выборкой, key - функция, возвращающая ключ сортировки строки. Следующая
+    страница запрашивается после ключа последней строки предыдущей.
+    """
+    after = None
+    while True:
+        page = fetch_page(after=after, limit=page_size)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = key(page[-1])
@@ -2,5 +2,6 @@
 from .task import Task
 from .project import Project
 from .user import User
+from .task_batch import TaskBatch
 
-__all__ = ['Task', 'Project', 'User']
+__all__ = ['Task', 'Project', 'User', 'TaskBatch']
@@ -0,0 +1,22 @@
+# Преобразование дат из значений столбцов базы данных
+from calendar import timegm
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def parse_datetime(value):
+    """Дата из значения столбца: строки ISO или целого числа секунд от эпохи
+    
+    Значения datetime (например, в словарях, собранных вручную) возвращаются как есть.
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, int):
+        return EPOCH + timedelta(seconds=value)
+    return datetime.fromisoformat(value)
+
+
+def to_epoch(moment: datetime) -> int:
+    """Секунды от эпохи для даты без часового пояса (как strftime('%s') в SQLite)"""
+    return timegm(moment.timetuple())
@@ -1,6 +1,12 @@
 from datetime import datetime
+from operator import itemgetter
+
+from .dates import parse_datetime
 
 class Project:
+    # Атрибуты без __dict__ у каждого экземпляра
+    __slots__ = ('id', 'name', 'description', 'start_date', 'end_date', 'status', 'created_at')
+    
     def __init__(self, name, description, start_date, end_date):
         self.id = None
         self.name = name
@@ -47,13 +53,31 @@ class Project:
     @classmethod
     def from_dict(cls, data):
         """Создать объект Project из словаря"""
-        project = cls(
-            name=data['name'],
-            description=data['description'],
-            start_date=data['start_date'],
-            end_date=data['end_date']
-        )
-        project.id = data['id']
-        project.status = data['status']
-        project.created_at = datetime.strptime(data['created_at'], '%Y-%m-%d %H:%M:%S')
+        return cls.from_row(data['id'], data['name'], data['description'], data['start_date'],
+                            data['end_date'], data['status'], data['created_at'])
+    
+    @classmethod
+    def from_row(cls, project_id, name, description, start_date, end_date, status, created_at):
+        """Создать объект Project из значений строки базы данных (минуя __init__)"""
+        project = cls.__new__(cls)
+        project.id = project_id
+        project.name = name
+        project.description = description
+        project.start_date = parse_datetime(start_date)
+        project.end_date = parse_datetime(end_date)
+        project.status = status
+        project.created_at = parse_datetime(created_at)
         return project
+    
+    @classmethod
+    def row_mapper(cls, columns):
+        """Функция, создающая Project из кортежа строки с порядком столбцов columns"""
+        fields = itemgetter(*(columns.index(name) for name in (
+            'id', 'name', 'description', 'start_date', 'end_date', 'status', 'created_at')))
+        
+        from_row = cls.from_row
+        
+        def map_row(row):
+            return from_row(*fields(row))
+        
+        return map_row
@@ -1,6 +1,13 @@
 from datetime import datetime
+from operator import itemgetter
+
+from .dates import parse_datetime
 
 class Task:
+    # Атрибуты без __dict__ у каждого экземпляра: меньше памяти на большие выборки
+    __slots__ = ('id', 'title', 'description', 'priority', 'status', 'due_date',
+                 'project_id', 'assignee_id', 'created_at')
+    
     def __init__(self, title, description, priority, due_date, project_id, assignee_id):
         self.id = None
         self.title = title
@@ -45,15 +52,44 @@ class Task:
     @classmethod
     def from_dict(cls, data):
         """Создать объект Task из словаря"""
-        task = cls(
-            title=data['title'],
-            description=data['description'],
-            priority=data['priority'],
-            due_date=data['due_date'],
-            project_id=data['project_id'],
-            assignee_id=data['assignee_id']
-        )
-        task.id = data['id']
-        task.status = data['status']
-        task.created_at = datetime.strptime(data['created_at'], '%Y-%m-%d %H:%M:%S')
+        return cls.from_row(data['id'], data['title'], data['description'], data['priority'],
+                            data['status'], data['due_date'], data['project_id'],
+                            data['assignee_id'], data['created_at'])
+    
+    @classmethod
+    def from_row(cls, task_id, title, description, priority, status, due_date,
+                 project_id, assignee_id, created_at):
+        """Создать объект Task из значений строки базы данных
+        
+        Минует __init__ (там created_at заполняется текущим временем) и разбирает
+        даты в формате ISO через datetime.fromisoformat, а не strptime (или
+        переводит секунды от эпохи, если база хранит даты числами).
+        """
+        task = cls.__new__(cls)
+        task.id = task_id
+        task.title = title
+        task.description = description
+        task.priority = priority
+        task.status = status
+        task.due_date = parse_datetime(due_date)
+        task.project_id = project_id
+        task.assignee_id = assignee_id
+        task.created_at = parse_datetime(created_at)
         return task
+    
+    @classmethod
+    def row_mapper(cls, columns):
+        """Функция, создающая Task из кортежа строки с порядком столбцов columns
+        
+        Позиции столбцов вычисляются один раз, строка не копируется в словарь.
+        """
+        fields = itemgetter(*(columns.index(name) for name in (
+            'id', 'title', 'description', 'priority', 'status', 'due_date',
+            'project_id', 'assignee_id', 'created_at')))
+        
+        from_row = cls.from_row
+        
+        def map_row(row):
+            return from_row(*fields(row))
+        
+        return map_row
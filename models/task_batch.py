@@ -0,0 +1,115 @@
+from array import array
+from collections import Counter
+from datetime import datetime
+from itertools import compress, islice
+
+from .dates import to_epoch
+
+# Коды статусов в столбце statuses (порядок совпадает с Task.update_status)
+STATUSES = ('pending', 'in_progress', 'completed')
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+COMPLETED = STATUS_CODES['completed']
+
+
+class TaskBatch:
+    """Набор задач в столбцах: id, приоритеты, коды статусов и сроки в array, заголовки в list
+    
+    Заполняется кортежами (id, title, priority, status, due_epoch), например из
+    DatabaseManager.iter_task_columns. Проверки выполняются над столбцами целиком
+    и возвращают маски - bytes с 1 для подходящих задач.
+    """
+    __slots__ = ('ids', 'titles', 'priorities', 'statuses', 'due_dates')
+    
+    # Столбцы, по которым можно сортировать и считать
+    COLUMNS = {'id': 'ids', 'title': 'titles', 'priority': 'priorities',
+               'status': 'statuses', 'due_date': 'due_dates'}
+    
+    def __init__(self):
+        self.ids = array('q')
+        self.titles = []
+        self.priorities = array('b')
+        self.statuses = array('b')
+        self.due_dates = array('q')
+    
+    @classmethod
+    def from_rows(cls, rows, chunk_size: int = 10000) -> 'TaskBatch':
+        """Создать набор из строк или курсора, перенося значения в столбцы пачками"""
+        batch = cls()
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return batch
+            ids, titles, priorities, statuses, due_dates = zip(*chunk)
+            batch.ids.extend(ids)
+            batch.titles.extend(titles)
+            batch.priorities.extend(priorities)
+            batch.statuses.extend(map(STATUS_CODES.__getitem__, statuses))
+            batch.due_dates.extend(due_dates)
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def overdue_mask(self, now: datetime = None) -> bytes:
+        """Маска просроченных задач (срок прошел, задача не завершена)"""
+        now = to_epoch(now or datetime.now())
+        return bytes([status != COMPLETED and due < now
+                      for status, due in zip(self.statuses, self.due_dates)])
+    
+    def status_mask(self, status) -> bytes:
+        """Маска задач со статусом status (значение или список значений)"""
+        codes = {STATUS_CODES[value] for value in _as_list(status)}
+        return bytes([code in codes for code in self.statuses])
+    
+    def priority_mask(self, priority) -> bytes:
+        """Маска задач с приоритетом priority (значение или список значений)"""
+        values = set(_as_list(priority))
+        return bytes([value in values for value in self.priorities])
+    
+    def filter(self, status=None, priority=None, mask: bytes = None) -> 'TaskBatch':
+        """Новый набор из задач, подходящих под все заданные условия"""
+        masks = [m for m in (mask,
+                             self.status_mask(status) if status is not None else None,
+                             self.priority_mask(priority) if priority is not None else None)
+                 if m is not None]
+        if not masks:
+            return self.take(range(len(self)))
+        combined = masks[0] if len(masks) == 1 else bytes(map(min, *masks))
+        return self.take(compress(range(len(self)), combined))
+    
+    def take(self, indices) -> 'TaskBatch':
+        """Новый набор из задач с указанными позициями (в заданном порядке)"""
+        indices = list(indices)
+        batch = TaskBatch()
+        for name in self.__slots__:
+            column = getattr(self, name)
+            values = [column[i] for i in indices]
+            if isinstance(column, array):
+                getattr(batch, name).extend(values)
+            else:
+                setattr(batch, name, values)
+        return batch
+    
+    def sort_by(self, *keys: str, reverse: bool = False) -> 'TaskBatch':
+        """Новый набор, отсортированный по столбцам keys ('due_date', 'priority', ...)"""
+        columns = [getattr(self, self.COLUMNS[key]) for key in keys or ('id',)]
+        if len(columns) == 1:
+            key = columns[0].__getitem__
+        else:
+            def key(i):
+                return tuple(column[i] for column in columns)
+        return self.take(sorted(range(len(self)), key=key, reverse=reverse))
+    
+    def counts_by(self, key: str, mask: bytes = None) -> dict:
+        """Количество задач по значениям столбца key (статусы - по названиям)"""
+        column = getattr(self, self.COLUMNS[key])
+        values = compress(column, mask) if mask is not None else column
+        counts = Counter(values)
+        if key == 'status':
+            return {STATUSES[code]: count for code, count in counts.items()}
+        return dict(counts)
+
+
+def _as_list(value) -> list:
+    """Значение фильтра в виде списка"""
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
@@ -1,6 +1,12 @@
 from datetime import datetime
+from operator import itemgetter
+
+from .dates import parse_datetime
 
 class User:
+    # Атрибуты без __dict__ у каждого экземпляра
+    __slots__ = ('id', 'username', 'email', 'role', 'registration_date')
+    
     def __init__(self, username, email, role):
         self.id = None
         self.username = username
@@ -29,11 +35,29 @@ class User:
     @classmethod
     def from_dict(cls, data):
         """Создать объект User из словаря"""
-        user = cls(
-            username=data['username'],
-            email=data['email'],
-            role=data['role']
-        )
-        user.id = data['id']
-        user.registration_date = datetime.strptime(data['registration_date'], '%Y-%m-%d %H:%M:%S')
+        return cls.from_row(data['id'], data['username'], data['email'], data['role'],
+                            data['registration_date'])
+    
+    @classmethod
+    def from_row(cls, user_id, username, email, role, registration_date):
+        """Создать объект User из значений строки базы данных (минуя __init__)"""
+        user = cls.__new__(cls)
+        user.id = user_id
+        user.username = username
+        user.email = email
+        user.role = role
+        user.registration_date = parse_datetime(registration_date)
         return user
+    
+    @classmethod
+    def row_mapper(cls, columns):
+        """Функция, создающая User из кортежа строки с порядком столбцов columns"""
+        fields = itemgetter(*(columns.index(name) for name in (
+            'id', 'username', 'email', 'role', 'registration_date')))
+        
+        from_row = cls.from_row
+        
+        def map_row(row):
+            return from_row(*fields(row))
+        
+        return map_row
@@ -11,6 +11,8 @@ from database.database_manager import DatabaseManager
 from controllers.task_controller import TaskController
 from controllers.project_controller import ProjectController
 from controllers.user_controller import UserController
+from controllers.deadline_scheduler import DeadlineScheduler
+from controllers.events import EventBus, ChangeEvent
 from models.task import Task
 from models.project import Project
 from models.user import User
@@ -89,6 +91,146 @@ class TestTaskController:
         
         assert task is None  # Должен вернуть None при ошибке
     
+    def test_find_tasks(self, controllers):
+        """Тест поиска задач по фильтрам"""
+        for priority in [1, 2, 3]:
+            controllers['task'].add_task(
+                f"Find Task {priority}", "Description", priority,
+                datetime.now() + timedelta(days=priority),
+                controllers['project_id'], controllers['user_id']
+            )
+        
+        tasks = controllers['task'].find_tasks(priority=[1, 3],
+                                               project_id=controllers['project_id'])
+        assert [task.title for task in tasks] == ["Find Task 1", "Find Task 3"]
+        assert all(isinstance(task, Task) for task in tasks)
+        
+        # Неизвестный фильтр - ошибка, возвращается пустой список
+        assert controllers['task'].find_tasks(unknown=1) == []
+    
+    def test_get_task_listing(self, controllers):
+        """Тест получения строк списка задач"""
+        controllers['task'].add_task(
+            "Listed Task", "Description", 1, datetime.now() + timedelta(days=1),
+            controllers['project_id'], controllers['user_id']
+        )
+        
+        rows = controllers['task'].get_task_listing()
+        assert len(rows) == 1
+        assert rows[0]['title'] == "Listed Task"
+        assert rows[0]['project_name'] == "Test Project"
+        assert rows[0]['assignee_name'] == "testuser"
+        assert controllers['task'].get_task_listing(status="completed") == []
+    
+    def test_add_tasks_bulk(self, controllers):
+        """Тест пакетного добавления задач"""
+        due_date = datetime.now() + timedelta(days=7)
+        tasks = controllers['task'].add_tasks([
+            {
+                'title': f"Bulk Task {i}",
+                'description': "Description",
+                'priority': i % 3 + 1,
+                'due_date': due_date,
+                'project_id': controllers['project_id'],
+                'assignee_id': controllers['user_id']
+            }
+            for i in range(5)
+        ], chunk_size=2)
+        
+        assert len(tasks) == 5
+        assert [task.id for task in tasks] == list(range(tasks[0].id, tasks[0].id + 5))
+        assert controllers['task'].get_task(tasks[4].id).title == "Bulk Task 4"
+    
+    def test_transaction(self, controllers):
+        """Тест общей транзакции контроллеров"""
+        with controllers['project'].transaction():
+            project = controllers['project'].add_project(
+                "Tx Project", "Description", datetime.now(), datetime.now() + timedelta(days=5)
+            )
+            for i in range(3):
+                controllers['task'].add_task(
+                    f"Tx Task {i}", "Description", 2, datetime.now() + timedelta(days=1),
+                    project.id, controllers['user_id']
+                )
+        assert len(controllers['task'].get_tasks_by_project(project.id)) == 3
+        
+        with pytest.raises(RuntimeError):
+            with controllers['task'].transaction():
+                controllers['task'].add_task(
+                    "Rolled back", "Description", 2, datetime.now(), project.id, None
+                )
+                raise RuntimeError("abort")
+        assert len(controllers['task'].get_tasks_by_project(project.id)) == 3
+    
+    def test_add_tasks_bulk_invalid_priority(self, controllers):
+        """Тест: невалидный приоритет отменяет добавление всей пачки"""
+        due_date = datetime.now() + timedelta(days=7)
+        tasks = controllers['task'].add_tasks([
+            {'title': "Valid", 'description': "", 'priority': 1, 'due_date': due_date,
+             'project_id': None, 'assignee_id': None},
+            {'title': "Invalid", 'description': "", 'priority': 7, 'due_date': due_date,
+             'project_id': None, 'assignee_id': None},
+        ])
+        
+        assert tasks == []
+        assert controllers['task'].get_all_tasks() == []
+    
+    def test_iter_task_pages(self, controllers):
+        """Тест постраничного обхода задач"""
+        due_date = datetime.now() + timedelta(days=7)
+        added = controllers['task'].add_tasks([
+            {'title': f"Task {i}", 'description': "", 'priority': 1 + i % 3,
+             'due_date': due_date, 'project_id': controllers['project_id'],
+             'assignee_id': controllers['user_id']}
+            for i in range(7)
+        ])
+        
+        pages = list(controllers['task'].iter_task_pages(page_size=3))
+        assert [len(page) for page in pages] == [3, 3, 1]
+        assert all(isinstance(task, Task) for page in pages for task in page)
+        assert sorted(task.id for page in pages for task in page) == [task.id for task in added]
+        
+        filtered = list(controllers['task'].iter_task_pages(page_size=2, priority=1))
+        assert [task.title for page in filtered for task in page] == ["Task 0", "Task 3", "Task 6"]
+        
+        first_page = controllers['task'].get_all_tasks(limit=3)
+        assert [task.id for task in first_page] == [task.id for task in pages[0]]
+    
+    def test_get_task_batch(self, controllers):
+        """Тест: TaskBatch совпадает с задачами и их is_overdue"""
+        now = datetime.now()
+        for i, days in enumerate([-2, 1, -1, 5]):
+            controllers['task'].add_task(f"Task {i}", "", 1 + i % 3, now + timedelta(days=days),
+                                         controllers['project_id'], controllers['user_id'])
+        controllers['task'].update_task_status(1, 'completed')
+        
+        tasks = controllers['task'].get_all_tasks()
+        batch = controllers['task'].get_task_batch()
+        
+        assert list(batch.ids) == [task.id for task in tasks]
+        assert list(batch.overdue_mask()) == [task.is_overdue() for task in tasks]
+        assert list(controllers['task'].get_task_batch(priority=1).ids) == [
+            task.id for task in tasks if task.priority == 1
+        ]
+    
+    def test_fast_path(self, controllers):
+        """Тест: fast=True создает те же объекты, что и обычный путь"""
+        due_date = datetime.now() + timedelta(days=3)
+        controllers['task'].add_task("Fast", "Desc", 2, due_date,
+                                     controllers['project_id'], controllers['user_id'])
+        
+        def same(slow, fast):
+            return [item.to_dict() for item in slow] == [item.to_dict() for item in fast]
+        
+        assert same(controllers['task'].get_all_tasks(),
+                    controllers['task'].get_all_tasks(fast=True))
+        assert same(controllers['task'].find_tasks(priority=2),
+                    controllers['task'].find_tasks(fast=True, priority=2))
+        assert same(controllers['project'].get_all_projects(),
+                    controllers['project'].get_all_projects(fast=True))
+        assert same(controllers['user'].get_all_users(),
+                    controllers['user'].get_all_users(fast=True))
+    
     def test_get_task(self, controllers):
         """Тест получения задачи"""
         # Сначала добавляем задачу
@@ -301,6 +443,58 @@ class TestTaskController:
         assert success == False
         assert updated_task.status == "in_progress"  # Не должен измениться
     
+    def test_update_task_status_single_statement(self, controllers):
+        """Тест обновления статуса одним UPDATE и сравнения с текущим статусом"""
+        task = controllers['task'].add_task("CAS", "", 1, datetime.now(),
+                                            controllers['project_id'], controllers['user_id'])
+        db = controllers['db']
+        
+        statements = []
+        db.connection.set_trace_callback(statements.append)
+        assert controllers['task'].update_task_status(task.id, "in_progress") == True
+        assert controllers['task'].update_task_status(9999, "in_progress") == False
+        db.connection.set_trace_callback(None)
+        assert not [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+        
+        # Статус уже изменен другим пользователем - обновление не применяется
+        assert controllers['task'].update_task_status(task.id, "completed",
+                                                      expected_status="pending") == False
+        assert controllers['task'].get_task(task.id).status == "in_progress"
+        assert controllers['task'].update_task_status(task.id, "completed",
+                                                      expected_status="in_progress") == True
+        assert controllers['task'].get_task(task.id).status == "completed"
+        assert controllers['task'].update_task(9999, title="Missing") == False
+    
+    def test_bulk_task_updates(self, controllers):
+        """Тест массовой смены статуса, передачи и удаления задач"""
+        task_controller = controllers['task']
+        other = controllers['user'].add_user("other", "other@example.com", "developer")
+        tasks = [task_controller.add_task(f"Bulk {i}", "", 1, datetime.now(),
+                                          controllers['project_id'], controllers['user_id'])
+                 for i in range(4)]
+        ids = [task.id for task in tasks]
+        task_controller.update_task_status(ids[0], "in_progress")
+        task_controller.update_task_status(ids[1], "in_progress")
+        
+        closed = task_controller.update_task_status_many(
+            "completed", status="in_progress", project_id=controllers['project_id'])
+        assert closed == ids[:2]
+        assert task_controller.get_task(ids[0]).status == "completed"
+        assert task_controller.update_task_status_many("invalid", ids=ids) == []
+        
+        moved = task_controller.reassign_tasks(controllers['user_id'], other.id, ids=ids[1:])
+        assert moved == ids[1:]
+        assert task_controller.get_task(ids[3]).assignee_id == other.id
+        assert task_controller.get_task(ids[0]).assignee_id == controllers['user_id']
+        
+        assert task_controller.delete_tasks(ids[2:] + [9999]) == ids[2:]
+        assert task_controller.get_task(ids[2]) is None
+        assert [task.id for task in task_controller.get_all_tasks()] == ids[:2]
+        
+        # Без ID и фильтров массовые операции не выполняются
+        assert task_controller.delete_tasks() == []
+        assert len(task_controller.get_all_tasks()) == 2
+    
     def test_get_overdue_tasks(self, controllers):
         """Тест получения просроченных задач"""
         # Добавляем просроченную задачу
@@ -627,6 +821,20 @@ class TestProjectController:
         assert success == False
         assert updated_project.status == "completed"  # Не должен измениться
     
+    def test_update_project_status_expected(self, controller):
+        """Тест обновления статуса проекта только из ожидаемого статуса"""
+        project = controller.add_project("CAS", "", datetime.now(),
+                                         datetime.now() + timedelta(days=30))
+        
+        assert controller.update_project_status(project.id, "completed",
+                                                expected_status="on_hold") == False
+        assert controller.get_project(project.id).status == "active"
+        assert controller.update_project_status(project.id, "on_hold",
+                                                expected_status="active") == True
+        assert controller.get_project(project.id).status == "on_hold"
+        assert controller.update_project_status(9999, "completed") == False
+        assert controller.update_project(9999, name="Missing") == False
+    
     def test_get_project_progress(self, controller):
         """Тест получения прогресса проекта"""
         # Добавляем проект
@@ -649,6 +857,24 @@ class TestProjectController:
         assert progress['completed_tasks'] == 0
         assert progress['progress'] == 0
         assert progress['project']['name'] == "Progress Test"
+    
+    def test_get_projects_with_progress(self, controller):
+        """Тест получения всех проектов с прогрессом"""
+        start_date = datetime.now()
+        busy = controller.add_project("Busy", "", start_date, start_date + timedelta(days=30))
+        empty = controller.add_project("Empty", "", start_date, start_date + timedelta(days=30))
+        for status in ['completed', 'pending', 'in_progress', 'completed']:
+            task = Task("Task", "", 1, start_date + timedelta(days=1), busy.id, None)
+            task.status = status
+            controller.db_manager.add_task(task)
+        
+        projects = controller.get_projects_with_progress()
+        
+        assert [project.name for project, _ in projects] == ["Busy", "Empty"]
+        assert isinstance(projects[0][0], Project)
+        assert projects[0][1] == {'total_tasks': 4, 'completed_tasks': 2, 'progress': 50.0}
+        assert projects[1][1] == {'total_tasks': 0, 'completed_tasks': 0, 'progress': 0}
+        assert projects[1][0].id == empty.id
 
 class TestUserController:
     """Тесты для UserController"""
@@ -875,6 +1101,295 @@ class TestUserController:
         tasks = controller.get_user_tasks(user.id)
         assert isinstance(tasks, list)
         assert len(tasks) == 0
+    
+    def test_get_user_tasks_single_query(self, controller):
+        """Тест получения задач пользователя одним запросом в прежнем виде"""
+        db = controller.db_manager
+        user = controller.add_user("joined", "joined@example.com", "developer")
+        project_id = db.add_project(Project("Joined", "", datetime.now(),
+                                            datetime.now() + timedelta(days=5)))
+        with_project = Task("With project", "", 2, datetime.now(), project_id, user.id)
+        without_project = Task("No project", "", 1, datetime.now() - timedelta(days=1),
+                               None, user.id)
+        expected = {}
+        for task in (with_project, without_project):
+            task.id = db.add_task(task)
+            expected[task.id] = Task.from_dict(db.get_task_by_id(task.id)).to_dict()
+        expected[with_project.id]['project_name'] = "Joined"
+        
+        statements = []
+        db.connection.set_trace_callback(statements.append)
+        tasks = controller.get_user_tasks(user.id)
+        db.connection.set_trace_callback(None)
+        
+        assert {task['id']: task for task in tasks} == expected
+        assert len([sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]) == 1
+        
+        # Только нужные поля
+        assert controller.get_user_tasks(user.id, fields=['id', 'project_name']) == [
+            {'id': without_project.id}, {'id': with_project.id, 'project_name': "Joined"}]
+    
+    def test_get_users_with_task_counts(self, controller):
+        """Тест получения пользователей с числом задач"""
+        busy = controller.add_user("busy", "busy@example.com", "developer")
+        idle = controller.add_user("idle", "idle@example.com", "manager")
+        for status in ['pending', 'completed', 'pending']:
+            task = Task("Task", "", 1, datetime.now(), None, busy.id)
+            task.status = status
+            controller.db_manager.add_task(task)
+        
+        users = controller.get_users_with_task_counts()
+        assert [(user.username, count) for user, count in users] == [("busy", 3), ("idle", 0)]
+        
+        by_status = dict((user.id, counts)
+                         for user, counts in controller.get_users_with_task_counts(by_status=True))
+        assert by_status[busy.id] == {'pending': 2, 'in_progress': 0, 'completed': 1}
+        assert by_status[idle.id] == {'pending': 0, 'in_progress': 0, 'completed': 0}
+
+
+class TestDeadlineScheduler:
+    """Тесты для DeadlineScheduler"""
+    
+    @pytest.fixture
+    def db_manager(self):
+        """Фикстура для создания временной базы данных"""
+        temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        db_path = temp_db.name
+        temp_db.close()
+        
+        db_manager = DatabaseManager(db_path)
+        yield db_manager
+        
+        db_manager.close()
+        os.unlink(db_path)
+    
+    def test_load_and_poll(self, db_manager):
+        """Тест загрузки сроков из базы и оповещения о просроченных задачах"""
+        now = datetime.now().replace(microsecond=0)
+        late = db_manager.add_task(Task("Late", "", 1, now - timedelta(hours=2), None, None))
+        later = db_manager.add_task(Task("Later", "", 1, now - timedelta(hours=1), None, None))
+        future = db_manager.add_task(Task("Future", "", 1, now + timedelta(hours=1), None, None))
+        done = Task("Done", "", 1, now - timedelta(hours=3), None, None)
+        done.status = 'completed'
+        db_manager.add_task(done)
+        
+        scheduler = DeadlineScheduler(db_manager)
+        assert scheduler.load() == 3
+        assert scheduler.next_due() == now - timedelta(hours=2)
+        
+        notified = []
+        scheduler.subscribe(notified.append)
+        assert scheduler.poll(now) == [late, later]
+        assert scheduler.poll(now) == []
+        assert notified == [[late, later]]
+        assert scheduler.next_due() == now + timedelta(hours=1)
+        assert scheduler.poll(now + timedelta(hours=2)) == [future]
+        assert scheduler.next_due() is None
+    
+    def test_controller_updates_scheduler(self, db_manager):
+        """Тест обновления планировщика при изменении задач через TaskController"""
+        scheduler = DeadlineScheduler(db_manager)
+        scheduler.load()
+        controller = TaskController(db_manager, scheduler)
+        now = datetime.now().replace(microsecond=0)
+        
+        moved = controller.add_task("Moved", "", 1, now + timedelta(days=1), None, None)
+        completed = controller.add_task("Completed", "", 1, now - timedelta(hours=1), None, None)
+        deleted = controller.add_task("Deleted", "", 1, now - timedelta(hours=1), None, None)
+        bulk = controller.add_task("Bulk", "", 1, now - timedelta(hours=1), None, None)
+        assert len(scheduler) == 4
+        
+        controller.update_task(moved.id, due_date=now - timedelta(minutes=5))
+        controller.update_task_status(completed.id, "completed")
+        controller.delete_task(deleted.id)
+        controller.update_task_status_many("completed", ids=[bulk.id])
+        assert scheduler.poll(now) == [moved.id]
+        
+        # Смена статуса без нового срока не повторяет оповещение
+        controller.update_task_status(moved.id, "in_progress")
+        assert scheduler.poll(now) == []
+        # Возврат в работу после завершения снова отслеживает срок
+        controller.update_task_status(completed.id, "pending")
+        assert scheduler.poll(now) == [completed.id]
+    
+    def test_scheduler_waits_for_commit(self, db_manager):
+        """Тест: откат транзакции не меняет планировщик"""
+        scheduler = DeadlineScheduler(db_manager)
+        controller = TaskController(db_manager, scheduler)
+        now = datetime.now().replace(microsecond=0)
+        keep = controller.add_task("Keep", "", 1, now - timedelta(hours=1), None, None)
+        done = controller.add_task("Done", "", 1, now - timedelta(hours=2), None, None)
+        assert len(scheduler) == 2
+        
+        with pytest.raises(RuntimeError):
+            with controller.transaction():
+                controller.add_task("Ghost", "", 1, now - timedelta(hours=3), None, None)
+                controller.delete_task(keep.id)
+                controller.update_task_status(done.id, "completed")
+                controller.update_task(done.id, due_date=now + timedelta(days=1))
+                assert len(scheduler) == 2
+                raise RuntimeError("rollback")
+        assert len(scheduler) == 2
+        assert scheduler.poll(now) == [done.id, keep.id]
+        
+        with controller.transaction():
+            late = controller.add_task("Late", "", 1, now - timedelta(hours=1), None, None)
+            assert len(scheduler) == 0
+        assert scheduler.poll(now) == [late.id]
+
+
+class TestEventBus:
+    """Тесты для EventBus и событий изменений в контроллерах"""
+    
+    @pytest.fixture
+    def controllers(self):
+        """Фикстура: контроллеры с общей шиной событий и временной БД"""
+        temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        db_path = temp_db.name
+        temp_db.close()
+        
+        db_manager = DatabaseManager(db_path)
+        events = EventBus()
+        yield {
+            'events': events,
+            'task': TaskController(db_manager, events=events),
+            'project': ProjectController(db_manager, events),
+            'user': UserController(db_manager, events),
+        }
+        
+        db_manager.close()
+        os.unlink(db_path)
+    
+    def test_publish_filters_and_batches(self):
+        """Тест доставки событий: фильтр по сущности, одна пачка, ошибки подписчиков"""
+        bus = EventBus()
+        task_batches, all_batches = [], []
+        
+        def failing(events):
+            raise RuntimeError("view error")
+        
+        bus.subscribe(failing)
+        bus.subscribe(task_batches.append, 'task')
+        bus.subscribe(all_batches.append)
+        task_event = ChangeEvent('task', 'updated', 1, {'status': 'completed'})
+        user_event = ChangeEvent('user', 'deleted', 2, {})
+        bus.publish(task_event, user_event)
+        
+        assert task_batches == [[task_event]]
+        assert all_batches == [[task_event, user_event]]
+        
+        bus.unsubscribe(all_batches.append)
+        bus.publish(user_event)
+        assert all_batches == [[task_event, user_event]]
+        assert task_batches == [[task_event]]
+    
+    def test_task_events(self, controllers):
+        """Тест событий задач: добавление, изменение, массовые операции и удаление"""
+        received = []
+        controllers['events'].subscribe(received.append, 'task')
+        project = controllers['project'].add_project("Events", "", datetime.now(),
+                                                     datetime.now() + timedelta(days=1))
+        user = controllers['user'].add_user("events", "events@example.com", "developer")
+        task_controller = controllers['task']
+        
+        tasks = [task_controller.add_task(f"Task {i}", "", 1, datetime.now(), project.id, None)
+                 for i in range(3)]
+        assert [batch[0].action for batch in received] == ['added'] * 3
+        assert received[0][0].changes['project_id'] == project.id
+        
+        received.clear()
+        task_controller.update_task(tasks[0].id, title="Renamed")
+        event = received[0][0]
+        assert (event.entity, event.action, event.entity_id) == ('task', 'updated', tasks[0].id)
+        assert event.changes == {'title': "Renamed"}
+        assert event.previous['title'] == "Task 0"
+        
+        # Массовая операция - одна пачка событий с прежними значениями
+        received.clear()
+        task_controller.reassign_tasks(None, user.id, ids=[tasks[1].id, tasks[2].id])
+        task_controller.update_task_status_many("completed", project_id=project.id)
+        assert [len(batch) for batch in received] == [2, 3]
+        assert received[0][0].changes == {'assignee_id': user.id}
+        assert {event.previous['status'] for event in received[1]} == {'pending'}
+        
+        received.clear()
+        task_controller.delete_task(tasks[0].id)
+        task_controller.delete_tasks(ids=[tasks[1].id, 9999])
+        assert [(batch[0].action, batch[0].entity_id) for batch in received] == [
+            ('deleted', tasks[0].id), ('deleted', tasks[1].id)]
+        assert received[0][0].previous['project_id'] == project.id
+        
+        # Неудачные изменения не публикуются
+        received.clear()
+        task_controller.update_task(9999, title="Missing")
+        task_controller.update_task_status(tasks[2].id, "in_progress", expected_status="pending")
+        assert received == []
+    
+    def test_project_and_user_events(self, controllers):
+        """Тест событий проектов и пользователей"""
+        received = []
+        controllers['events'].subscribe(received.append, 'project', 'user')
+        project = controllers['project'].add_project("Events", "", datetime.now(),
+                                                     datetime.now() + timedelta(days=1))
+        user = controllers['user'].add_user("events", "events@example.com", "developer")
+        controllers['project'].update_project_status(project.id, "on_hold")
+        controllers['user'].update_user(user.id, role="manager")
+        controllers['project'].delete_project(project.id)
+        controllers['user'].delete_user(user.id)
+        
+        events = [event for batch in received for event in batch]
+        assert [(event.entity, event.action) for event in events] == [
+            ('project', 'added'), ('user', 'added'), ('project', 'updated'),
+            ('user', 'updated'), ('project', 'deleted'), ('user', 'deleted')]
+        assert events[2].changes == {'status': "on_hold"}
+        assert events[2].previous['status'] == "active"
+        assert events[3].previous['role'] == "developer"
+        assert events[5].previous['username'] == "events"
+    
+    def test_bulk_operations_accept_generators(self, controllers):
+        """Тест: ids-генератор читается один раз и для событий, и для записи"""
+        received = []
+        controllers['events'].subscribe(received.append, 'task')
+        tasks = [controllers['task'].add_task(f"Task {i}", "", 2, datetime.now(), None, None)
+                 for i in range(3)]
+        ids = [task.id for task in tasks]
+        received.clear()
+        
+        updated = controllers['task'].update_task_status_many(
+            "completed", ids=(task_id for task_id in ids))
+        
+        assert updated == ids
+        assert {task.status for task in controllers['task'].find_tasks(ids=ids)} == {"completed"}
+        assert [event.previous['status'] for event in received[0]] == ["pending"] * 3
+        assert controllers['task'].delete_tasks(ids=iter(ids[:2])) == ids[:2]
+    
+    def test_events_wait_for_commit(self, controllers):
+        """Тест: события внутри транзакции публикуются после COMMIT, при откате - нет"""
+        received = []
+        controllers['events'].subscribe(received.append)
+        task_controller = controllers['task']
+        
+        with pytest.raises(RuntimeError):
+            with task_controller.transaction():
+                task_controller.add_task("Rolled back", "", 2, datetime.now(), None, None)
+                controllers['user'].add_user("ghost", "ghost@example.com", "developer")
+                raise RuntimeError("rollback")
+        assert received == []
+        assert task_controller.find_tasks() == []
+        
+        with task_controller.transaction():
+            kept = task_controller.add_task("Kept", "", 2, datetime.now(), None, None)
+            with pytest.raises(RuntimeError):
+                with task_controller.transaction():
+                    task_controller.update_task(kept.id, title="Inner")
+                    raise RuntimeError("rollback to savepoint")
+            task_controller.update_task(kept.id, priority=1)
+            assert received == []
+        
+        assert [(batch[0].action, batch[0].changes.get('title')) for batch in received] == [
+            ('added', "Kept"), ('updated', None)]
+        assert received[1][0].changes == {'priority': 1}
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -1,13 +1,20 @@
 import pytest
+import sqlite3
 import tempfile
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 # Добавляем путь к проекту
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from database.database_manager import DatabaseManager
+from database import database_manager
+from database.database_manager import DatabaseManager, TASK_FIELDS, USER_FIELDS
+from database.pagination import iter_pages, task_key
+from database.cache import LRUCache, QueryCache
 from models.task import Task
 from models.project import Project
 from models.user import User
@@ -433,6 +440,955 @@ class TestDatabaseManager:
         # Пытаемся удалить несуществующую задачу
         success = db_manager.delete_task(999)
         assert success == False
+    
+    def test_task_indexes_created(self, db_manager):
+        """Тест создания управляемых индексов задач"""
+        db_manager.cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='tasks'"
+        )
+        indexes = [row[0] for row in db_manager.cursor.fetchall()]
+        
+        assert 'idx_tasks_due' in indexes
+        assert 'idx_tasks_project_due' in indexes
+        assert 'idx_tasks_assignee_due' in indexes
+        assert 'idx_tasks_open_due' in indexes
+    
+    def test_task_indexes_upgraded(self, db_manager):
+        """Тест пересоздания устаревших индексов при старте"""
+        db_manager.cursor.execute('DROP INDEX idx_tasks_project_due')
+        db_manager.cursor.execute('CREATE INDEX idx_tasks_project_due ON tasks (project_id)')
+        db_manager.cursor.execute('CREATE INDEX idx_tasks_obsolete ON tasks (title)')
+        db_manager.connection.commit()
+        
+        db_manager.create_task_indexes()
+        
+        db_manager.cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name='tasks'"
+        )
+        indexes = {row[0]: row[1] for row in db_manager.cursor.fetchall()}
+        assert 'idx_tasks_obsolete' not in indexes
+        assert indexes['idx_tasks_project_due'].endswith('(project_id, due_date, priority)')
+    
+    def test_task_queries_use_indexes(self, db_manager):
+        """Тест: запросы к задачам не сканируют таблицу и не сортируют во временном B-дереве"""
+        user_id = db_manager.add_user(User("planuser", "plan@example.com", "developer"))
+        project = Project("Plan Project", "Description", datetime.now(), datetime.now())
+        project_id = db_manager.add_project(project)
+        task_id = db_manager.add_task(
+            Task("Plan Task", "Desc", 1, datetime.now(), project_id, user_id)
+        )
+        
+        statements = []
+        db_manager.connection.set_trace_callback(statements.append)
+        db_manager.get_task_by_id(task_id)
+        db_manager.get_all_tasks()
+        db_manager.get_tasks_by_project(project_id)
+        db_manager.get_tasks_by_user(user_id)
+        db_manager.get_overdue_tasks()
+        db_manager.get_project_progress(project_id)
+        db_manager.connection.set_trace_callback(None)
+        
+        selects = [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+        assert len(selects) == 6
+        for sql in selects:
+            db_manager.cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = [row['detail'] for row in db_manager.cursor.fetchall()]
+            for detail in plan:
+                # get_all_tasks читает всю таблицу, но в порядке индекса
+                assert not detail.startswith('SCAN') or 'INDEX' in detail, sql
+                assert 'TEMP B-TREE' not in detail, sql
+    
+    def test_search_tasks_full_text(self, db_manager):
+        """Тест полнотекстового поиска задач"""
+        assert db_manager.fts_enabled == True
+        
+        task1 = Task("Refactor parser", "Speed up tokenizer", 1, datetime.now(), None, None)
+        task2 = Task("Write docs", "Describe the parser API", 2, datetime.now(), None, None)
+        task1_id = db_manager.add_task(task1)
+        task2_id = db_manager.add_task(task2)
+        
+        # Поиск по префиксу слова
+        results = db_manager.search_tasks("pars")
+        assert {r['id'] for r in results} == {task1_id, task2_id}
+        
+        # Совпадение в названии весит больше, чем в описании
+        results = db_manager.search_tasks("parser", ranked=True)
+        assert [r['id'] for r in results] == [task1_id, task2_id]
+        
+        # Подсветка найденного фрагмента
+        results = db_manager.search_tasks("tokenizer", highlight=True)
+        assert len(results) == 1
+        assert results[0]['snippet'] == "Speed up [tokenizer]"
+        
+        # Индекс следит за изменениями и удалениями
+        db_manager.update_task(task2_id, title="Write guide", description="Nothing here")
+        assert [r['id'] for r in db_manager.search_tasks("parser")] == [task1_id]
+        assert [r['id'] for r in db_manager.search_tasks("guide")] == [task2_id]
+        
+        db_manager.delete_task(task1_id)
+        assert db_manager.search_tasks("parser") == []
+    
+    def test_search_tasks_like_fallback(self, db_manager):
+        """Тест поиска подстроки, когда FTS5 недоступен"""
+        db_manager.add_task(Task("Database Task", "Desc", 1, datetime.now(), None, None))
+        db_manager.fts_enabled = False
+        
+        # LIKE находит подстроку внутри слова
+        results = db_manager.search_tasks("abase")
+        assert len(results) == 1
+        assert results[0]['title'] == "Database Task"
+        
+        results = db_manager.search_tasks("abase", highlight=True)
+        assert results[0]['snippet'] is None
+    
+    def test_add_bulk(self, db_manager):
+        """Тест пакетной вставки пользователей, проектов и задач"""
+        now = datetime.now()
+        user_ids = db_manager.add_users(
+            [User(f"bulk{i}", f"bulk{i}@example.com", "developer") for i in range(3)]
+        )
+        assert list(user_ids) == [1, 2, 3]
+        
+        project_ids = db_manager.add_projects([
+            Project("Bulk Project", "Description", now, now + timedelta(days=1)),
+            ("Tuple Project", "Description", now, now + timedelta(days=2), "on_hold", now),
+        ])
+        assert len(project_ids) == 2
+        assert db_manager.get_project_by_id(project_ids[1])['status'] == "on_hold"
+        start_date = db_manager.get_project_by_id(project_ids[1])['start_date']
+        assert start_date == now.strftime('%Y-%m-%d')
+        
+        tasks = (
+            Task(f"Bulk Task {i}", "Desc", 1, now, project_ids[0], user_ids[0])
+            for i in range(10)
+        )
+        task_ids = db_manager.add_tasks(tasks, chunk_size=3)
+        assert len(task_ids) == 10
+        assert db_manager.get_task_by_id(task_ids[-1])['title'] == "Bulk Task 9"
+        assert len(db_manager.get_tasks_by_project(project_ids[0])) == 10
+        
+        # Пустой ввод ничего не вставляет
+        assert len(db_manager.add_tasks([])) == 0
+    
+    def test_add_bulk_rollback(self, db_manager):
+        """Тест: ошибка в пачке откатывает всю вставку"""
+        users = [
+            User("dup", "dup1@example.com", "developer"),
+            User("dup", "dup2@example.com", "developer"),
+        ]
+        with pytest.raises(sqlite3.IntegrityError):
+            db_manager.add_users(users, chunk_size=1)
+        
+        assert db_manager.get_all_users() == []
+    
+    def test_transaction_commit(self, db_manager):
+        """Тест: изменения внутри транзакции фиксируются одним COMMIT"""
+        reader = sqlite3.connect(db_manager.db_path)
+        
+        with db_manager.transaction():
+            user_id = db_manager.add_user(User("txuser", "tx@example.com", "developer"))
+            db_manager.update_user(user_id, role="manager")
+            # До выхода из блока другое соединение изменений не видит
+            assert reader.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+        
+        assert reader.execute("SELECT role FROM users").fetchone()[0] == "manager"
+        reader.close()
+    
+    def test_transaction_rollback(self, db_manager):
+        """Тест: исключение внутри транзакции откатывает все изменения"""
+        with pytest.raises(ValueError):
+            with db_manager.transaction():
+                db_manager.add_user(User("txuser", "tx@example.com", "developer"))
+                raise ValueError("abort")
+        
+        assert db_manager.get_all_users() == []
+        
+        # После отката менеджер продолжает работать в обычном режиме
+        db_manager.add_user(User("after", "after@example.com", "developer"))
+        assert len(db_manager.get_all_users()) == 1
+    
+    def test_transaction_nested(self, db_manager):
+        """Тест: вложенная транзакция откатывается до точки сохранения"""
+        with db_manager.transaction():
+            db_manager.add_user(User("outer", "outer@example.com", "developer"))
+            
+            with pytest.raises(sqlite3.IntegrityError):
+                with db_manager.transaction():
+                    db_manager.add_user(User("inner", "inner@example.com", "developer"))
+                    db_manager.add_user(User("outer", "dup@example.com", "developer"))
+            
+            # Пакетная вставка внутри транзакции становится точкой сохранения
+            db_manager.add_users([User("bulk", "bulk@example.com", "developer")])
+        
+        usernames = [user['username'] for user in db_manager.get_all_users()]
+        assert usernames == ["outer", "bulk"]
+    
+    def test_connection_profile(self, db_manager):
+        """Тест профиля соединения по умолчанию"""
+        settings = db_manager.get_connection_settings()
+        assert settings['profile'] == 'balanced'
+        assert settings['journal_mode'] == 'wal'
+        assert settings['synchronous'] == 1  # NORMAL
+        assert settings['temp_store'] == 2  # MEMORY
+        
+        db_manager.set_profile('fast-bulk')
+        settings = db_manager.get_connection_settings()
+        assert settings['profile'] == 'fast-bulk'
+        assert settings['synchronous'] == 0  # OFF
+        
+        with pytest.raises(ValueError):
+            db_manager.set_profile('unknown')
+    
+    def test_connection_profile_invalid(self):
+        """Тест создания менеджера с неизвестным профилем"""
+        with pytest.raises(ValueError):
+            DatabaseManager(':memory:', profile='unknown')
+    
+    def test_reader_not_blocked_by_writer(self, db_manager):
+        """Тест: в режиме WAL чтение не ждет незавершенную запись"""
+        db_manager.add_user(User("first", "first@example.com", "developer"))
+        reader = DatabaseManager(db_manager.db_path, profile='durable')
+        
+        with db_manager.transaction():
+            db_manager.add_users(
+                [User(f"user{i}", f"user{i}@example.com", "developer") for i in range(100)]
+            )
+            # Читатель видит последнее зафиксированное состояние
+            assert len(reader.get_all_users()) == 1
+        
+        assert len(reader.get_all_users()) == 101
+        reader.close()
+    
+    def test_pooled_threads(self, db_manager):
+        """Тест режима пула: запросы из нескольких потоков"""
+        pooled = DatabaseManager(db_manager.db_path, pooled=True)
+        
+        def add_and_read(i):
+            user_id = pooled.add_user(User(f"user{i}", f"user{i}@example.com", "developer"))
+            return pooled.get_user_by_id(user_id)['username']
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            usernames = list(executor.map(add_and_read, range(20)))
+        
+        assert usernames == [f"user{i}" for i in range(20)]
+        assert len(pooled.get_all_users()) == 20
+        assert pooled.get_connection_settings()['pooled'] == True
+        pooled.close()
+    
+    def test_pooled_transactions_per_thread(self, db_manager):
+        """Тест: транзакция одного потока не видна и не мешает другому"""
+        pooled = DatabaseManager(db_manager.db_path, pooled=True)
+        seen_from_thread = []
+        
+        with pooled.transaction():
+            pooled.add_user(User("main", "main@example.com", "developer"))
+            worker = threading.Thread(
+                target=lambda: seen_from_thread.append(len(pooled.get_all_users()))
+            )
+            worker.start()
+            worker.join()
+        
+        assert seen_from_thread == [0]
+        assert len(pooled.get_all_users()) == 1
+        pooled.close()
+    
+    def test_pooled_connections_released(self, db_manager):
+        """Тест: соединения завершившихся потоков закрываются и не копятся в пуле"""
+        pooled = DatabaseManager(db_manager.db_path, pooled=True)
+        pooled.add_user(User("main", "main@example.com", "developer"))
+        
+        for _ in range(50):
+            worker = threading.Thread(target=pooled.get_all_users)
+            worker.start()
+            worker.join()
+        assert len(pooled._connections) == 1
+        
+        released = []
+        
+        def release_in_thread():
+            pooled.get_all_users()
+            with pooled.transaction():
+                with pytest.raises(RuntimeError):
+                    pooled.release_connection()
+            pooled.release_connection()
+            released.append(len(pooled._connections))
+            # Следующий запрос открывает новое соединение
+            released.append(len(pooled.get_all_users()))
+        
+        worker = threading.Thread(target=release_in_thread)
+        worker.start()
+        worker.join()
+        assert released == [1, 1]
+        assert len(pooled._connections) == 1
+        assert len(pooled.get_all_users()) == 1
+        pooled.close()
+    
+    def test_pooled_memory_database(self):
+        """Тест: база в памяти не поддерживает режим пула"""
+        with pytest.raises(ValueError):
+            DatabaseManager(':memory:', pooled=True)
+    
+    def test_get_task_listing(self, db_manager):
+        """Тест списка задач с названием проекта и именем исполнителя"""
+        user_id = db_manager.add_user(User("lister", "lister@example.com", "developer"))
+        project = Project("Listing Project", "Description", datetime.now(), datetime.now())
+        project_id = db_manager.add_project(project)
+        
+        past = datetime.now() - timedelta(days=1)
+        future = datetime.now() + timedelta(days=1)
+        db_manager.add_task(Task("Assigned", "Report", 1, past, project_id, user_id))
+        db_manager.add_task(Task("Orphan", "Report", 2, future, None, None))
+        done = Task("Done", "Other", 3, past, project_id, user_id)
+        done.status = "completed"
+        db_manager.add_task(done)
+        
+        statements = []
+        db_manager.connection.set_trace_callback(statements.append)
+        rows = db_manager.get_task_listing()
+        db_manager.connection.set_trace_callback(None)
+        
+        selects = [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+        assert len(selects) == 1
+        assert [row['title'] for row in rows] == ["Assigned", "Done", "Orphan"]
+        assert rows[0]['project_name'] == "Listing Project"
+        assert rows[0]['assignee_name'] == "lister"
+        assert rows[0]['is_overdue'] == 1
+        assert rows[1]['is_overdue'] == 0  # завершенная задача не просрочена
+        assert rows[2]['project_name'] is None
+        assert rows[2]['assignee_name'] is None
+        
+        # Фильтры
+        assert [r['title'] for r in db_manager.get_task_listing(status="completed")] == ["Done"]
+        assert [r['title'] for r in db_manager.get_task_listing(priority=2)] == ["Orphan"]
+        assert len(db_manager.get_task_listing(text="report")) == 2
+        assert db_manager.get_task_listing(text="report", priority=3) == []
+    
+    def test_find_tasks(self, db_manager):
+        """Тест поиска задач по комбинации фильтров"""
+        user1_id = db_manager.add_user(User("finder1", "finder1@example.com", "developer"))
+        user2_id = db_manager.add_user(User("finder2", "finder2@example.com", "developer"))
+        project = Project("Find Project", "Description", datetime.now(), datetime.now())
+        project_id = db_manager.add_project(project)
+        
+        now = datetime.now()
+        db_manager.add_task(Task("Alpha report", "Desc", 1, now + timedelta(days=1),
+                                 project_id, user1_id))
+        db_manager.add_task(Task("Beta", "Desc", 2, now + timedelta(days=3), project_id, user2_id))
+        gamma = Task("Gamma report", "Desc", 3, now + timedelta(days=5), None, user1_id)
+        gamma.status = "in_progress"
+        db_manager.add_task(gamma)
+        
+        def titles(**filters):
+            return [task['title'] for task in db_manager.find_tasks(**filters)]
+        
+        assert titles() == ["Alpha report", "Beta", "Gamma report"]
+        assert titles(project_id=project_id) == ["Alpha report", "Beta"]
+        assert titles(assignee_id=user1_id, status="pending") == ["Alpha report"]
+        assert titles(priority=[2, 3]) == ["Beta", "Gamma report"]
+        assert titles(status=["in_progress", "completed"]) == ["Gamma report"]
+        assert titles(due_after=now + timedelta(days=2)) == ["Beta", "Gamma report"]
+        assert titles(due_before=now + timedelta(days=4), due_after=now + timedelta(days=2)) == [
+            "Beta"
+        ]
+        assert titles(text="report", assignee_id=user1_id) == ["Alpha report", "Gamma report"]
+        assert titles(priority=[]) == []
+        
+        with pytest.raises(TypeError):
+            db_manager.find_tasks(unknown=1)
+        
+        # Фильтр по проекту использует индекс
+        statements = []
+        db_manager.connection.set_trace_callback(statements.append)
+        db_manager.find_tasks(project_id=project_id, status="pending")
+        db_manager.connection.set_trace_callback(None)
+        selects = [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+        plan = db_manager.connection.execute('EXPLAIN QUERY PLAN ' + selects[0]).fetchall()
+        assert 'USING INDEX idx_tasks_project_due' in plan[0]['detail']
+    
+    def test_keyset_pagination(self, db_manager):
+        """Тест постраничной выборки задач по ключу (due_date, priority, id)"""
+        due_date = datetime(2030, 1, 1, 12, 0)
+        # Одинаковые ключи сортировки различаются только по id
+        db_manager.add_tasks(
+            (f"Task {i}", "", 1 + i % 2, 'pending', due_date + timedelta(days=i // 4), None, None,
+             datetime.now())
+            for i in range(10)
+        )
+        expected = [task['id'] for task in db_manager.get_all_tasks()]
+        
+        pages = list(iter_pages(db_manager.get_all_tasks, task_key, page_size=3))
+        assert [len(page) for page in pages] == [3, 3, 3, 1]
+        assert [task['id'] for page in pages for task in page] == expected
+        
+        # Вставка во время обхода не дает пропусков и повторов
+        seen = []
+        for page in iter_pages(db_manager.get_all_tasks, task_key, page_size=4):
+            if not seen:
+                db_manager.add_task(Task("Early", "", 1, due_date - timedelta(days=1), None, None))
+            seen.extend(task['id'] for task in page)
+        assert seen == expected
+        
+        users = [db_manager.add_user(User(f"page{i}", f"page{i}@example.com", "developer"))
+                 for i in range(5)]
+        page = db_manager.get_all_users(after=users[1], limit=2)
+        assert [user['id'] for user in page] == users[2:4]
+        
+        # Следующая страница ищется по индексу, а не сканированием таблицы
+        statements = []
+        db_manager.connection.set_trace_callback(statements.append)
+        db_manager.get_all_tasks(after=task_key(pages[0][-1]), limit=3)
+        db_manager.connection.set_trace_callback(None)
+        selects = [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+        plan = db_manager.connection.execute('EXPLAIN QUERY PLAN ' + selects[0]).fetchall()
+        assert 'USING INDEX idx_tasks_due' in plan[0]['detail']
+    
+    def test_iter_rows(self, db_manager):
+        """Тест потокового перебора строк пачками"""
+        project_id = db_manager.add_project(
+            Project("Stream Project", "Description", datetime.now(), datetime.now())
+        )
+        due_date = datetime.now() + timedelta(days=1)
+        db_manager.add_tasks(
+            (f"Task {i}", "", 1, 'pending', due_date, project_id if i % 2 else None, None,
+             datetime.now())
+            for i in range(25)
+        )
+        
+        rows = db_manager.iter_tasks(batch_size=4)
+        assert not isinstance(rows, list)
+        assert list(rows) == db_manager.get_all_tasks()
+        assert list(db_manager.iter_tasks_by_project(project_id, batch_size=5)) == \
+            db_manager.get_tasks_by_project(project_id)
+        assert list(db_manager.iter_task_listing(batch_size=7, priority=1)) == \
+            db_manager.get_task_listing(priority=1)
+        assert list(db_manager.iter_projects()) == db_manager.get_all_projects()
+        
+        # Строки читаются пачками по batch_size
+        fetched = []
+        original = DatabaseManager._execute
+        
+        def execute(*args):
+            cursor = original(db_manager, *args)
+            fetched.append(cursor)
+            return cursor
+        
+        db_manager._execute = execute
+        rows = db_manager.iter_tasks(batch_size=10)
+        next(rows)
+        assert fetched[0].arraysize == 10
+        rows.close()
+        with pytest.raises(sqlite3.ProgrammingError):
+            fetched[0].fetchone()
+    
+    def test_as_tuples(self, db_manager):
+        """Тест выборки строк кортежами в порядке *_FIELDS"""
+        user_id = db_manager.add_user(User("tuple", "tuple@example.com", "developer"))
+        db_manager.add_task(Task("Tuple task", "Desc", 2, datetime.now() - timedelta(days=1),
+                                 None, user_id))
+        
+        rows = db_manager.get_all_tasks(as_tuples=True)
+        assert type(rows[0]) is tuple
+        assert [dict(zip(TASK_FIELDS, row)) for row in rows] == db_manager.get_all_tasks()
+        assert db_manager.get_tasks_by_user(user_id, as_tuples=True) == rows
+        assert db_manager.get_overdue_tasks(as_tuples=True) == rows
+        assert list(db_manager.iter_tasks(as_tuples=True)) == rows
+        assert db_manager.get_all_users(as_tuples=True) == [
+            tuple(db_manager.get_user_by_id(user_id)[field] for field in USER_FIELDS)
+        ]
+        # Обычные запросы по-прежнему возвращают словари
+        assert db_manager.get_task_listing()[0]['title'] == "Tuple task"
+    
+    def test_epoch_dates_migration(self, db_manager):
+        """Тест перевода дат в секунды от эпохи с переносом существующих записей"""
+        due_date = datetime(2020, 5, 6, 7, 8, 9)
+        user_id = db_manager.add_user(User("epoch", "epoch@example.com", "developer"))
+        project_id = db_manager.add_project(
+            Project("Epoch Project", "Description", datetime(2020, 1, 1), datetime(2020, 12, 31))
+        )
+        task_ids = [db_manager.add_task(Task(f"Task {i}", "Desc", 1, due_date + timedelta(days=i),
+                                             project_id, user_id))
+                    for i in range(5)]
+        before = db_manager.get_all_tasks()
+        db_manager.close()
+        
+        migrated = DatabaseManager(db_manager.db_path, epoch_dates=True)
+        try:
+            assert migrated.epoch_dates
+            assert migrated.connection.execute('PRAGMA user_version').fetchone()[0] == 1
+            types = migrated.connection.execute(
+                'SELECT DISTINCT typeof(due_date), typeof(created_at) FROM tasks'
+            ).fetchall()
+            assert [tuple(row) for row in types] == [('integer', 'integer')]
+            project = migrated.get_project_by_id(project_id)
+            assert project['start_date'] == '2020-01-01'  # даты без времени остаются текстом
+            
+            # Модели и запросы работают как раньше
+            task = Task.from_dict(migrated.get_task_by_id(task_ids[0]))
+            assert task.due_date == due_date
+            assert task.created_at == Task.from_dict(before[0]).created_at
+            assert isinstance(Project.from_dict(project).created_at, datetime)
+            assert isinstance(User.from_dict(migrated.get_user_by_id(user_id)).registration_date,
+                              datetime)
+            assert [row['id'] for row in migrated.find_tasks(
+                due_after=due_date + timedelta(days=1), due_before=due_date + timedelta(days=3)
+            )] == task_ids[1:3]
+            assert len(migrated.get_overdue_tasks()) == 5
+            
+            migrated.add_task(Task("New", "Desc", 2, datetime.now() + timedelta(days=1),
+                                   None, None))
+            migrated.update_task(task_ids[0], due_date=due_date + timedelta(days=10))
+            moved = migrated.get_task_by_id(task_ids[0])['due_date']
+            assert moved == migrated.get_task_by_id(task_ids[1])['due_date'] + 9 * 86400
+            assert [row['is_overdue'] for row in migrated.get_task_listing()][-1] == 0
+        finally:
+            migrated.close()
+        
+        # Версия схемы сохраняется в базе
+        reopened = DatabaseManager(db_manager.db_path)
+        try:
+            assert reopened.epoch_dates
+            assert reopened.migrate_to_epoch_dates() == 0
+        finally:
+            reopened.close()
+    
+    def test_epoch_dates_migration_by_other_manager(self, db_manager):
+        """Тест: менеджер, открытый до миграции, после нее пишет даты секундами"""
+        overdue = datetime.now() - timedelta(days=1)
+        db_manager.add_task(Task("Before", "Desc", 1, overdue, None, None))
+        assert not db_manager.epoch_dates
+        
+        migrated = DatabaseManager(db_manager.db_path, epoch_dates=True)
+        try:
+            db_manager.add_task(Task("Single", "Desc", 1, overdue, None, None))
+            db_manager.add_tasks([Task("Bulk", "Desc", 1, overdue, None, None)])
+            
+            assert db_manager.epoch_dates
+            types = migrated.connection.execute(
+                'SELECT DISTINCT typeof(due_date), typeof(created_at) FROM tasks'
+            ).fetchall()
+            assert [tuple(row) for row in types] == [('integer', 'integer')]
+            assert [row['title'] for row in db_manager.get_overdue_tasks()] == [
+                "Before", "Single", "Bulk"
+            ]
+        finally:
+            migrated.close()
+    
+    def test_get_by_id_cache(self, db_manager):
+        """Тест кэша get_*_by_id и его сброса при изменениях"""
+        user_id = db_manager.add_user(User("cached", "cached@example.com", "developer"))
+        task_id = db_manager.add_task(Task("Cached", "Desc", 1, datetime.now(), None, user_id))
+        
+        statements = []
+        db_manager.connection.set_trace_callback(statements.append)
+        first = db_manager.get_task_by_id(task_id)
+        second = db_manager.get_task_by_id(task_id)
+        db_manager.connection.set_trace_callback(None)
+        
+        selects = [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+        assert first == second
+        assert len(selects) == 1
+        first['title'] = "Changed outside"  # копия не меняет запись в кэше
+        assert db_manager.get_task_by_id(task_id)['title'] == "Cached"
+        
+        db_manager.update_task(task_id, status="completed")
+        assert db_manager.get_task_by_id(task_id)['status'] == "completed"
+        db_manager.update_user(user_id, role="manager")
+        assert db_manager.get_user_by_id(user_id)['role'] == "manager"
+        
+        # Откат транзакции не оставляет в кэше незафиксированных значений
+        with pytest.raises(RuntimeError):
+            with db_manager.transaction():
+                db_manager.update_task(task_id, title="Uncommitted")
+                assert db_manager.get_task_by_id(task_id)['title'] == "Uncommitted"
+                raise RuntimeError("rollback")
+        assert db_manager.get_task_by_id(task_id)['title'] == "Cached"
+        
+        db_manager.delete_task(task_id)
+        assert db_manager.get_task_by_id(task_id) is None
+        
+        stats = db_manager.get_cache_stats()
+        assert stats['hits'] >= 2
+        assert stats['misses'] >= 4
+        assert stats['size'] == 1  # пользователь; удаленная задача в кэше не хранится
+    
+    def test_get_by_id_cache_in_transaction(self, db_manager):
+        """Тест: записи, прочитанные внутри транзакции, не попадают в кэш"""
+        task_id = db_manager.add_task(Task("Committed", "Desc", 1, datetime.now(), None, None))
+        
+        with db_manager.transaction():
+            db_manager.update_task(task_id, title="Outer")
+            with pytest.raises(RuntimeError):
+                with db_manager.transaction():
+                    db_manager.update_task(task_id, title="Inner")
+                    assert db_manager.get_task_by_id(task_id)['title'] == "Inner"
+                    raise RuntimeError("rollback to savepoint")
+            assert db_manager.get_task_by_id(task_id)['title'] == "Outer"
+        assert db_manager.get_task_by_id(task_id)['title'] == "Outer"
+        
+        pooled = DatabaseManager(db_manager.db_path, pooled=True)
+        seen_from_thread = []
+        try:
+            with pooled.transaction():
+                pooled.update_task(task_id, title="Uncommitted")
+                assert pooled.get_task_by_id(task_id)['title'] == "Uncommitted"
+                worker = threading.Thread(
+                    target=lambda: seen_from_thread.append(pooled.get_task_by_id(task_id))
+                )
+                worker.start()
+                worker.join()
+                assert pooled.get_task_by_id(task_id)['title'] == "Uncommitted"
+            assert seen_from_thread[0]['title'] == "Outer"
+            assert pooled.get_task_by_id(task_id)['title'] == "Uncommitted"
+        finally:
+            pooled.close()
+    
+    def test_get_by_id_cache_disabled(self):
+        """Тест работы без кэша (cache_size=0)"""
+        manager = DatabaseManager(':memory:', cache_size=0)
+        try:
+            user_id = manager.add_user(User("nocache", "nocache@example.com", "developer"))
+            assert manager.get_user_by_id(user_id)['username'] == "nocache"
+            assert manager.get_user_by_id(user_id)['username'] == "nocache"
+            assert manager.get_cache_stats()['hits'] == 0
+            assert manager.get_cache_stats()['size'] == 0
+        finally:
+            manager.close()
+    
+    def test_query_cache(self, db_manager):
+        """Тест кэша результатов запросов и его сброса по версиям таблиц"""
+        project_id = db_manager.add_project(
+            Project("Cached Project", "Description", datetime.now(), datetime.now())
+        )
+        db_manager.add_task(Task("First", "Desc", 1, datetime.now() + timedelta(days=1),
+                                 project_id, None))
+        
+        def count_selects(func):
+            statements = []
+            db_manager.connection.set_trace_callback(statements.append)
+            result = func()
+            db_manager.connection.set_trace_callback(None)
+            return result, sum(1 for sql in statements if sql.lstrip().upper().startswith('SELECT'))
+        
+        first, queries = count_selects(lambda: db_manager.get_tasks_by_project(project_id))
+        assert queries == 1
+        second, queries = count_selects(lambda: db_manager.get_tasks_by_project(project_id))
+        assert queries == 0
+        assert second == first and second is not first
+        # Изменение полученных строк не меняет результат в кэше
+        second[0]['title'] = "Changed outside"
+        assert db_manager.get_tasks_by_project(project_id)[0]['title'] == "First"
+        assert count_selects(lambda: db_manager.get_project_progress(project_id))[1] == 1
+        assert count_selects(lambda: db_manager.get_project_progress(project_id))[1] == 0
+        
+        # Запись в таблицу задач сбрасывает зависящие от нее результаты
+        db_manager.add_task(Task("Second", "Desc", 2, datetime.now(), project_id, None))
+        tasks, queries = count_selects(lambda: db_manager.get_tasks_by_project(project_id))
+        assert queries == 1
+        assert [task['title'] for task in tasks] == ["Second", "First"]
+        assert db_manager.get_project_progress(project_id)['total_tasks'] == 2
+        # Список проектов от таблицы задач не зависит
+        db_manager.get_all_projects()
+        db_manager.update_task(tasks[0]['id'], status="completed")
+        assert count_selects(db_manager.get_all_projects)[1] == 0
+        
+        # Изменения через другое соединение тоже сбрасывают кэш
+        other = DatabaseManager(db_manager.db_path)
+        try:
+            other.delete_task(tasks[0]['id'])
+        finally:
+            other.close()
+        assert [task['title'] for task in db_manager.get_tasks_by_project(project_id)] == ["First"]
+        
+        # Внутри транзакции кэш не используется
+        with db_manager.transaction():
+            db_manager.get_all_projects()
+            assert count_selects(db_manager.get_all_projects)[1] == 1
+        
+        stats = db_manager.get_query_cache_stats()
+        assert stats['hits'] >= 3
+        assert stats['stale'] >= 1
+    
+    def test_query_cache_time_dependent(self):
+        """Тест кэширования запросов, зависящих от текущего времени"""
+        manager = DatabaseManager(':memory:', time_cache_ttl=None)
+        try:
+            manager.add_task(Task("Later", "Desc", 1, datetime.now() + timedelta(days=1),
+                                  None, None))
+            manager.get_overdue_tasks()
+            manager.get_overdue_tasks()
+            assert manager.get_query_cache_stats()['size'] == 0  # без ttl не кэшируются
+            
+            manager.time_cache_ttl = 60
+            # Текущее время не входит в ключ: повторный вызов берет результат из кэша
+            manager.get_task_listing()
+            manager.get_task_listing()
+            stats = manager.get_query_cache_stats()
+            assert (stats['size'], stats['hits']) == (1, 1)
+        finally:
+            manager.close()
+    
+    def test_task_listing_fresh(self, db_manager, monkeypatch):
+        """Тест: fresh=True пересчитывает просрочку в обход кэша списка"""
+        task_id = db_manager.add_task(Task("Soon", "Desc", 1, datetime.now() + timedelta(hours=1),
+                                           None, None))
+        assert db_manager.get_task_listing()[0]['is_overdue'] == 0
+        
+        class Later(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime.now(tz) + timedelta(hours=2)
+        
+        monkeypatch.setattr(database_manager, 'datetime', Later)
+        # Текущее время не входит в ключ кэша: без fresh строка остается прежней
+        assert db_manager.get_task_listing()[0]['is_overdue'] == 0
+        rows = db_manager.get_task_listing(ids=[task_id], fresh=True)
+        assert [(row['id'], row['is_overdue']) for row in rows] == [(task_id, 1)]
+    
+    def test_get_all_project_progress(self, db_manager):
+        """Тест прогресса всех проектов одним запросом"""
+        now = datetime.now()
+        project_ids = [db_manager.add_project(Project(f"Project {i}", "", now, now))
+                       for i in range(3)]
+        for i, status in enumerate(['completed', 'pending', 'completed']):
+            task = Task(f"Task {i}", "", 1, now, project_ids[0], None)
+            task.status = status
+            db_manager.add_task(task)
+        db_manager.add_task(Task("Other", "", 1, now, project_ids[2], None))
+        db_manager.add_task(Task("No project", "", 1, now, None, None))
+        
+        statements = []
+        db_manager.connection.set_trace_callback(statements.append)
+        rows = db_manager.get_all_project_progress()
+        db_manager.connection.set_trace_callback(None)
+        
+        selects = [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+        assert len(selects) == 1
+        assert [row['name'] for row in rows] == ["Project 0", "Project 1", "Project 2"]
+        assert [(row['total_tasks'], row['completed_tasks']) for row in rows] == [
+            (3, 2), (0, 0), (1, 0)
+        ]
+        assert rows[0]['progress'] == pytest.approx(200 / 3)
+        assert rows[1]['progress'] == 0
+        for row in rows:
+            expected = db_manager.get_project_progress(row['id'])
+            assert row['total_tasks'] == expected['total_tasks']
+            assert row['progress'] == pytest.approx(expected['progress'])
+    
+    def test_get_task_counts_by_user(self, db_manager):
+        """Тест подсчета задач исполнителей по счетчикам task_stats"""
+        user_ids = [db_manager.add_user(User(f"counter{i}", f"counter{i}@example.com", "developer"))
+                    for i in range(3)]
+        for assignee_id, status in [(user_ids[0], 'pending'), (user_ids[0], 'completed'),
+                                    (user_ids[1], 'in_progress'), (None, 'pending')]:
+            task = Task("Task", "", 1, datetime.now(), None, assignee_id)
+            task.status = status
+            db_manager.add_task(task)
+        
+        assert db_manager.get_task_counts_by_user() == {user_ids[0]: 2, user_ids[1]: 1}
+        assert db_manager.get_task_counts_by_user(by_status=True) == {
+            user_ids[0]: {'pending': 1, 'in_progress': 0, 'completed': 1},
+            user_ids[1]: {'pending': 0, 'in_progress': 1, 'completed': 0},
+        }
+        assert db_manager.get_task_counts_by_user(user_ids=[user_ids[1], user_ids[2]]) == {
+            user_ids[1]: 1}
+        assert db_manager.get_task_counts_by_user(user_ids=[]) == {}
+        
+        # Счетчики читаются из task_stats по первичному ключу, задачи не перебираются
+        for options in ({}, {'by_status': True}, {'user_ids': [user_ids[0]]}):
+            statements = []
+            db_manager.connection.set_trace_callback(statements.append)
+            db_manager.query_cache.clear()
+            db_manager.get_task_counts_by_user(**options)
+            db_manager.connection.set_trace_callback(None)
+            selects = [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+            plan = db_manager.connection.execute('EXPLAIN QUERY PLAN ' + selects[0]).fetchall()
+            assert plan[0]['detail'].startswith('SEARCH task_stats USING PRIMARY KEY')
+        # Для выбранных исполнителей - поиск по полному ключу (scope, owner_id)
+        assert 'owner_id=?' in plan[0]['detail']
+    
+    def test_get_user_task_rows(self, db_manager):
+        """Тест задач пользователя с названием проекта и выборкой полей"""
+        user_id = db_manager.add_user(User("rows", "rows@example.com", "developer"))
+        project_id = db_manager.add_project(Project("Rows", "", datetime.now(),
+                                                    datetime.now() + timedelta(days=3)))
+        task_id = db_manager.add_task(Task("Task", "", 1, datetime.now(), project_id, user_id))
+        
+        rows = db_manager.get_user_task_rows(user_id)
+        assert len(rows) == 1
+        assert set(rows[0]) == set(TASK_FIELDS) | {'project_name'}
+        assert rows[0]['project_name'] == "Rows"
+        assert db_manager.get_user_task_rows(user_id, fields=('id', 'title')) == [
+            {'id': task_id, 'title': "Task"}]
+        assert db_manager.get_user_task_rows(user_id + 100) == []
+        with pytest.raises(ValueError):
+            db_manager.get_user_task_rows(user_id, fields=('id', 'password'))
+    
+    def test_update_task_expected_status(self, db_manager):
+        """Тест условного обновления задачи по текущему статусу"""
+        task_id = db_manager.add_task(Task("CAS", "", 1, datetime.now(), None, None))
+        assert db_manager.get_task_by_id(task_id)['status'] == 'pending'
+        
+        assert db_manager.update_task(task_id, expected_status='completed',
+                                      status='in_progress') == False
+        assert db_manager.get_task_by_id(task_id)['status'] == 'pending'
+        assert db_manager.update_task(task_id, expected_status='pending',
+                                      status='in_progress') == True
+        assert db_manager.get_task_by_id(task_id)['status'] == 'in_progress'
+        assert db_manager.update_task(task_id + 1, status='completed') == False
+    
+    def test_bulk_task_writes_single_transaction(self, db_manager):
+        """Тест массовых изменений задач: одна транзакция, порции ID, сброс кэша"""
+        task_ids = list(db_manager.add_tasks(
+            Task(f"Bulk {i}", "", 1, datetime.now(), None, None) for i in range(1200)))
+        db_manager.get_task_by_id(task_ids[0])  # Запись попадает в кэш
+        
+        statements = []
+        db_manager.connection.set_trace_callback(statements.append)
+        updated = db_manager.update_task_status_many('completed', ids=task_ids)
+        db_manager.connection.set_trace_callback(None)
+        
+        assert updated == task_ids
+        # Триггеры task_stats повторяют в трассировке текст запроса, считаем разные
+        assert len({sql for sql in statements if sql.startswith('UPDATE tasks')}) == 3
+        assert len([sql for sql in statements if sql.strip().upper() == 'COMMIT']) == 1
+        assert db_manager.get_task_by_id(task_ids[0])['status'] == 'completed'
+        
+        assert db_manager.delete_tasks(status='completed') == task_ids
+        assert db_manager.get_all_tasks() == []
+        with pytest.raises(ValueError):
+            db_manager.update_task_status_many('pending')
+    
+    def test_reassign_unassigned_tasks(self, db_manager):
+        """Тест передачи задач без исполнителя (from_user_id=None)"""
+        user_ids = [db_manager.add_user(User(f"owner{i}", f"owner{i}@example.com", "developer"))
+                    for i in range(2)]
+        task_ids = [db_manager.add_task(Task(f"Task {i}", "", 1, datetime.now(), None, assignee))
+                    for i, assignee in enumerate([None, user_ids[0], None])]
+        
+        # Задача другого исполнителя из списка ids не передается
+        assert db_manager.reassign_tasks(None, user_ids[1], ids=task_ids[:2]) == [task_ids[0]]
+        assert db_manager.get_task_by_id(task_ids[1])['assignee_id'] == user_ids[0]
+        assert [row['id'] for row in db_manager.find_tasks(unassigned=True)] == [task_ids[2]]
+        assert db_manager.reassign_tasks(None, user_ids[1]) == [task_ids[2]]
+        assert db_manager.find_tasks(unassigned=True) == []
+    
+    def test_task_stats_triggers(self, db_manager):
+        """Тест счетчиков task_stats, которые ведут триггеры таблицы tasks"""
+        user_ids = [db_manager.add_user(User(f"stats{i}", f"stats{i}@example.com", "developer"))
+                    for i in range(2)]
+        project_ids = [db_manager.add_project(Project(f"Stats {i}", "", datetime.now(),
+                                                      datetime.now() + timedelta(days=1)))
+                       for i in range(2)]
+        task_ids = [db_manager.add_task(Task(f"Task {i}", "", 1, datetime.now(),
+                                             project_ids[0], user_ids[0]))
+                    for i in range(3)]
+        
+        db_manager.update_task(task_ids[0], status='completed')
+        db_manager.update_task(task_ids[1], project_id=project_ids[1], assignee_id=None)
+        db_manager.delete_task(task_ids[2])
+        db_manager.reassign_tasks(user_ids[0], user_ids[1])
+        
+        stats = {(row['scope'], row['owner_id']): (row['total'], row['completed'])
+                 for row in db_manager.connection.execute('SELECT * FROM task_stats')}
+        assert stats[('project', project_ids[0])] == (1, 1)
+        assert stats[('project', project_ids[1])] == (1, 0)
+        assert stats[('user', user_ids[0])] == (0, 0)
+        assert stats[('user', user_ids[1])] == (1, 1)
+        assert db_manager.get_project_progress(project_ids[0])['progress'] == 100
+        assert db_manager.verify_task_stats() == []
+    
+    def test_rebuild_task_stats(self, db_manager):
+        """Тест сверки и пересчета task_stats, в том числе для существующей базы"""
+        project_id = db_manager.add_project(Project("Rebuild", "", datetime.now(),
+                                                    datetime.now() + timedelta(days=1)))
+        db_manager.add_tasks(Task(f"Task {i}", "", 1, datetime.now(), project_id, None)
+                             for i in range(5))
+        
+        db_manager.connection.execute("UPDATE task_stats SET total = 2")
+        db_manager.connection.commit()
+        assert db_manager.verify_task_stats() == [('project', project_id)]
+        assert db_manager.rebuild_task_stats() == 1
+        assert db_manager.verify_task_stats() == []
+        assert db_manager.get_project_progress(project_id)['total_tasks'] == 5
+        
+        # База, созданная до появления task_stats: счетчики заполняются при открытии
+        db_manager.connection.execute('DROP TABLE task_stats')
+        for trigger in ('task_stats_ai', 'task_stats_ad', 'task_stats_au'):
+            db_manager.connection.execute(f'DROP TRIGGER {trigger}')
+        db_manager.connection.commit()
+        reopened = DatabaseManager(db_manager.db_path)
+        try:
+            assert reopened.get_project_progress(project_id)['total_tasks'] == 5
+            assert reopened.verify_task_stats() == []
+        finally:
+            reopened.close()
+
+
+class TestLRUCache:
+    """Тесты для LRU-кэша"""
+    
+    def test_eviction_order(self):
+        """Тест вытеснения давно не использованных значений"""
+        cache = LRUCache(capacity=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert cache.get('a') == 1  # 'b' становится самым давним
+        cache.put('c', 3)
+        
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert cache.stats() == {'capacity': 2, 'size': 2, 'hits': 3, 'misses': 1,
+                                 'evictions': 1, 'hit_rate': 0.75}
+    
+    def test_stale_put_skipped(self):
+        """Тест: значение, прочитанное до удаления из кэша, не сохраняется"""
+        cache = LRUCache()
+        version = cache.version
+        cache.discard('a')
+        cache.put('a', 'stale', version)
+        assert cache.get('a') is None
+        
+        cache.put('a', 'fresh', cache.version)
+        assert cache.get('a') == 'fresh'
+    
+    def test_invalid_capacity(self):
+        """Тест отрицательного размера кэша"""
+        with pytest.raises(ValueError):
+            LRUCache(capacity=-1)
+
+
+class TestQueryCache:
+    """Тесты для кэша результатов запросов"""
+    
+    def test_table_versions(self):
+        """Тест: результат устаревает при изменении любой из его таблиц"""
+        cache = QueryCache()
+        versions = cache.version(('tasks', 'users'))
+        cache.put('listing', [1, 2], ('tasks', 'users'), versions)
+        cache.bump('projects')
+        assert cache.get('listing') == [1, 2]
+        
+        cache.bump('users')
+        assert cache.get('listing') is None
+        assert cache.stats()['stale'] == 1
+        assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+    
+    def test_read_during_write(self):
+        """Тест: результат, прочитанный до изменения таблицы, не выдается"""
+        cache = QueryCache()
+        versions = cache.version(('tasks',))
+        cache.bump('tasks')
+        cache.put('tasks', [1], ('tasks',), versions)
+        assert cache.get('tasks') is None
+    
+    def test_ttl(self):
+        """Тест срока жизни результата"""
+        cache = QueryCache()
+        cache.put('overdue', [1], ('tasks',), cache.version(('tasks',)), ttl=0.01)
+        assert cache.get('overdue') == [1]
+        time.sleep(0.02)
+        assert cache.get('overdue') is None
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
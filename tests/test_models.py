@@ -9,6 +9,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from models.task import Task
 from models.project import Project
 from models.user import User
+from models.task_batch import TaskBatch
+from models.dates import parse_datetime, to_epoch
 
 class TestTask:
     """Тесты для класса Task"""
@@ -133,6 +135,67 @@ class TestTask:
         assert isinstance(task.due_date, datetime)
         assert isinstance(task.created_at, datetime)
     
+    def test_from_row(self, monkeypatch):
+        """Тест создания задачи из значений строки без вызова __init__"""
+        def fail(*args, **kwargs):
+            raise AssertionError("__init__ must not be called")
+        monkeypatch.setattr(Task, '__init__', fail)
+        
+        task = Task.from_row(9, 'Row', 'Description', 3, 'pending', '2024-02-03 04:05:06',
+                             None, 2, '2024-01-01 00:00:00')
+        
+        assert task.id == 9
+        assert task.due_date == datetime(2024, 2, 3, 4, 5, 6)
+        assert task.created_at == datetime(2024, 1, 1)
+        assert task.to_dict()['due_date'] == '2024-02-03 04:05:06'
+    
+    def test_from_row_epoch_dates(self):
+        """Тест создания задачи из строки с датами в секундах от эпохи"""
+        due_date = datetime(2024, 2, 3, 4, 5, 6)
+        task = Task.from_row(9, 'Row', '', 3, 'pending', to_epoch(due_date), None, None,
+                             to_epoch(datetime(2024, 1, 1)))
+        
+        assert task.due_date == due_date
+        assert task.created_at == datetime(2024, 1, 1)
+        assert parse_datetime('2024-02-03 04:05:06') == due_date
+    
+    def test_from_dict_datetime_values(self):
+        """Тест создания задачи из словаря, где даты уже datetime"""
+        due_date = datetime(2024, 2, 3, 4, 5, 6)
+        data = {'id': 4, 'title': 'Dates', 'description': '', 'priority': 2,
+                'status': 'pending', 'due_date': due_date, 'project_id': None,
+                'assignee_id': None, 'created_at': datetime(2024, 1, 1)}
+        
+        task = Task.from_dict(data)
+        
+        assert task.due_date == due_date
+        assert task.created_at == datetime(2024, 1, 1)
+        assert task.to_dict()['due_date'] == '2024-02-03 04:05:06'
+    
+    def test_row_mapper(self):
+        """Тест создания задачи из кортежа строки"""
+        columns = ('title', 'id', 'description', 'priority', 'status', 'due_date',
+                   'project_id', 'assignee_id', 'created_at')
+        row = ('From Row', 7, 'Description', 1, 'in_progress', '2024-01-01 12:00:00',
+               3, None, '2023-12-01 10:00:00')
+        
+        task = Task.row_mapper(columns)(row)
+        
+        assert task.id == 7
+        assert task.title == "From Row"
+        assert task.status == "in_progress"
+        assert task.assignee_id is None
+        assert task.due_date == datetime(2024, 1, 1, 12, 0)
+        assert task.created_at == datetime(2023, 12, 1, 10, 0)
+    
+    def test_slots(self):
+        """Тест: задача хранит атрибуты в слотах, без __dict__"""
+        task = Task("Slots", "Desc", 1, datetime.now(), 1, 1)
+        
+        assert not hasattr(task, '__dict__')
+        with pytest.raises(AttributeError):
+            task.unknown = 1
+    
     def test_priority_validation(self):
         """Тест на некорректный приоритет (должен обрабатываться в контроллере)"""
         # Это тест проверяет, что задача принимает любой приоритет
@@ -245,6 +308,18 @@ class TestProject:
         assert isinstance(project.start_date, datetime)
         assert isinstance(project.end_date, datetime)
         assert isinstance(project.created_at, datetime)
+    
+    def test_from_dict_datetime_values(self):
+        """Тест создания проекта из словаря, где даты уже datetime"""
+        data = {'id': 11, 'name': 'Dates', 'description': '',
+                'start_date': datetime(2024, 1, 1), 'end_date': datetime(2024, 12, 31),
+                'status': 'active', 'created_at': datetime(2023, 12, 1, 10, 0)}
+        
+        project = Project.from_dict(data)
+        
+        assert project.start_date == datetime(2024, 1, 1)
+        assert project.end_date == datetime(2024, 12, 31)
+        assert project.created_at == datetime(2023, 12, 1, 10, 0)
 
 class TestUser:
     """Тесты для класса User"""
@@ -363,5 +438,51 @@ class TestUser:
         user4 = User("invalid", "invalid@example.com", "invalid_role")
         assert user4.role == "invalid_role"
 
+
+class TestTaskBatch:
+    """Тесты для столбцового набора задач"""
+    
+    @pytest.fixture
+    def batch(self):
+        now = datetime(2024, 6, 1, 12, 0)
+        rows = [
+            (1, "Late", 1, 'pending', to_epoch(now - timedelta(days=1))),
+            (2, "Done", 2, 'completed', to_epoch(now - timedelta(days=2))),
+            (3, "Future", 1, 'in_progress', to_epoch(now + timedelta(days=1))),
+            (4, "Late too", 3, 'in_progress', to_epoch(now - timedelta(hours=1))),
+        ]
+        return TaskBatch.from_rows(iter(rows), chunk_size=3)
+    
+    def test_from_rows(self, batch):
+        """Тест заполнения столбцов из строк"""
+        assert len(batch) == 4
+        assert list(batch.ids) == [1, 2, 3, 4]
+        assert batch.titles == ["Late", "Done", "Future", "Late too"]
+        assert len(TaskBatch.from_rows([])) == 0
+    
+    def test_overdue_mask(self, batch):
+        """Тест маски просроченных задач, совпадающей с Task.is_overdue"""
+        assert list(batch.overdue_mask(datetime(2024, 6, 1, 12, 0))) == [1, 0, 0, 1]
+    
+    def test_filter(self, batch):
+        """Тест фильтрации по статусу, приоритету и маске"""
+        assert list(batch.filter(status='in_progress').ids) == [3, 4]
+        assert list(batch.filter(priority=[1, 2]).ids) == [1, 2, 3]
+        assert list(batch.filter(status='in_progress', priority=1).ids) == [3]
+        overdue = batch.overdue_mask(datetime(2024, 6, 1, 12, 0))
+        assert batch.filter(mask=overdue, priority=3).titles == ["Late too"]
+    
+    def test_sort_by(self, batch):
+        """Тест сортировки по одному и нескольким столбцам"""
+        assert list(batch.sort_by('due_date').ids) == [2, 1, 4, 3]
+        assert list(batch.sort_by('priority', 'due_date', reverse=True).ids) == [4, 2, 3, 1]
+    
+    def test_counts_by(self, batch):
+        """Тест подсчета задач по значениям столбца"""
+        assert batch.counts_by('status') == {'pending': 1, 'completed': 1, 'in_progress': 2}
+        assert batch.counts_by('priority') == {1: 2, 2: 1, 3: 1}
+        overdue = batch.overdue_mask(datetime(2024, 6, 1, 12, 0))
+        assert batch.counts_by('status', mask=overdue) == {'pending': 1, 'in_progress': 1}
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
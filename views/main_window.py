@@ -1,5 +1,6 @@
 # Главное окно приложения согласно README.md
 import tkinter as tk
+from datetime import datetime
 from tkinter import ttk, messagebox
 from views.task_view import TaskView
 from views.project_view import ProjectView
@@ -8,6 +9,8 @@ from database.database_manager import DatabaseManager
 from controllers.task_controller import TaskController
 from controllers.project_controller import ProjectController
 from controllers.user_controller import UserController
+from controllers.deadline_scheduler import DeadlineScheduler
+from controllers.events import EventBus
 
 class MainWindow:
     def __init__(self):
@@ -17,9 +20,13 @@ class MainWindow:
         
         # Инициализация базы данных и контроллеров
         self.db_manager = DatabaseManager()
-        self.task_controller = TaskController(self.db_manager)
-        self.project_controller = ProjectController(self.db_manager)
-        self.user_controller = UserController(self.db_manager)
+        self.scheduler = DeadlineScheduler(self.db_manager)
+        self.scheduler.load()
+        # Контроллеры публикуют изменения, вкладки обновляют по ним свои строки
+        self.events = EventBus()
+        self.task_controller = TaskController(self.db_manager, self.scheduler, self.events)
+        self.project_controller = ProjectController(self.db_manager, self.events)
+        self.user_controller = UserController(self.db_manager, self.events)
         
         self.setup_ui()
         
@@ -45,6 +52,19 @@ class MainWindow:
         self.notebook.add(self.project_view.frame, text="Проекты")
         self.notebook.add(self.user_view.frame, text="Пользователи")
         
+        # Просроченные задачи отмечаются по сроку из планировщика, без опроса базы
+        self.scheduler.subscribe(self.task_view.mark_overdue)
+        self.check_deadlines()
+    
+    def check_deadlines(self):
+        """Проверить сроки задач и запланировать проверку к ближайшему сроку"""
+        self.scheduler.poll()
+        next_due = self.scheduler.next_due()
+        delay = 60
+        if next_due is not None:
+            delay = min(max((next_due - datetime.now()).total_seconds() + 1, 1), 60)
+        self.root.after(int(delay * 1000), self.check_deadlines)
+    
     def create_menu(self):
         """Создание меню"""
         menubar = tk.Menu(self.root)
@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 from tkcalendar import DateEntry
+from controllers.events import TASK, PROJECT
 
 class ProjectView:
     def __init__(self, parent, project_controller, task_controller):
@@ -12,6 +13,10 @@ class ProjectView:
         self.setup_ui()
         self.load_projects()
         
+        # Изменения проектов и их задач обновляют только строки этих проектов
+        if self.project_controller.events is not None:
+            self.project_controller.events.subscribe(self.on_changes, PROJECT, TASK)
+        
     def setup_ui(self):
         """Настройка интерфейса проектов"""
         # Панель управления
@@ -62,37 +67,77 @@ class ProjectView:
         for item in self.tree.get_children():
             self.tree.delete(item)
         
-        # Загружаем проекты
-        projects = self.project_controller.get_all_projects()
+        # Загружаем проекты вместе со статистикой одним запросом
+        for project, progress_data in self.project_controller.get_projects_with_progress():
+            self.show_project(project, progress_data)
         
-        active_count = 0
-        completed_count = 0
+        self.update_stats()
+    
+    def show_project(self, project, progress_data):
+        """Добавить строку проекта или обновить уже выведенную (ID строки - ID проекта)"""
+        values = (
+            project.id,
+            project.name,
+            self.get_status_text(project.status),
+            project.start_date.strftime('%d.%m.%Y'),
+            project.end_date.strftime('%d.%m.%Y'),
+            f"{progress_data['progress']:.1f}%",
+            progress_data['total_tasks']
+        )
+        # Статус в тегах строки нужен для подсчета статистики
+        iid = str(project.id)
+        if self.tree.exists(iid):
+            self.tree.item(iid, values=values, tags=(project.status,))
+        else:
+            self.tree.insert('', 'end', iid=iid, values=values, tags=(project.status,))
+    
+    def update_stats(self):
+        """Обновить статистику по проектам в таблице"""
+        statuses = [self.tree.item(iid, 'tags')[0] for iid in self.tree.get_children()]
+        self.stats_label.config(text=f"Всего проектов: {len(statuses)} | "
+                                     f"Активных: {statuses.count('active')} | "
+                                     f"Завершенных: {statuses.count('completed')}")
+    
+    def on_changes(self, events):
+        """Обновить строки проектов, затронутых изменениями, без перезагрузки списка"""
+        project_ids = set()
+        for event in events:
+            if event.entity == PROJECT:
+                project_ids.add(event.entity_id)
+            else:
+                # Задача влияет на прогресс своего проекта, прежнего и нового
+                project_ids.add(event.changes.get('project_id'))
+                project_ids.add((event.previous or {}).get('project_id'))
+        project_ids.discard(None)
+        
+        for project_id in project_ids:
+            project = self.project_controller.get_project(project_id)
+            if project is None:
+                if self.tree.exists(str(project_id)):
+                    self.tree.delete(str(project_id))
+                continue
+            progress = self.project_controller.get_project_progress(project_id)
+            self.show_project(project, progress)
+        self.update_stats()
+    
+    def refresh_after_change(self):
+        """Перезагрузить список после изменения, если оно не придет событием
         
-        for project in projects:
-            # Получаем статистику проекта
-            progress_data = self.project_controller.get_project_progress(project.id)
-            progress = progress_data['progress']
-            task_count = progress_data['total_tasks']
-            
-            # Подсчитываем статусы
-            if project.status == 'active':
-                active_count += 1
-            elif project.status == 'completed':
-                completed_count += 1
-            
-            # Добавляем в таблицу
-            self.tree.insert('', 'end', values=(
-                project.id,
-                project.name,
-                self.get_status_text(project.status),
-                project.start_date.strftime('%d.%m.%Y'),
-                project.end_date.strftime('%d.%m.%Y'),
-                f"{progress:.1f}%",
-                task_count
-            ))
-        
-        # Обновляем статистику
-        self.stats_label.config(text=f"Всего проектов: {len(projects)} | Активных: {active_count} | Завершенных: {completed_count}")
+        С шиной событий строки обновляет on_changes.
+        """
+        if self.project_controller.events is None:
+            self.load_projects()
+    
+    def validate_project_form(self, name, start_date, end_date):
+        """Проверить поля формы проекта (при ошибке показывается сообщение)"""
+        if not name:
+            messagebox.showerror("Ошибка", "Название проекта обязательно!")
+            return False
+        
+        if start_date >= end_date:
+            messagebox.showerror("Ошибка", "Дата начала должна быть раньше даты окончания!")
+            return False
+        return True
     
     def get_status_text(self, status):
         """Получить текстовое описание статуса"""
@@ -160,12 +205,7 @@ class ProjectView:
             status = status_var.get()
             
             # Валидация
-            if not name:
-                messagebox.showerror("Ошибка", "Название проекта обязательно!")
-                return
-            
-            if start_date >= end_date:
-                messagebox.showerror("Ошибка", "Дата начала должна быть раньше даты окончания!")
+            if not self.validate_project_form(name, start_date, end_date):
                 return
             
             # Создаем проект
@@ -182,7 +222,7 @@ class ProjectView:
                     self.project_controller.update_project_status(project.id, status)
                 
                 messagebox.showinfo("Успех", "Проект успешно добавлен!")
-                self.load_projects()
+                self.refresh_after_change()
                 dialog.destroy()
             else:
                 messagebox.showerror("Ошибка", "Не удалось добавить проект!")
@@ -267,12 +307,7 @@ class ProjectView:
             status = status_var.get()
             
             # Валидация
-            if not name:
-                messagebox.showerror("Ошибка", "Название проекта обязательно!")
-                return
-            
-            if start_date >= end_date:
-                messagebox.showerror("Ошибка", "Дата начала должна быть раньше даты окончания!")
+            if not self.validate_project_form(name, start_date, end_date):
                 return
             
             # Обновляем проект
@@ -287,7 +322,7 @@ class ProjectView:
             
             if success:
                 messagebox.showinfo("Успех", "Проект успешно обновлен!")
-                self.load_projects()
+                self.refresh_after_change()
                 dialog.destroy()
             else:
                 messagebox.showerror("Ошибка", "Не удалось обновить проект!")
@@ -320,6 +355,6 @@ class ProjectView:
             success = self.project_controller.delete_project(project_id)
             if success:
                 messagebox.showinfo("Успех", "Проект успешно удален!")
-                self.load_projects()
+                self.refresh_after_change()
             else:
                 messagebox.showerror("Ошибка", "Не удалось удалить проект!")
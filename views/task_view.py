@@ -1,7 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime
 from tkcalendar import DateEntry
+from models.dates import parse_datetime
+from controllers.events import TASK, PROJECT, USER, ADDED, DELETED
 
 class TaskView:
     def __init__(self, parent, task_controller, project_controller, user_controller):
@@ -9,12 +10,19 @@ class TaskView:
         self.project_controller = project_controller
         self.user_controller = user_controller
         
+        # Фильтры текущего списка: строки, измененные позже, проверяются по ним же
+        self.listing_filters = {}
+        
         self.frame = ttk.Frame(parent)
         self.setup_ui()
         self.load_tasks()
         self.load_projects()
         self.load_users()
         
+        # Изменения задач, проектов и пользователей обновляют только свои строки
+        if self.task_controller.events is not None:
+            self.task_controller.events.subscribe(self.on_changes, TASK, PROJECT, USER)
+        
     def setup_ui(self):
         """Настройка интерфейса задач"""
         # Панель управления
@@ -100,51 +108,127 @@ class TaskView:
         
     def load_tasks(self):
         """Загрузка задач в таблицу"""
+        self.show_tasks(self.task_controller.get_task_listing())
+    
+    def show_tasks(self, rows, **filters):
+        """Вывод строк списка задач в таблицу (filters - фильтры, по которым они выбраны)"""
+        self.listing_filters = filters
         # Очищаем таблицу
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Загружаем задачи
-        tasks = self.task_controller.get_all_tasks()
-        
-        for task in tasks:
-            # Получаем название проекта
-            project_name = "Без проекта"
-            if task.project_id:
-                project = self.project_controller.get_project(task.project_id)
-                if project:
-                    project_name = project.name
-            
-            # Получаем имя исполнителя
-            assignee_name = "Не назначен"
-            if task.assignee_id:
-                user = self.user_controller.get_user(task.assignee_id)
-                if user:
-                    assignee_name = user.username
-            
-            # Определяем теги для цветового кодирования
-            tags = []
-            if task.priority == 1:
-                tags.append('high')
-            elif task.priority == 2:
-                tags.append('medium')
-            elif task.priority == 3:
-                tags.append('low')
-            
-            # Помечаем просроченные задачи
-            if task.is_overdue():
-                tags.append('overdue')
-            
-            # Добавляем в таблицу
-            self.tree.insert('', 'end', values=(
-                task.id,
-                task.title,
-                self.get_priority_text(task.priority),
-                self.get_status_text(task.status),
-                task.due_date.strftime('%d.%m.%Y %H:%M'),
-                project_name,
-                assignee_name
-            ), tags=tags)
+        self.tree.delete(*self.tree.get_children())
+        
+        for row in rows:
+            self.show_row(row)
+    
+    def show_row(self, row):
+        """Добавить строку задачи в таблицу или обновить уже выведенную (ID строки - ID задачи)"""
+        # Определяем теги для цветового кодирования
+        tags = []
+        if row['priority'] == 1:
+            tags.append('high')
+        elif row['priority'] == 2:
+            tags.append('medium')
+        elif row['priority'] == 3:
+            tags.append('low')
+        
+        # Помечаем просроченные задачи
+        if row['is_overdue']:
+            tags.append('overdue')
+        
+        due_date = parse_datetime(row['due_date'])
+        values = (
+            row['id'],
+            row['title'],
+            self.get_priority_text(row['priority']),
+            self.get_status_text(row['status']),
+            due_date.strftime('%d.%m.%Y %H:%M'),
+            row['project_name'] or "Без проекта",
+            row['assignee_name'] or "Не назначен"
+        )
+        iid = str(row['id'])
+        if self.tree.exists(iid):
+            self.tree.item(iid, values=values, tags=tags)
+        else:
+            self.tree.insert('', 'end', iid=iid, values=values, tags=tags)
+    
+    def refresh_rows(self, task_ids=None, fresh=False, **filters):
+        """Перечитать строки задач task_ids (или строки по фильтрам) с учетом фильтров списка
+        
+        Задачи, которые больше не подходят под фильтры списка, убираются из таблицы.
+        fresh=True читает строки в обход кэша списка.
+        """
+        if task_ids is None:
+            filters = dict(self.listing_filters, **filters)
+            for row in self.task_controller.get_task_listing(fresh=fresh, **filters):
+                self.show_row(row)
+            return
+        
+        task_ids = list(task_ids)
+        for start in range(0, len(task_ids), 500):
+            self.refresh_chunk(task_ids[start:start + 500], fresh)
+    
+    def refresh_chunk(self, task_ids, fresh=False):
+        """Перечитать строки порции задач и убрать те, что не подходят под фильтры списка"""
+        rows = self.task_controller.get_task_listing(ids=task_ids, fresh=fresh,
+                                                     **self.listing_filters)
+        for row in rows:
+            self.show_row(row)
+        shown = {row['id'] for row in rows}
+        for task_id in task_ids:
+            if task_id not in shown:
+                self.remove_row(task_id)
+    
+    def remove_row(self, task_id):
+        """Убрать строку задачи из таблицы, если она выведена"""
+        if self.tree.exists(str(task_id)):
+            self.tree.delete(str(task_id))
+    
+    def mark_overdue(self, task_ids):
+        """Отметить задачи, у которых прошел срок (вызывается планировщиком сроков)
+        
+        Признак просрочки в кэше списка мог быть посчитан до срока, поэтому
+        строки читаются в обход кэша.
+        """
+        self.refresh_rows(task_ids, fresh=True)
+    
+    def on_changes(self, events):
+        """Обновить строки таблицы, затронутые изменениями, без перезагрузки списка"""
+        for event in events:
+            if event.entity == PROJECT:
+                self.on_project_change(event)
+            elif event.entity == USER:
+                self.on_user_change(event)
+        self.on_task_changes([event for event in events if event.entity == TASK])
+    
+    def on_task_changes(self, events):
+        """Убрать строки удаленных задач и перечитать строки остальных одним запросом"""
+        task_ids = []
+        for event in events:
+            if event.action == DELETED:
+                self.remove_row(event.entity_id)
+            else:
+                task_ids.append(event.entity_id)
+        if task_ids:
+            self.refresh_rows(task_ids)
+    
+    def on_project_change(self, event):
+        """Обновить список проектов и строки задач проекта (в них выводится его название)"""
+        self.load_projects()
+        if event.action != ADDED:
+            self.refresh_rows(project_id=event.entity_id)
+    
+    def on_user_change(self, event):
+        """Обновить список пользователей и строки задач исполнителя"""
+        self.load_users()
+        if event.action != ADDED:
+            self.refresh_rows(assignee_id=event.entity_id)
+    
+    def refresh_after_change(self):
+        """Перезагрузить список после изменения, если оно не придет событием
+        
+        С шиной событий строки обновляет on_changes.
+        """
+        if self.task_controller.events is None:
+            self.load_tasks()
     
     def load_projects(self):
         """Загрузка списка проектов"""
@@ -154,6 +238,34 @@ class TaskView:
         """Загрузка списка пользователей"""
         self.users = self.user_controller.get_all_users()
     
+    def find_project_id(self, name):
+        """ID проекта по названию из списка диалога (None - без проекта)"""
+        if name == 'Без проекта':
+            return None
+        for project in self.projects:
+            if project.name == name:
+                return project.id
+        return None
+    
+    def find_user_id(self, username):
+        """ID пользователя по имени из списка диалога (None - не назначен)"""
+        if username == 'Не назначен':
+            return None
+        for user in self.users:
+            if user.username == username:
+                return user.id
+        return None
+    
+    def get_project_name(self, project_id):
+        """Название проекта задачи для вывода"""
+        project = self.project_controller.get_project(project_id) if project_id else None
+        return project.name if project else "Без проекта"
+    
+    def get_assignee_name(self, user_id):
+        """Имя исполнителя задачи для вывода"""
+        user = self.user_controller.get_user(user_id) if user_id else None
+        return user.username if user else "Не назначен"
+    
     def get_priority_text(self, priority):
         """Получить текстовое описание приоритета"""
         priorities = {1: 'Высокий', 2: 'Средний', 3: 'Низкий'}
@@ -243,23 +355,9 @@ class TaskView:
             priority = int(priority_var.get().split(' ')[0])
             due_date = due_date_entry.get_date()
             
-            # Получаем ID проекта
-            project_id = None
-            selected_project = project_var.get()
-            if selected_project != 'Без проекта':
-                for project in self.projects:
-                    if project.name == selected_project:
-                        project_id = project.id
-                        break
-            
-            # Получаем ID исполнителя
-            assignee_id = None
-            selected_user = user_var.get()
-            if selected_user != 'Не назначен':
-                for user in self.users:
-                    if user.username == selected_user:
-                        assignee_id = user.id
-                        break
+            # Получаем ID проекта и исполнителя
+            project_id = self.find_project_id(project_var.get())
+            assignee_id = self.find_user_id(user_var.get())
             
             # Валидация
             if not title:
@@ -278,7 +376,7 @@ class TaskView:
             
             if task:
                 messagebox.showinfo("Успех", "Задача успешно добавлена!")
-                self.load_tasks()
+                self.refresh_after_change()
                 dialog.destroy()
             else:
                 messagebox.showerror("Ошибка", "Не удалось добавить задачу!")
@@ -361,21 +459,13 @@ class TaskView:
         
         # Проект (только для информации)
         ttk.Label(form_frame, text="Проект:").grid(row=row, column=0, sticky='w', pady=5)
-        project_name = "Без проекта"
-        if task.project_id:
-            project = self.project_controller.get_project(task.project_id)
-            if project:
-                project_name = project.name
+        project_name = self.get_project_name(task.project_id)
         ttk.Label(form_frame, text=project_name).grid(row=row, column=1, sticky='w', pady=5, padx=10)
         row += 1
         
         # Исполнитель (только для информации)
         ttk.Label(form_frame, text="Исполнитель:").grid(row=row, column=0, sticky='w', pady=5)
-        assignee_name = "Не назначен"
-        if task.assignee_id:
-            user = self.user_controller.get_user(task.assignee_id)
-            if user:
-                assignee_name = user.username
+        assignee_name = self.get_assignee_name(task.assignee_id)
         ttk.Label(form_frame, text=assignee_name).grid(row=row, column=1, sticky='w', pady=5, padx=10)
         
         # Кнопки
@@ -407,7 +497,7 @@ class TaskView:
             
             if success:
                 messagebox.showinfo("Успех", "Задача успешно обновлена!")
-                self.load_tasks()
+                self.refresh_after_change()
                 dialog.destroy()
             else:
                 messagebox.showerror("Ошибка", "Не удалось обновить задачу!")
@@ -433,7 +523,7 @@ class TaskView:
             success = self.task_controller.delete_task(task_id)
             if success:
                 messagebox.showinfo("Успех", "Задача успешно удалена!")
-                self.load_tasks()
+                self.refresh_after_change()
             else:
                 messagebox.showerror("Ошибка", "Не удалось удалить задачу!")
     
@@ -444,109 +534,19 @@ class TaskView:
             messagebox.showwarning("Предупреждение", "Введите текст для поиска!")
             return
         
-        # Очищаем таблицу
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Ищем задачи
-        tasks = self.task_controller.search_tasks(query)
-        
-        for task in tasks:
-            # Получаем название проекта
-            project_name = "Без проекта"
-            if task.project_id:
-                project = self.project_controller.get_project(task.project_id)
-                if project:
-                    project_name = project.name
-            
-            # Получаем имя исполнителя
-            assignee_name = "Не назначен"
-            if task.assignee_id:
-                user = self.user_controller.get_user(task.assignee_id)
-                if user:
-                    assignee_name = user.username
-            
-            # Определяем теги для цветового кодирования
-            tags = []
-            if task.priority == 1:
-                tags.append('high')
-            elif task.priority == 2:
-                tags.append('medium')
-            elif task.priority == 3:
-                tags.append('low')
-            
-            # Помечаем просроченные задачи
-            if task.is_overdue():
-                tags.append('overdue')
-            
-            # Добавляем в таблицу
-            self.tree.insert('', 'end', values=(
-                task.id,
-                task.title,
-                self.get_priority_text(task.priority),
-                self.get_status_text(task.status),
-                task.due_date.strftime('%d.%m.%Y %H:%M'),
-                project_name,
-                assignee_name
-            ), tags=tags)
+        self.show_tasks(self.task_controller.get_task_listing(text=query), text=query)
     
     def filter_tasks(self):
         """Фильтрация задач"""
         status_filter = self.status_filter.get()
         priority_filter = self.priority_filter.get()
         
-        # Очищаем таблицу
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Получаем все задачи
-        tasks = self.task_controller.get_all_tasks()
-        
-        for task in tasks:
-            # Применяем фильтры
-            if status_filter != 'Все' and task.status != status_filter:
-                continue
-            
-            if priority_filter != 'Все' and str(task.priority) != priority_filter:
-                continue
-            
-            # Получаем название проекта
-            project_name = "Без проекта"
-            if task.project_id:
-                project = self.project_controller.get_project(task.project_id)
-                if project:
-                    project_name = project.name
-            
-            # Получаем имя исполнителя
-            assignee_name = "Не назначен"
-            if task.assignee_id:
-                user = self.user_controller.get_user(task.assignee_id)
-                if user:
-                    assignee_name = user.username
-            
-            # Определяем теги для цветового кодирования
-            tags = []
-            if task.priority == 1:
-                tags.append('high')
-            elif task.priority == 2:
-                tags.append('medium')
-            elif task.priority == 3:
-                tags.append('low')
-            
-            # Помечаем просроченные задачи
-            if task.is_overdue():
-                tags.append('overdue')
-            
-            # Добавляем в таблицу
-            self.tree.insert('', 'end', values=(
-                task.id,
-                task.title,
-                self.get_priority_text(task.priority),
-                self.get_status_text(task.status),
-                task.due_date.strftime('%d.%m.%Y %H:%M'),
-                project_name,
-                assignee_name
-            ), tags=tags)
+        # Фильтры применяются в запросе к базе
+        filters = {
+            'status': None if status_filter == 'Все' else status_filter,
+            'priority': None if priority_filter == 'Все' else int(priority_filter),
+        }
+        self.show_tasks(self.task_controller.get_task_listing(**filters), **filters)
     
     def reset_filters(self):
         """Сброс фильтров"""
@@ -1,15 +1,23 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+from controllers.events import TASK, USER, UPDATED, DELETED
 
 class UserView:
     def __init__(self, parent, user_controller, task_controller):
         self.user_controller = user_controller
         self.task_controller = task_controller
         
+        # Строка поиска текущего списка (пусто - выведены все пользователи)
+        self.search_query = ''
+        
         self.frame = ttk.Frame(parent)
         self.setup_ui()
         self.load_users()
         
+        # Изменения пользователей и их задач обновляют только строки этих пользователей
+        if self.user_controller.events is not None:
+            self.user_controller.events.subscribe(self.on_changes, USER, TASK)
+        
     def setup_ui(self):
         """Настройка интерфейса пользователей"""
         # Панель управления
@@ -61,27 +69,112 @@ class UserView:
         
     def load_users(self):
         """Загрузка пользователей в таблицу"""
+        self.search_query = ''
+        self.show_users()
+    
+    def show_users(self):
+        """Вывести пользователей, подходящих под строку поиска"""
         # Очищаем таблицу
         for item in self.tree.get_children():
             self.tree.delete(item)
         
-        # Загружаем пользователей
-        users = self.user_controller.get_all_users()
+        # Загружаем пользователей вместе с числом задач
+        users = self.user_controller.get_users_with_task_counts()
         
-        for user in users:
-            # Получаем количество задач пользователя
-            tasks = self.task_controller.get_tasks_by_user(user.id)
-            task_count = len(tasks)
-            
-            # Добавляем в таблицу
-            self.tree.insert('', 'end', values=(
-                user.id,
-                user.username,
-                user.email,
-                self.get_role_text(user.role),
-                user.registration_date.strftime('%d.%m.%Y %H:%M'),
-                task_count
-            ))
+        for user, task_count in users:
+            if self.matches(user):
+                self.show_user(user, task_count)
+    
+    def matches(self, user):
+        """Подходит ли пользователь под строку поиска"""
+        query = self.search_query
+        return (not query or query in user.username.lower() or
+                query in user.email.lower() or query in user.role.lower())
+    
+    def show_user(self, user, task_count):
+        """Добавить строку пользователя или обновить уже выведенную (ID строки - ID пользователя)"""
+        values = (
+            user.id,
+            user.username,
+            user.email,
+            self.get_role_text(user.role),
+            user.registration_date.strftime('%d.%m.%Y %H:%M'),
+            task_count
+        )
+        iid = str(user.id)
+        if self.tree.exists(iid):
+            self.tree.item(iid, values=values)
+        else:
+            self.tree.insert('', 'end', iid=iid, values=values)
+    
+    def on_changes(self, events):
+        """Обновить строки пользователей, затронутых изменениями, без перезагрузки списка"""
+        changed_users = set()
+        for event in events:
+            if event.entity == USER and event.action == DELETED:
+                self.remove_row(event.entity_id)
+            elif event.entity == USER:
+                changed_users.add(event.entity_id)
+        assignees = {user_id for event in events if event.entity == TASK
+                     for user_id in self.task_assignees(event)} - changed_users
+        if not changed_users and not assignees:
+            return
+        
+        # Счетчики только затронутых пользователей (по ключу task_stats)
+        counts = self.user_controller.get_task_counts(changed_users | assignees)
+        self.refresh_users(changed_users, counts)
+        self.refresh_task_counts(assignees, counts)
+    
+    @staticmethod
+    def task_assignees(event):
+        """Исполнители, у которых изменение задачи меняет число задач (прежний и новый)"""
+        if event.action == UPDATED and 'assignee_id' not in event.changes:
+            return set()
+        previous = event.previous or {}
+        return {event.changes.get('assignee_id'), previous.get('assignee_id')} - {None}
+    
+    def refresh_users(self, user_ids, counts):
+        """Перечитать строки пользователей user_ids (counts - число их задач)"""
+        for user_id in user_ids:
+            user = self.user_controller.get_user(user_id)
+            if user is None or not self.matches(user):
+                self.remove_row(user_id)
+            else:
+                self.show_user(user, counts.get(user_id, 0))
+    
+    def refresh_task_counts(self, user_ids, counts):
+        """Обновить число задач в выведенных строках пользователей user_ids"""
+        for user_id in user_ids:
+            if self.tree.exists(str(user_id)):
+                self.tree.set(str(user_id), 'Задач', counts.get(user_id, 0))
+    
+    def remove_row(self, user_id):
+        """Убрать строку пользователя из таблицы, если она выведена"""
+        if self.tree.exists(str(user_id)):
+            self.tree.delete(str(user_id))
+    
+    def refresh_after_change(self):
+        """Перезагрузить список после изменения, если оно не придет событием
+        
+        С шиной событий строки обновляет on_changes.
+        """
+        if self.user_controller.events is None:
+            self.load_users()
+    
+    def validate_user_form(self, username, email):
+        """Проверить поля формы пользователя (при ошибке показывается сообщение)"""
+        if not username:
+            messagebox.showerror("Ошибка", "Имя пользователя обязательно!")
+            return False
+        
+        if not email:
+            messagebox.showerror("Ошибка", "Email обязателен!")
+            return False
+        
+        if '@' not in email:
+            messagebox.showerror("Ошибка", "Введите корректный email!")
+            return False
+        return True
     
     def get_role_text(self, role):
         """Получить текстовое описание роли"""
@@ -138,16 +231,7 @@ class UserView:
             role = role_var.get()
             
             # Валидация
-            if not username:
-                messagebox.showerror("Ошибка", "Имя пользователя обязательно!")
-                return
-            
-            if not email:
-                messagebox.showerror("Ошибка", "Email обязателен!")
-                return
-            
-            if '@' not in email:
-                messagebox.showerror("Ошибка", "Введите корректный email!")
+            if not self.validate_user_form(username, email):
                 return
             
             # Создаем пользователя
@@ -159,7 +243,7 @@ class UserView:
             
             if user:
                 messagebox.showinfo("Успех", "Пользователь успешно добавлен!")
-                self.load_users()
+                self.refresh_after_change()
                 dialog.destroy()
             else:
                 messagebox.showerror("Ошибка", "Не удалось добавить пользователя!")
@@ -230,16 +314,7 @@ class UserView:
             role = role_var.get()
             
             # Валидация
-            if not username:
-                messagebox.showerror("Ошибка", "Имя пользователя обязательно!")
-                return
-            
-            if not email:
-                messagebox.showerror("Ошибка", "Email обязателен!")
-                return
-            
-            if '@' not in email:
-                messagebox.showerror("Ошибка", "Введите корректный email!")
+            if not self.validate_user_form(username, email):
                 return
             
             # Обновляем пользователя
@@ -252,7 +327,7 @@ class UserView:
             
             if success:
                 messagebox.showinfo("Успех", "Пользователь успешно обновлен!")
-                self.load_users()
+                self.refresh_after_change()
                 dialog.destroy()
             else:
                 messagebox.showerror("Ошибка", "Не удалось обновить пользователя!")
@@ -285,7 +360,7 @@ class UserView:
             success = self.user_controller.delete_user(user_id)
             if success:
                 messagebox.showinfo("Успех", "Пользователь успешно удален!")
-                self.load_users()
+                self.refresh_after_change()
             else:
                 messagebox.showerror("Ошибка", "Не удалось удалить пользователя!")
     
@@ -296,29 +371,6 @@ class UserView:
             self.load_users()
             return
         
-        # Очищаем таблицу
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
         # Ищем пользователей
-        users = self.user_controller.get_all_users()
-        
-        for user in users:
-            # Проверяем совпадение
-            if (query in user.username.lower() or 
-                query in user.email.lower() or
-                query in user.role.lower()):
-                
-                # Получаем количество задач пользователя
-                tasks = self.task_controller.get_tasks_by_user(user.id)
-                task_count = len(tasks)
-                
-                # Добавляем в таблицу
-                self.tree.insert('', 'end', values=(
-                    user.id,
-                    user.username,
-                    user.email,
-                    self.get_role_text(user.role),
-                    user.registration_date.strftime('%d.%m.%Y %H:%M'),
-                    task_count
-                ))
+        self.search_query = query
+        self.show_users()